@@ -1,7 +1,7 @@
 import concurrent.futures
 import json
 from http.client import RemoteDisconnected
-from typing import Any, Dict, List, Union, cast
+from typing import Any, Dict, List, Optional, Union, cast
 from urllib.error import HTTPError, URLError
 
 import numpy as np
@@ -77,13 +77,18 @@ def _fetch_entities(session: Session, entity_ids: List[int]) -> pd.DataFrame:
     return pd.DataFrame(result_proxy.fetchall(), columns=result_proxy.keys())
 
 
-def add_entity_code_and_name(session: Session, df: pd.DataFrame) -> pd.DataFrame:
+def add_entity_code_and_name(
+    session: Session, df: pd.DataFrame, entities: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """Add entity name and code to `df`. Entities are fetched from the database unless they are
+    passed in `entities` (e.g. prefetched for the whole dataset)."""
     if df.empty:
         df["entityName"] = []
         df["entityCode"] = []
         return df
 
-    entities = _fetch_entities(session, list(df["entityId"].unique()))
+    if entities is None:
+        entities = _fetch_entities(session, list(df["entityId"].unique()))
 
     return pd.merge(df, entities, on="entityId")
 
@@ -103,7 +103,7 @@ def create_wide_table(values: pd.DataFrame, short_name: str, config: GrapherConf
             log.warning("create_wide_table.no_values", variable_id=variable.id, variable_name=variable.name)
             t[col] = np.nan
 
-        t[col].metadata = convert_grapher_variable(variable, variable_source_dict[variable.sourceId])
+        t.fields[col] = convert_grapher_variable(variable, variable_source_dict[variable.sourceId])
 
     # NOTE: collision happens for dataset 5629 with column names
     # Indicator:On-premise sales restrictions to intoxicated persons (archived) - Beverage Types:Spirits
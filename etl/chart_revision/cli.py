@@ -36,14 +36,20 @@ VERSION_DEFAULT = max(VERSIONS)
     default=VERSION_DEFAULT,
     help="Choose chart_revision backend version to use. By default uses latest version.",
 )
-def main_cli(mapping_file: str, revision_reason: str, use_version: int) -> None:
+@click.option(
+    "--batched/--no-batched",
+    default=False,
+    type=bool,
+    help="Load charts and variables in batches and skip downloading unchanged data. Only for version 1.",
+)
+def main_cli(mapping_file: str, revision_reason: str, use_version: int, batched: bool) -> None:
     """Chart revision backend client."""
     try:
         if use_version == "0":
             suggester = ChartRevisionSuggester.from_json(mapping_file, revision_reason)
             suggester.suggest()
         elif use_version == "1":
-            main_v1(mapping_file, revision_reason)
+            main_v1(mapping_file, revision_reason, batched=batched)
         elif use_version == "2":
             main_v2(mapping_file, revision_reason)
 
@@ -5,7 +5,7 @@
     - HOWEVER, based on bobbie's code, seems like only year ranges for variables to be updated are actually needed!
 """
 from copy import deepcopy
-from typing import Any, Dict, List, Literal, Optional, cast
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple, cast
 
 import pandas as pd
 import simplejson as json
@@ -16,23 +16,38 @@ from etl.chart_revision.v1.chart import Chart
 from etl.chart_revision.v1.variables import VariablesUpdate
 from etl.config import GRAPHER_USER_ID
 from etl.db import get_engine, open_db
+from etl.db_utils import DBUtils
 
 log = get_logger()
 # The maximum length of the suggested revision reason can't exceed the maximum length specified by the datatype "suggestedReason" in grapher.suggested_chart_revisions table.
 SUGGESTED_REASON_MAX_LENGTH = 512
+# Number of suggested chart revisions inserted with a single multi-row INSERT statement. Each row holds two chart
+# configs, so this keeps statements well below MySQL's `max_allowed_packet`.
+REVISIONS_INSERT_BATCH_SIZE = 100
 MSGTypes = Literal["error", "warning", "info", "success"]
 
 
-def get_charts_to_update(variable_mapping: Dict[int, int]) -> List["ChartVariableUpdateRevision"]:
+def get_charts_to_update(
+    variable_mapping: Dict[int, int], batched: bool = False
+) -> List["ChartVariableUpdateRevision"]:
+    """Get revisions for all charts using the old variables in `variable_mapping`.
+
+    With `batched=True`, the variables update avoids downloading data that has not changed (see `VariablesUpdate`)
+    and affected charts are loaded with a single query.
+    """
     # variables update
     log.info("Creating VariablesUpdate object...")
-    variables_update = VariablesUpdate(variable_mapping)
-    # get details on dimensions and chart IDs affected by the variable update
-    log.info("Getting info from chart_dimensions table...")
-    chart_dimensions = _get_chart_dimensions_from_db(list(variable_mapping.keys()))
-    chart_ids = list(set(c["chartId"] for c in chart_dimensions))
-    # get details on charts affected by the variable update
-    charts_raw = _get_charts_from_db(chart_ids)
+    variables_update = VariablesUpdate(variable_mapping, batched=batched)
+    if batched:
+        log.info("Getting charts using the variables...")
+        charts_raw = _get_charts_using_variables_from_db(list(variable_mapping.keys()))
+    else:
+        # get details on dimensions and chart IDs affected by the variable update
+        log.info("Getting info from chart_dimensions table...")
+        chart_dimensions = _get_chart_dimensions_from_db(list(variable_mapping.keys()))
+        chart_ids = list(set(c["chartId"] for c in chart_dimensions))
+        # get details on charts affected by the variable update
+        charts_raw = _get_charts_from_db(chart_ids)
     # build list with chart objects
     log.info("Building list with ChartVariableUpdateRevision objects...")
     charts = []
@@ -125,9 +140,13 @@ class ChartVariableUpdateRevision:
 
     def bake(self, revision_reason: Optional[str] = None) -> "ChartVariableUpdateRevision":
         """Get new chart config and set it to `chart_new` attribute."""
+        self._bake(revision_reason)
+        return deepcopy(self)
+
+    def _bake(self, revision_reason: Optional[str] = None) -> None:
+        """Same as `bake`, but without returning a copy of the revision."""
         self._revision_reason = revision_reason
         self.chart = self.get_new_chart(self.chart_init)
-        return deepcopy(self)
 
     def get_new_chart(self, chart: Chart) -> Chart:
         chart = deepcopy(chart)
@@ -323,6 +342,23 @@ def _get_charts_from_db(chart_ids: List[int]) -> List[Dict[str, Any]]:
     return df.to_dict(orient="records")
 
 
+def _get_charts_using_variables_from_db(variable_ids: List[int]) -> List[Dict[str, Any]]:
+    """Get list with data of charts that have any of the variables in their dimensions."""
+    if not variable_ids:
+        return []
+    query = """
+        SELECT id, config
+        FROM charts
+        WHERE id IN (
+            SELECT chartId
+            FROM chart_dimensions
+            WHERE variableId IN %(variables)s
+        )
+    """
+    df = pd.read_sql(query, get_engine(), params={"variables": variable_ids})
+    return df.to_dict(orient="records")
+
+
 def _get_chart_dimensions_from_db(variable_ids: List[int]) -> List[Dict[str, Any]]:
     """Get dataframe with chart dimensions."""
     # build query
@@ -381,13 +417,7 @@ def submit_revisions_to_grapher(revisions: List[ChartVariableUpdateRevision]):
             chart_ids = [t[0] for t in tuples]
             assert len(chart_ids) == len(set(chart_ids)), "`suggested_chart_revisions` contains duplicate chart ids."
 
-            query = """
-                INSERT INTO suggested_chart_revisions
-                    (chartId, suggestedConfig, originalConfig, suggestedReason, changesInDataSummary, status, createdBy, createdAt, updatedAt)
-                VALUES
-                    (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-            """
-            db.upsert_many(query, tuples)
+            _insert_suggested_chart_revisions(db, tuples)
 
             # checks if any of the affected chartIds now has multiple
             # pending suggested revisions. If so, then rejects the whole
@@ -447,6 +477,77 @@ def submit_revisions_to_grapher(revisions: List[ChartVariableUpdateRevision]):
         log.info(f"{n_after - n_before} of {len(revisions)} suggested chart revisions inserted.")
 
 
+def _insert_suggested_chart_revisions(
+    db: DBUtils, tuples: List[Tuple[Any, ...]], batch_size: int = REVISIONS_INSERT_BATCH_SIZE
+) -> None:
+    """Insert suggested chart revisions with multi-row INSERT statements of up to `batch_size` rows.
+
+    Each tuple contains chartId, suggestedConfig, originalConfig, suggestedReason, changesInDataSummary, status and
+    createdBy.
+    """
+    for i in range(0, len(tuples), batch_size):
+        batch = tuples[i : i + batch_size]
+        query = """
+            INSERT INTO suggested_chart_revisions
+                (chartId, suggestedConfig, originalConfig, suggestedReason, changesInDataSummary, status, createdBy, createdAt, updatedAt)
+            VALUES
+        """ + ", ".join(
+            ["(%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())"] * len(batch)
+        )
+        db.cursor.execute(query, [value for t in batch for value in t])
+
+
+def _format_chart_update_reason(datasets: Iterable[str]) -> str:
+    """Build the reason of a chart update from the names of the datasets with the new variables."""
+    names = sorted(set(datasets))
+    # extended reason (might overflow `suggestedReason` datatype length limitation)
+    # reason = [f"'{result[1]}' dataset update (variable '{result[0]}')" for result in results]
+    if len(names) == 1:
+        reason = f"Bulk update: {names[0]}"
+    else:
+        reason = "Bulk updates:" + "; ".join(names)
+
+    # check length
+    if len(reason) > SUGGESTED_REASON_MAX_LENGTH:
+        reason = reason[:SUGGESTED_REASON_MAX_LENGTH]
+
+    return reason
+
+
+def _get_chart_update_reasons(revisions: List[ChartVariableUpdateRevision]) -> Dict[int, str]:
+    """Get the reason for the update of each chart (by chart ID) with a single query.
+
+    Same as `_get_chart_update_reason`, but for many charts at once."""
+    variable_ids = sorted(set(var_id for revision in revisions for var_id in revision.variables_update.ids_new))
+    if not variable_ids:
+        return {}
+    try:
+        with open_db() as db:
+            results = db.fetch_many(
+                """
+                    SELECT variables.id, datasets.name FROM datasets
+                        JOIN variables ON datasets.id = variables.datasetId
+                        WHERE variables.id IN %s
+                """,
+                (variable_ids,),
+            )
+    except Exception:
+        log.error(
+            "Problem found when accessing the DB trying to get details on the newly added variables"
+            f" {variable_ids}. Therefore, no reason for suggested chart revisions could be stablished!"
+        )
+        reason = "No reason could be found for this suggested chart revision! Please check with the devs/data team!"
+        return {revision.id: reason for revision in revisions}
+
+    dataset_by_variable = {var_id: dataset for var_id, dataset in results}
+    return {
+        revision.id: _format_chart_update_reason(
+            dataset_by_variable[var_id] for var_id in revision.variables_update.ids_new if var_id in dataset_by_variable
+        )
+        for revision in revisions
+    }
+
+
 def _get_chart_update_reason(variable_ids: List[int]) -> str:
     """Get the reason for the chart update.
 
@@ -476,22 +577,31 @@ def _get_chart_update_reason(variable_ids: List[int]) -> str:
         )
         reason = "No reason could be found for this suggested chart revision! Please check with the devs/data team!"
     else:
-        datasets = sorted(set(result[1] for result in results))
-        # extended reason (might overflow `suggestedReason` datatype length limitation)
-        # reason = [f"'{result[1]}' dataset update (variable '{result[0]}')" for result in results]
-        if len(datasets) == 1:
-            reason = f"Bulk update: {datasets[0]}"
-        else:
-            reason = "Bulk updates:" + "; ".join(datasets)
-
-    # check length
-    if len(reason) > SUGGESTED_REASON_MAX_LENGTH:
-        reason = reason[:SUGGESTED_REASON_MAX_LENGTH]
+        reason = _format_chart_update_reason(result[1] for result in results)
 
     return reason
 
 
-def create_and_submit_charts_revisions(mapping: Dict[int, int], revision_reason: Optional[str] = None):
+def bake_revisions(
+    revisions: List[ChartVariableUpdateRevision], revision_reason: Optional[str] = None
+) -> List[ChartVariableUpdateRevision]:
+    """Update the configs of all charts and return the revisions of charts whose config has changed.
+
+    Unlike calling `bake` on each revision, revisions are updated in place and the reasons of all updates are read from
+    the database with a single query.
+    """
+    if revision_reason is None:
+        reasons = _get_chart_update_reasons(revisions)
+    else:
+        reasons = {revision.id: revision_reason for revision in revisions}
+    for revision in revisions:
+        revision._bake(reasons[revision.id])
+    return [revision for revision in revisions if revision.config_has_changed]
+
+
+def create_and_submit_charts_revisions(
+    mapping: Dict[int, int], revision_reason: Optional[str] = None, batched: bool = False
+):
     """Review and suggest chart revisions based on the variable mapping.
 
     Given a dictionary mapping old to new variable IDs, this function updated the configs from the affected charts
@@ -503,11 +613,17 @@ def create_and_submit_charts_revisions(mapping: Dict[int, int], revision_reason:
         Dictionary with old to new variable IDs mapping.
     revision_reason : Optional[str], optional
         Text briefly summarising the reason for this update. If none is given, a default one will be generated based on variable and dataset descriptions.
+    batched : bool, optional
+        Set to True to load variables and charts in a few set-based queries, avoid downloading data of variables that
+        have not changed and update all chart configs at once. Recommended for large mappings. Defaults to False.
     """
     # Get revisions to be done
-    chart_revisions = get_charts_to_update(mapping)
+    chart_revisions = get_charts_to_update(mapping, batched=batched)
     # Update chart configs
-    for chart_revision in chart_revisions:
-        _ = chart_revision.bake(revision_reason)
+    if batched:
+        chart_revisions = bake_revisions(chart_revisions, revision_reason)
+    else:
+        for chart_revision in chart_revisions:
+            _ = chart_revision.bake(revision_reason)
     # Submit revisions to Grapher
     submit_revisions_to_grapher(chart_revisions)
@@ -1,12 +1,25 @@
 """Module dealing with variables."""
+import concurrent.futures
+import json
 from dataclasses import dataclass, field
+from http.client import RemoteDisconnected
 from typing import Any, Dict, List, Optional, Tuple, Union
-from urllib.error import URLError
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
 
 import pandas as pd
+from structlog import get_logger
+from tenacity import Retrying
+from tenacity.retry import retry_if_exception
+from tenacity.stop import stop_after_attempt
+from tenacity.wait import wait_fixed
 
 from apps.backport.datasync.data_metadata import variable_data_df_from_s3
+from etl import config
 from etl.db import get_engine
+from etl.grapher_model import variables_have_checksums
+
+log = get_logger()
 
 # Set to True when running experiments locally and want to avoid downloading data from S3.
 # Instead of getting the actual data, dummy data is generated.
@@ -15,6 +28,8 @@ DEBUG_NO_S3 = False
 # Threshold among which we consider a change in a datapoint to be significant.
 # It is given in percentage terms, i.e. 100 * (datapoint_new - datapoint_old) / datapoint_old.
 THRESHOLD_MAJOR_CHANGE = 5
+# Number of parallel requests when fetching variable data or metadata from S3.
+S3_WORKERS = 10
 
 
 @dataclass
@@ -33,10 +48,21 @@ class VariablesUpdate:
         mapping: Dict[int, int],
         metadata: Optional[List["VariableMetadata"]] = None,
         update_summary: Optional[List[Tuple[Any, Any, Any]]] = None,
+        batched: bool = False,
     ):
+        """Build the variables update.
+
+        If `metadata` or `update_summary` are not given, they are built from the database and the data of variables in
+        S3. With `batched=True`, year ranges are read from grapher metadata of the variables and data is only
+        downloaded for variables whose data has changed (according to their checksums), which is much faster for
+        large mappings.
+        """
         self.mapping = mapping
         var_data = None
-        if metadata:
+        if batched and metadata is None and update_summary is None and not DEBUG_NO_S3:
+            self.metadata, self._update_summary = self._get_metadata_and_summary_batched()
+            return
+        if metadata is not None:
             self.metadata = metadata
         else:
             if DEBUG_NO_S3:
@@ -44,7 +70,7 @@ class VariablesUpdate:
             else:
                 var_data = self._get_var_data_from_db()
                 self.metadata = self._get_metadata_from_db(var_data)
-        if update_summary:
+        if update_summary is not None:
             self._update_summary = update_summary
         else:
             if DEBUG_NO_S3:
@@ -82,15 +108,68 @@ class VariablesUpdate:
             raise ValueError(f"Variable ID {old_id} is not a variable to be updated!")
         return self.mapping[old_id]
 
-    def _get_var_data_from_db(self, recursion_counter: int = 0) -> pd.DataFrame:
+    def _get_var_data_from_db(
+        self, variable_ids: Optional[List[int]] = None, recursion_counter: int = 0
+    ) -> pd.DataFrame:
         if recursion_counter >= 2:
             raise URLError("Failed to download data from S3")
+        if variable_ids is None:
+            variable_ids = self.ids_all
         try:
-            df = variable_data_df_from_s3(get_engine(), variable_ids=self.ids_all, workers=10)
+            df = variable_data_df_from_s3(get_engine(), variable_ids=variable_ids, workers=S3_WORKERS)
         except URLError:
-            df = self._get_var_data_from_db(recursion_counter + 1)
+            df = self._get_var_data_from_db(variable_ids, recursion_counter + 1)
         return df
 
+    def _get_metadata_and_summary_batched(self) -> Tuple[List["VariableMetadata"], List[Tuple[Any, Any, Any]]]:
+        """Get metadata and update summary of all variables without downloading data that has not changed.
+
+        Variable names and data checksums are read with a single query. Year ranges are taken from the grapher
+        metadata of each variable, which is much smaller than its data. Data is only downloaded for variable pairs
+        with different checksums (to summarise their changes) and for variables without years in their metadata.
+        """
+        engine = get_engine()
+        # older databases don't have checksums, data of all variables is compared then
+        checksum_column = "dataChecksum" if variables_have_checksums(engine) else "NULL AS dataChecksum"
+        query = f"SELECT id, name, {checksum_column} FROM variables WHERE id IN %(ids)s"
+        df_vars = pd.read_sql(query, engine, params={"ids": self.ids_all}).set_index("id")
+        checksums = df_vars["dataChecksum"].dropna().to_dict()
+
+        # pairs of variables whose data is identical don't need to be compared
+        mapping_changed = {
+            old_var: new_var
+            for old_var, new_var in self.mapping.items()
+            if checksums.get(old_var) is None or checksums.get(old_var) != checksums.get(new_var)
+        }
+        log.info(f"{len(self.mapping) - len(mapping_changed)} of {len(self.mapping)} variables have unchanged data")
+
+        year_ranges = _get_year_ranges_from_metadata(list(df_vars.index))
+        ids_data = set(mapping_changed) | set(mapping_changed.values())
+        ids_data |= {var_id for var_id in df_vars.index if var_id not in year_ranges}
+        if ids_data:
+            var_data = self._get_var_data_from_db(sorted(ids_data))
+            for var_id, years in var_data.groupby("variableId").year:
+                year_ranges.setdefault(var_id, (years.min(), years.max()))
+        else:
+            var_data = None
+
+        metadata = [
+            VariableMetadata(id=var_id, min_year=year_ranges[var_id][0], max_year=year_ranges[var_id][1], name=name)
+            for var_id, name in df_vars["name"].items()
+            if var_id in year_ranges
+        ]
+
+        summary_changed = {}
+        if mapping_changed:
+            summary_changed = {
+                old_var: summary
+                for old_var, _, summary in self._build_variables_update_summary(var_data, mapping_changed)
+            }
+        update_summary = [
+            (old_var, new_var, summary_changed.get(old_var, "No change")) for old_var, new_var in self.mapping.items()
+        ]
+        return metadata, update_summary
+
     def _get_metadata_from_db(self, var_data: Optional[pd.DataFrame] = None) -> List["VariableMetadata"]:
         """Get metadata for all variables in the update."""
         # get variable names
@@ -126,10 +205,11 @@ class VariablesUpdate:
 
     def slice(self, variable_ids: List[int]) -> "VariablesUpdate":
         """Slice with only variable updates specified by `variable_ids` (currently used variables)."""
-        mapping = {k: v for k, v in self.mapping.items() if k in variable_ids}
-        all_ids = list(set(variable_ids) | set(mapping.values()))
+        ids = set(variable_ids)
+        mapping = {k: v for k, v in self.mapping.items() if k in ids}
+        all_ids = ids | set(mapping.values())
         # Select relevant update summaries
-        update_summary = [s for s in self._update_summary if s[0] in variable_ids]
+        update_summary = [s for s in self._update_summary if s[0] in ids]
         return VariablesUpdate(
             mapping=mapping,
             metadata=[m for m in self.metadata if m.id in all_ids],
@@ -161,30 +241,41 @@ class VariablesUpdate:
                 year_max = max(year_max, var_meta.max_year)
             return [year_min, year_max]
 
-    def _build_variables_update_summary(self, var_data: Optional[pd.DataFrame] = None) -> List[Tuple[Any, Any, Any]]:
+    def _build_variables_update_summary(
+        self, var_data: Optional[pd.DataFrame] = None, mapping: Optional[Dict[int, int]] = None
+    ) -> List[Tuple[Any, Any, Any]]:
         """Find out differences between old and new variable.
 
-        For each variable update, it checks:
+        For each variable update in `mapping` (by default, all of them), it checks:
             - Changes in datapoints of the variable.
             - New datapoints added to the variable.
             - Datapoints removed from the variable.
         """
+        if mapping is None:
+            mapping = self.mapping
         update_summary = []
-        # Iterate over all variable mapping tupples.
-        for old_var, new_var in self.mapping.items():
-            if var_data is None:
+        if var_data is None:
+            for old_var, new_var in mapping.items():
                 update_summary.append((old_var, new_var, "No access to S3. Hence could not compare variable values."))
-            else:
-                # Datavalues of old variable
-                df_old = var_data[var_data["variableId"] == old_var].reset_index(drop=True)
-                # Datavalues of new variable
-                df_new = var_data[var_data["variableId"] == new_var].reset_index(drop=True)
-                # Build summary for this variable pdate
-                summary = self._build_variable_update_summary(df_old, df_new)
-                update_summary.append((old_var, new_var, summary))
+            return update_summary
+
+        # Split datavalues by variable once
+        var_data_by_id = {var_id: df.reset_index(drop=True) for var_id, df in var_data.groupby("variableId")}
+        empty = var_data.iloc[:0]
+        entities_mapping = _get_entities_mapping()
+        # Iterate over all variable mapping tupples.
+        for old_var, new_var in mapping.items():
+            # Datavalues of old and new variable
+            df_old = var_data_by_id.get(old_var, empty)
+            df_new = var_data_by_id.get(new_var, empty)
+            # Build summary for this variable pdate
+            summary = self._build_variable_update_summary(df_old, df_new, entities_mapping)
+            update_summary.append((old_var, new_var, summary))
         return update_summary
 
-    def _build_variable_update_summary(self, df_old: pd.DataFrame, df_new: pd.DataFrame) -> str:
+    def _build_variable_update_summary(
+        self, df_old: pd.DataFrame, df_new: pd.DataFrame, entities_mapping: Optional[Dict[int, str]] = None
+    ) -> str:
         """Generate a summary with major differences between `df_old` and `df_new`.
 
         Parameters
@@ -193,6 +284,8 @@ class VariablesUpdate:
             Dataframe with datapoints from old variable.
         df_new : pd.DataFrame
             Dataframe with datapoints from new variable.
+        entities_mapping : Dict[int, str], optional
+            Mapping of entity IDs to names. If not given, it is read from the database.
         """
         # Pre-format dataframes
         columns_ignore = ["variableId"]
@@ -208,7 +301,8 @@ class VariablesUpdate:
         if df_old.equals(df_new):
             return "No change"
 
-        entities_mapping = _get_entities_mapping()
+        if entities_mapping is None:
+            entities_mapping = _get_entities_mapping()
         summary = ""
         # Check if there are any changes in datapoints
         summary_changes = _summary_datapoint_changes(df_old, df_new, entities_mapping)
@@ -322,6 +416,39 @@ def prettify_datavalues_df(df: pd.DataFrame, entities_mapping: Dict[int, str]) -
     return df[["entity", "year"]]
 
 
+def _fetch_year_range_from_s3(variable_id: int) -> Optional[Tuple[int, int]]:
+    """Get min and max year of a variable from its grapher metadata, or None if it is not available."""
+    try:
+        for attempt in Retrying(
+            wait=wait_fixed(2),
+            stop=stop_after_attempt(3),
+            # HTTPError is a subclass of URLError, but there is no point in retrying e.g. 404
+            retry=retry_if_exception(_is_transient_error),
+            reraise=True,
+        ):
+            with attempt:
+                with urlopen(config.variable_metadata_url(variable_id)) as f:
+                    metadata = json.load(f)
+    # no metadata on S3
+    except HTTPError:
+        return None
+    years = [year["id"] for year in metadata.get("dimensions", {}).get("years", {}).get("values", [])]
+    if not years:
+        return None
+    return min(years), max(years)
+
+
+def _is_transient_error(e: BaseException) -> bool:
+    return isinstance(e, RemoteDisconnected) or (isinstance(e, URLError) and not isinstance(e, HTTPError))
+
+
+def _get_year_ranges_from_metadata(variable_ids: List[int]) -> Dict[int, Tuple[int, int]]:
+    """Get year ranges of variables from their grapher metadata. Variables without metadata are left out."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=S3_WORKERS) as executor:
+        ranges = executor.map(_fetch_year_range_from_s3, variable_ids)
+    return {var_id: year_range for var_id, year_range in zip(variable_ids, ranges) if year_range is not None}
+
+
 def _get_entities_mapping() -> Dict[int, str]:
     query = "SELECT id, name FROM entities"
     # get data from db
@@ -3,15 +3,18 @@
 #  etl.py
 #
 
+import concurrent.futures
+import graphlib
 import itertools
 import re
 import resource
 import sys
 import time
+import traceback
 from contextlib import contextmanager
 from os import environ
 from pathlib import Path
-from typing import Any, Callable, Iterator, List, Optional, Set
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
 
 import click
 from ipdb import launch_ipdb_on_exception
@@ -21,10 +24,14 @@ from etl.snapshot import snapshot_catalog
 from etl.steps import (
     DAG,
     DataStep,
+    Graph,
     GrapherStep,
+    SnapshotStep,
     Step,
     compile_steps,
     load_dag,
+    parse_step,
+    pull_snapshot_steps,
     select_dirty_steps,
 )
 
@@ -77,9 +84,20 @@ LIMIT_NOFILE = 4096
 @click.option(
     "--workers",
     type=int,
-    help="Thread workers to parallelize which steps need rebuilding (steps execution is not parallelized)",
+    help="Thread workers to parallelize which steps need rebuilding (use --run-workers to parallelize execution)",
     default=5,
 )
+@click.option(
+    "--run-workers",
+    type=int,
+    help="Process workers to run independent steps in parallel (steps are run one by one by default)",
+    default=1,
+)
+@click.option(
+    "--continue-on-error",
+    is_flag=True,
+    help="Keep running independent steps after a step fails (only with --run-workers > 1)",
+)
 @click.option(
     "--strict/--no-strict",
     is_flag=True,
@@ -106,6 +124,8 @@ def main_cli(
     exclude: Optional[str] = None,
     dag_path: Path = paths.DEFAULT_DAG_FILE,
     workers: int = 5,
+    run_workers: int = 1,
+    continue_on_error: bool = False,
     strict: Optional[bool] = None,
     watch: bool = False,
 ) -> None:
@@ -127,6 +147,8 @@ def main_cli(
         exclude=exclude,
         dag_path=dag_path,
         workers=workers,
+        run_workers=run_workers,
+        continue_on_error=continue_on_error,
         strict=strict,
     )
 
@@ -144,6 +166,7 @@ def main_cli(
             config.IPDB_ENABLED = True
             config.GRAPHER_INSERT_WORKERS = 1
             kwargs["workers"] = 1
+            kwargs["run_workers"] = 1
             with launch_ipdb_on_exception():
                 main(**kwargs)  # type: ignore
         else:
@@ -163,6 +186,8 @@ def main(
     exclude: Optional[str] = None,
     dag_path: Path = paths.DEFAULT_DAG_FILE,
     workers: int = 5,
+    run_workers: int = 1,
+    continue_on_error: bool = False,
     strict: Optional[bool] = None,
 ) -> None:
     """
@@ -187,6 +212,8 @@ def main(
         only=only,
         excludes=excludes,
         workers=workers,
+        run_workers=run_workers,
+        continue_on_error=continue_on_error,
         strict=strict,
     )
 
@@ -236,6 +263,8 @@ def run_dag(
     only: bool = False,
     excludes: Optional[List[str]] = None,
     workers: int = 1,
+    run_workers: int = 1,
+    continue_on_error: bool = False,
     strict: Optional[bool] = None,
 ) -> None:
     """
@@ -244,6 +273,9 @@ def run_dag(
 
     By default, data steps do not re-run if they appear to be up-to-date already by
     looking at their checksum.
+
+    With `run_workers > 1`, independent steps are run concurrently in a process pool
+    as soon as all their dependencies have finished.
     """
     excludes = excludes or []
     if not include_grapher_channel:
@@ -264,8 +296,9 @@ def run_dag(
 
     # do not run dependencies if `only` is set by setting them to non-dirty
     if only:
+        selected = {str(step) for step in steps}
         for step in steps:
-            _set_dependencies_to_nondirty(step)
+            _set_dependencies_to_nondirty(step, selected)
 
     if not force:
         print("--- Detecting which steps need rebuilding...")
@@ -277,6 +310,23 @@ def run_dag(
         print("--- All datasets up to date!")
         return
 
+    # snapshot steps only pull files from DVC, pull all of them in a single batch
+    snapshot_steps = [step for step in steps if isinstance(step, SnapshotStep)]
+    if snapshot_steps:
+        print(f"--- Pulling {len(snapshot_steps)} snapshots...")
+        if not dry_run:
+            time_taken = timed_run(lambda: pull_snapshot_steps(snapshot_steps))
+            click.echo(f"{click.style('OK', fg='blue')} ({time_taken:.1f}s)")
+            print()
+        steps = [step for step in steps if not isinstance(step, SnapshotStep)]
+        if not steps:
+            return
+
+    if run_workers > 1 and not dry_run:
+        print(f"--- Running {len(steps)} steps with {run_workers} workers:")
+        run_steps_in_parallel(dag, steps, run_workers, strict=strict, continue_on_error=continue_on_error)
+        return
+
     print(f"--- Running {len(steps)} steps:")
     for i, step in enumerate(steps, 1):
         print(f"--- {i}. {step}...")
@@ -288,6 +338,132 @@ def run_dag(
                 print()
 
 
+def run_steps_in_parallel(
+    dag: DAG,
+    steps: List[Step],
+    workers: int,
+    strict: Optional[bool] = None,
+    continue_on_error: bool = False,
+) -> None:
+    """
+    Run steps in a process pool, scheduling each step as soon as all its dependencies
+    are done. Stop scheduling new steps after the first failure, unless `continue_on_error`
+    is set, in which case only steps depending on the failed one are skipped.
+    """
+    steps_by_name = {str(step): step for step in steps}
+    graph = _dependency_graph_of_selected(dag, set(steps_by_name))
+
+    sorter = graphlib.TopologicalSorter(graph)
+    sorter.prepare()
+
+    failed: Dict[str, str] = {}
+    skipped: Set[str] = set()
+    futures: Dict[concurrent.futures.Future, str] = {}
+
+    def _finish(step_name: str, get_time_taken: Callable[[], float]) -> None:
+        try:
+            time_taken = get_time_taken()
+        except Exception as e:
+            failed[step_name] = str(e)
+            click.echo(f"{click.style('FAILED', fg='red')} {step_name}")
+        else:
+            click.echo(f"{click.style('OK', fg='blue')} {step_name} ({time_taken:.1f}s)")
+        sorter.done(step_name)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_step_worker, initargs=(dag,)
+    ) as executor:
+        while sorter.is_active() and (continue_on_error or not failed):
+            for step_name in sorter.get_ready():
+                # step that ran in the main process failed, don't start any more steps
+                if failed and not continue_on_error:
+                    break
+
+                # dependencies of this step were not built, we can't run it
+                if graph[step_name] & (failed.keys() | skipped):
+                    click.echo(f"{click.style('SKIPPED', fg='yellow')} {step_name}")
+                    skipped.add(step_name)
+                    sorter.done(step_name)
+                    continue
+
+                step = steps_by_name[step_name]
+                step_strict = _detect_strictness_level(step, strict)
+                print(f"--- Starting {step_name}...")
+
+                if _run_in_worker(step):
+                    futures[executor.submit(_run_step_in_worker, step_name, step_strict)] = step_name
+                else:
+                    _finish(step_name, lambda: _run_step(step, step_strict))
+
+            # steps that ran in the main process might have unblocked other steps
+            if not futures:
+                continue
+
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                _finish(futures.pop(future), future.result)
+
+        # wait for steps that are still running after a failure
+        for future in concurrent.futures.as_completed(futures):
+            _finish(futures[future], future.result)
+
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} step(s) failed:\n" + "\n".join(f"  {name}: {error}" for name, error in failed.items())
+        )
+
+
+def _dependency_graph_of_selected(dag: DAG, selected: Set[str]) -> Graph:
+    """
+    Return graph with dependencies between selected steps only. Unselected steps (e.g. clean
+    or excluded ones) are traversed through, so that transitive dependencies are kept.
+    """
+    selected_deps: Dict[str, Set[str]] = {}
+
+    def _deps(node: str) -> Set[str]:
+        if node not in selected_deps:
+            selected_deps[node] = set()
+            for dep in dag.get(node, set()):
+                if dep in selected:
+                    selected_deps[node].add(dep)
+                else:
+                    selected_deps[node] |= _deps(dep)
+        return selected_deps[node]
+
+    return {step_name: _deps(step_name) for step_name in selected}
+
+
+def _run_in_worker(step: Step) -> bool:
+    # snapshot and other ingestion steps share DVC and git state in the repository,
+    # it is safer to run them in the main process
+    return isinstance(step, (DataStep, GrapherStep))
+
+
+def _run_step(step: Step, strict: bool) -> float:
+    with strictness_level(strict):
+        return timed_run(lambda: step.run())
+
+
+_WORKER_DAG: DAG = {}
+
+
+def _init_step_worker(dag: DAG) -> None:
+    global _WORKER_DAG
+    _WORKER_DAG = dag
+
+
+def _run_step_in_worker(step_name: str, strict: bool) -> float:
+    # steps are parsed again in the worker to avoid pickling them
+    step = parse_step(step_name, _WORKER_DAG)
+    try:
+        return _run_step(step, strict)
+    except BaseException as e:
+        # exceptions raised by steps (or `sys.exit` in `_run_py`) are not guaranteed to be
+        # picklable, print the traceback here and send a plain error back
+        traceback.print_exc()
+        raise RuntimeError(repr(e)) from None
+
+
 def _detect_strictness_level(step: Step, strict: Optional[bool] = None) -> bool:
     # honour the command-line argument over anything else
     if strict is not None:
@@ -390,14 +566,19 @@ def _update_open_file_limit() -> None:
         resource.setrlimit(resource.RLIMIT_NOFILE, (min(LIMIT_NOFILE, hard_limit), hard_limit))
 
 
-def _set_dependencies_to_nondirty(step: Step) -> None:
-    """Set all dependencies of a step to non-dirty."""
+def _set_dependencies_to_nondirty(step: Step, selected: Set[str]) -> None:
+    """Set all dependencies of a step to non-dirty. Steps are shared between their dependants,
+    so dependencies that are selected themselves are left untouched."""
     if isinstance(step, DataStep):
-        for step_dep in step.dependencies:
+        dependencies = step.dependencies
+    elif isinstance(step, GrapherStep):
+        dependencies = [step.data_step]
+    else:
+        return
+
+    for step_dep in dependencies:
+        if str(step_dep) not in selected:
             step_dep.is_dirty = lambda: False
-    if isinstance(step, GrapherStep):
-        for step_dep in step.data_step.dependencies:
-            step.data_step.is_dirty = lambda: False
 
 
 if __name__ == "__main__":
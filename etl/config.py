@@ -24,6 +24,11 @@ load_dotenv(ENV_FILE)
 # - run steps in the same process (speeding up ETL)
 DEBUG = env.get("DEBUG") in ("True", "true", "1")
 
+# When WARM_WORKERS is on
+# - run steps in processes forked from a fork server with heavy packages already imported,
+#   instead of starting a new `poetry run run_python_step` process for every step
+WARM_WORKERS = env.get("WARM_WORKERS") in ("True", "true", "1")
+
 # publishing to OWID's public data catalog
 S3_BUCKET = "owid-catalog"
 S3_REGION_NAME = "nyc3"
@@ -90,6 +95,18 @@ IPDB_ENABLED = False
 # number of workers for grapher inserts
 GRAPHER_INSERT_WORKERS = int(env.get("GRAPHER_WORKERS", 40))
 
+# upsert variables to grapher in batches of this size with a single transaction per batch and
+# prefetched entities, 0 upserts every variable separately
+GRAPHER_BATCH_SIZE = int(env.get("GRAPHER_BATCH_SIZE", 0))
+
+# number of threads uploading data and metadata JSONs to R2 and max number of JSONs waiting
+# for upload in batched upsert
+GRAPHER_UPLOAD_WORKERS = int(env.get("GRAPHER_UPLOAD_WORKERS", 20))
+GRAPHER_UPLOAD_MAX_PENDING = int(env.get("GRAPHER_UPLOAD_MAX_PENDING", 200))
+
+# upsert all variables to grapher even if their data and metadata haven't changed
+GRAPHER_FORCE_UPSERT = env.get("GRAPHER_FORCE_UPSERT") in ("True", "true", "1")
+
 # only upsert indicators matching this filter, this is useful for fast development
 # of data pages for a single indicator
 GRAPHER_FILTER = env.get("GRAPHER_FILTER", None)
@@ -1,8 +1,10 @@
+import concurrent.futures
 import difflib
 import os
 import re
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, List, Optional, cast
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, cast
 
 import numpy as np
 import pandas as pd
@@ -21,6 +23,10 @@ from etl.tempcompare import series_equals
 
 log = structlog.get_logger()
 
+# number of rows whose values are hashed at once when comparing columns, bounds the memory
+# needed on top of the tables themselves
+HASH_BLOCK_SIZE = 2**20
+
 
 class DatasetError(Exception):
     pass
@@ -127,19 +133,14 @@ tb = {_snippet_dataset(ds_b, table_name)}
                 if table_b.index.names != [None]:
                     table_b = table_b.reset_index()
 
-            # only sort index if different to avoid unnecessary sorting for huge datasets such as ghe
-            if len(table_a) != len(table_b) or not _index_equals(table_a, table_b):
-                index_diff = True
-                table_a, table_b, eq_index = _align_tables(table_a, table_b)
-            else:
-                index_diff = False
-                eq_index = pd.Series(True, index=table_a.index)
+            # match rows by hashes of their index, this avoids aligning huge tables
+            alignment = _align_rows(table_a, table_b)
+            index_diff = not alignment.identical
 
             # resetting index will make comparison easier
             dims = table_a.index.names
             table_a: Table = table_a.reset_index()
             table_b: Table = table_b.reset_index()
-            eq_index = eq_index.reset_index(drop=True)
 
             # compare table metadata
             diff = _dict_diff(_table_metadata_dict(table_a), _table_metadata_dict(table_b), tabs=3)
@@ -165,10 +166,15 @@ tb = {_snippet_dataset(ds_b, table_name)}
                     col_a = table_a[col]
                     col_b = table_b[col]
 
-                    # equality on index and series
-                    eq_data = series_equals(table_a[col], table_b[col])
-                    data_diff = (~eq_data).any()
-                    eq = eq_index & eq_data
+                    # positions of common rows with different values
+                    diff_rows = _compare_column(col_a, col_b, alignment)
+                    # values in removed or new rows count as changed data too
+                    data_diff = len(diff_rows) > 0 or (
+                        col not in dims
+                        and (
+                            col_a.iloc[alignment.only_a].notnull().any() or col_b.iloc[alignment.only_b].notnull().any()
+                        )
+                    )
 
                     col_a_meta = col_a.metadata.to_dict()
                     col_b_meta = col_b.metadata.to_dict()
@@ -189,7 +195,18 @@ tb = {_snippet_dataset(ds_b, table_name)}
                             if data_diff or index_diff:
                                 if meta_diff:
                                     self.p("")
-                                out = _data_diff(table_a, table_b, col, dims, tabs=4, eq=eq)
+                                rows_a, rows_b = _materialize_diff_rows(
+                                    table_a, table_b, col, dims, alignment, diff_rows
+                                )
+                                out = _data_diff(
+                                    rows_a,
+                                    rows_b,
+                                    col,
+                                    dims,
+                                    tabs=4,
+                                    eq=pd.Series(False, index=rows_a.index),
+                                    n_rows=alignment.n_rows,
+                                )
                                 if out:
                                     self.p(out)
                     else:
@@ -272,6 +289,14 @@ class RemoteDataset:
     is_flag=True,
     help="Print code snippet for loading both tables, useful for debugging in notebook",
 )
+@click.option(
+    "--workers",
+    "-w",
+    type=int,
+    default=1,
+    help="Compare datasets in a process pool of this size. Every worker loads a pair of tables, so peak memory "
+    "grows with the number of workers",
+)
 def cli(
     path_a: str,
     path_b: str,
@@ -281,6 +306,7 @@ def cli(
     exclude: Optional[str],
     verbose: bool,
     snippet: bool,
+    workers: int,
 ) -> None:
     """Compare all datasets from two catalogs (`a` and `b`) and print out summary of their differences. This is
     different from `compare` tool which compares two specific datasets and prints out more detailed output. This
@@ -299,6 +325,9 @@ def cli(
 
         # compare two local catalogs
         etl-datadiff other-data/ data/ --include maddison
+
+    Tables are compared by hashes of their rows, only rows with different hashes are loaded for
+    detailed comparison. Datasets are compared in parallel with `--workers` processes.
     """
     console = Console(tab_size=2)
 
@@ -308,6 +337,7 @@ def cli(
     any_diff = False
     any_error = False
 
+    pairs = []
     for path in sorted(set(path_to_ds_a.keys()) | set(path_to_ds_b.keys())):
         ds_a = _match_dataset(path_to_ds_a, path)
         ds_b = _match_dataset(path_to_ds_b, path)
@@ -317,27 +347,32 @@ def cli(
             # to improve performance. Source checksum should be enough
             continue
 
-        lines = []
-
-        def _append_and_print(x):
-            lines.append(x)
-            console.print(x)
-
-        try:
-            differ = DatasetDiff(ds_a, ds_b, cols=cols, print=_append_and_print, verbose=verbose, snippet=snippet)
-            differ.summary()
-        except DatasetError as e:
-            # soft fail and continue with another dataset
-            _append_and_print(f"[bold red]⚠ Error: {e}[/bold red]")
-            continue
-        except Exception as e:
-            # soft fail and continue with another dataset
-            log.error(e)
-            any_error = True
-            continue
-
-        if any("~" in line for line in lines if isinstance(line, str)):
-            any_diff = True
+        pairs.append((ds_a, ds_b))
+
+    kwargs = dict(cols=cols, verbose=verbose, snippet=snippet)
+    if workers > 1 and len(pairs) > 1:
+        # print output of datasets in order, as soon as all previous datasets are done
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_diff_dataset, ds_a, ds_b, **kwargs) for ds_a, ds_b in pairs]
+            for (ds_a, ds_b), future in zip(pairs, futures):
+                try:
+                    lines, diff, error = future.result()
+                except Exception as e:
+                    # soft fail and continue with another dataset, e.g. if the worker got killed for
+                    # running out of memory
+                    console.print(f"[bold red]⚠ Error: {dataset_uri(cast(Dataset, ds_a or ds_b))}: {e!r}[/bold red]")
+                    log.error(e)
+                    any_error = True
+                    continue
+                for line in lines:
+                    console.print(line)
+                any_diff |= diff
+                any_error |= error
+    else:
+        for ds_a, ds_b in pairs:
+            _, diff, error = _diff_dataset(ds_a, ds_b, print=console.print, **kwargs)  # type: ignore
+            any_diff |= diff
+            any_error |= error
 
     console.print()
     if not path_to_ds_a and not path_to_ds_b:
@@ -362,18 +397,6 @@ def cli(
     exit(1 if any_diff else 0)
 
 
-def _index_equals(table_a: pd.DataFrame, table_b: pd.DataFrame, sample: int = 1000) -> bool:
-    """Check if two tables have the same index. Sample both tables to speed up the check."""
-    if len(table_a) < sample and len(table_b) < sample:
-        index_a = table_a.index
-        index_b = table_b.index
-    else:
-        index_a = table_a.sample(sample, random_state=0).index
-        index_b = table_b.sample(sample, random_state=0).index
-
-    return index_a.equals(index_b)
-
-
 def _dict_diff(dict_a: Dict[str, Any], dict_b: Dict[str, Any], tabs) -> str:
     """Convert dictionaries into YAML and compare them using difflib. Return colored diff as a string."""
     meta_a = yaml_dump(dict_a)
@@ -394,14 +417,27 @@ def _dict_diff(dict_a: Dict[str, Any], dict_b: Dict[str, Any], tabs) -> str:
 
 
 def _data_diff(
-    table_a: Table, table_b: Table, col: str, dims: list[str], tabs: int, eq: Optional[pd.Series] = None
+    table_a: Table,
+    table_b: Table,
+    col: str,
+    dims: list[str],
+    tabs: int,
+    eq: Optional[pd.Series] = None,
+    n_rows: Optional[int] = None,
 ) -> str:
-    """Return summary of data differences."""
+    """Return summary of data differences.
+
+    :param n_rows: Total number of compared rows, if the tables contain only a subset of them
+        (e.g. only rows that differ)
+    """
     if eq is None:
         eq = series_equals(table_a[col], table_b[col])
 
+    n_changed = (~eq).sum()
+    n_rows = n_rows or len(eq)
+
     lines = [
-        f"- Changed values: {(~eq).sum()} / {len(eq)} ({(~eq).sum() / len(eq) * 100:.2f}%)",
+        f"- Changed values: {n_changed} / {n_rows} ({n_changed / n_rows * 100:.2f}%)",
     ]
 
     # changes in index
@@ -446,44 +482,122 @@ def _is_datetime(dtype: Any) -> bool:
         return False
 
 
-def _align_tables(table_a: Table, table_b: Table) -> tuple[Table, Table, pd.Series]:
-    if not table_a.index.is_unique or not table_b.index.is_unique:
+@dataclass
+class _RowAlignment:
+    """Matching of rows of two tables by their index. Positions refer to rows of the original tables."""
+
+    # positions of rows present in both tables, `pos_a[i]` and `pos_b[i]` are the same row
+    pos_a: np.ndarray
+    pos_b: np.ndarray
+    # positions of rows present only in one of the tables
+    only_a: np.ndarray
+    only_b: np.ndarray
+    # both tables have the same index in the same order
+    identical: bool
+
+    @property
+    def n_rows(self) -> int:
+        """Number of rows in the union of both tables."""
+        return len(self.pos_a) + len(self.only_a) + len(self.only_b)
+
+
+def _row_keys(table: Table) -> np.ndarray:
+    """Hash index of every row into 64-bit key. Categorical levels are hashed by their values, not codes."""
+    return pd.util.hash_pandas_object(table.index, index=False).values
+
+
+def _has_duplicates(keys: np.ndarray) -> bool:
+    keys = np.sort(keys)
+    return bool((keys[1:] == keys[:-1]).any())
+
+
+def _align_rows(table_a: Table, table_b: Table) -> _RowAlignment:
+    """Match rows of two tables by hashes of their index. Unlike outer-aligning the tables themselves,
+    this only needs a few integer arrays with one element per row."""
+    keys_a = _row_keys(table_a)
+    keys_b = _row_keys(table_b)
+
+    if len(keys_a) == len(keys_b) and np.array_equal(keys_a, keys_b):
+        pos = np.arange(len(keys_a))
+        empty = np.array([], dtype=int)
+        return _RowAlignment(pos_a=pos, pos_b=pos, only_a=empty, only_b=empty, identical=True)
+
+    if _has_duplicates(keys_a) or _has_duplicates(keys_b):
         raise DatasetError("Index must be unique.")
 
-    if len(table_a.index.names) * len(table_a) >= 2 * 10**8:
-        # table_a.align is very memory intensive for large tables as doesn't handle
-        # categorical indexes well. We'd have to convert all categories to codes first,
-        # align them and then convert back to categories.
-        raise DatasetError("Cannot run datadiff for an index of such size.")
+    _, pos_a, pos_b = np.intersect1d(keys_a, keys_b, assume_unique=True, return_indices=True)
 
-    table_a = _sort_index(table_a)
-    table_b = _sort_index(table_b)
+    # keep common rows in the order of the first table
+    order = np.argsort(pos_a)
+    pos_a, pos_b = pos_a[order], pos_b[order]
 
-    # align tables by index
-    table_a["_x"] = 1
-    table_b["_x"] = 1
-    table_a, table_b = table_a.align(table_b, join="outer", copy=False)
+    return _RowAlignment(
+        pos_a=pos_a,
+        pos_b=pos_b,
+        only_a=np.setdiff1d(np.arange(len(keys_a)), pos_a, assume_unique=True),
+        only_b=np.setdiff1d(np.arange(len(keys_b)), pos_b, assume_unique=True),
+        identical=False,
+    )
+
+
+def _compare_column(col_a: pd.Series, col_b: pd.Series, alignment: _RowAlignment) -> np.ndarray:
+    """Return positions into `alignment.pos_a` (and `pos_b`) of common rows whose values differ.
 
-    eq_index = table_a["_x"].notnull() & table_b["_x"].notnull()
-    table_a.drop(columns="_x", inplace=True)
-    table_b.drop(columns="_x", inplace=True)
+    Values are hashed in blocks of `HASH_BLOCK_SIZE` rows and only rows with different hashes are
+    compared with `series_equals` (which takes tolerance of numeric values into account). Equal
+    hashes are taken as equal values.
+    """
+    diff = []
+    for start in range(0, len(alignment.pos_a), HASH_BLOCK_SIZE):
+        end = start + HASH_BLOCK_SIZE
+        if alignment.identical:
+            block_a = col_a.iloc[start:end]
+            block_b = col_b.iloc[start:end]
+        else:
+            block_a = col_a.iloc[alignment.pos_a[start:end]]
+            block_b = col_b.iloc[alignment.pos_b[start:end]]
 
-    return cast(Table, table_a), cast(Table, table_b), eq_index
+        hashes_a = pd.util.hash_pandas_object(block_a, index=False).values
+        hashes_b = pd.util.hash_pandas_object(block_b, index=False).values
+        candidates = np.flatnonzero(hashes_a != hashes_b)
+        if len(candidates) == 0:
+            continue
 
+        eq = series_equals(
+            block_a.iloc[candidates].reset_index(drop=True),
+            block_b.iloc[candidates].reset_index(drop=True),
+        ).values
+        diff.append(start + candidates[~eq])
 
-def _sort_index(df: Table) -> Table:
-    """Sort dataframe by its index and make sure categories are sorted by their
-    names and not codes. Modifies the dataframe in place and also returns it."""
-    new_levels = []
-    for level_name in df.index.names:
-        level = df.index.get_level_values(level_name)
-        if level.dtype == "category":
-            level = level.reorder_categories(sorted(level.categories))
-        new_levels.append(level)
+    return np.concatenate(diff) if diff else np.array([], dtype=int)
 
-    df.index = pd.MultiIndex.from_arrays(new_levels)
-    df.sort_index(inplace=True)
-    return df
+
+def _materialize_diff_rows(
+    table_a: Table, table_b: Table, col: str, dims: List[str], alignment: _RowAlignment, diff_rows: np.ndarray
+) -> Tuple[Table, Table]:
+    """Return rows of both tables that differ in column `col`, i.e. common rows with different values,
+    removed and new rows. Both tables get the same index columns as if they were outer-aligned and values
+    of rows missing in one of them are NaNs."""
+    dim_cols = [dim for dim in dims if dim is not None]
+    n_changed = len(diff_rows)
+    n_only_a = len(alignment.only_a)
+    n_total = n_changed + n_only_a + len(alignment.only_b)
+
+    rows_a = table_a.iloc[np.concatenate([alignment.pos_a[diff_rows], alignment.only_a])]
+    rows_a.index = pd.RangeIndex(n_changed + n_only_a)
+
+    rows_b = table_b.iloc[np.concatenate([alignment.pos_b[diff_rows], alignment.only_b])]
+    rows_b.index = np.concatenate([np.arange(n_changed), np.arange(n_changed + n_only_a, n_total)])
+
+    # index values of changed and removed rows come from the first table, of new rows from the second one
+    index_values = pd.concat([rows_a[dim_cols], rows_b[dim_cols].iloc[n_changed:]])
+
+    out = []
+    for rows in (rows_a, rows_b):
+        rows = index_values.join(rows[[col]].reindex(range(n_total))) if col not in dim_cols else index_values
+        out.append(cast(Table, rows))
+
+    return out[0], out[1]
 
 
 def _match_dataset(path_to_ds: Dict[str, Any], path: str) -> Optional[Dataset]:
@@ -605,6 +719,37 @@ def _remote_catalog_datasets(channels: Iterable[CHANNEL], include: str, exclude:
     return mapping
 
 
+def _diff_dataset(
+    ds_a: Optional[Dataset],
+    ds_b: Optional[Dataset],
+    print: Optional[Callable] = None,
+    **kwargs: Any,
+) -> Tuple[List[Any], bool, bool]:
+    """Compare two datasets and return printed lines, whether they differ and whether an unexpected
+    error occurred. If `print` is not given (e.g. in a worker process), lines are only collected."""
+    lines = []
+
+    def _append_and_print(x):
+        lines.append(x)
+        if print:
+            print(x)
+
+    try:
+        differ = DatasetDiff(ds_a, ds_b, print=_append_and_print, **kwargs)
+        differ.summary()
+    except DatasetError as e:
+        # soft fail and continue with another dataset
+        _append_and_print(f"[bold red]⚠ Error: {e}[/bold red]")
+        return lines, False, False
+    except Exception as e:
+        # soft fail and continue with another dataset
+        log.error(e)
+        return lines, False, True
+
+    any_diff = any("~" in line for line in lines if isinstance(line, str))
+    return lines, any_diff, False
+
+
 def dataset_uri(ds: Dataset) -> str:
     # TODO: coule be method in DatasetMeta (after we add channel)
     assert hasattr(ds.metadata, "channel"), "Dataset metadata should have channel attribute"
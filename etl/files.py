@@ -8,13 +8,15 @@ import time
 from collections import OrderedDict
 from pathlib import Path
 from threading import Lock
-from typing import Any, Dict, Generator, List, Optional, Set, TextIO, Union
+from typing import Any, Callable, Dict, Generator, List, Optional, Set, TextIO, Union
 
 import black
+import click
 import yaml
+from owid.catalog import checksums
 from yaml.dumper import Dumper
 
-from etl.paths import BASE_DIR
+from etl.paths import BASE_DIR, DATA_DIR
 
 
 class RuntimeCache:
@@ -26,6 +28,7 @@ class RuntimeCache:
     def __init__(self):
         self._cache = {}
         self._locks = {}
+        self._lock = Lock()
 
     def __contains__(self, key):
         return key in self._cache
@@ -40,6 +43,20 @@ class RuntimeCache:
         with self._locks[key]:
             self._cache[key] = value
 
+    def get_or_add(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return cached value or compute and add it. Value is computed only once even
+        if it is requested from multiple threads at the same time."""
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = Lock()
+            lock = self._locks[key]
+
+        with lock:
+            if key not in self._cache:
+                self._cache[key] = compute()
+
+        return self._cache[key]
+
     def clear(self) -> None:
         self._cache = {}
         self._locks = {}
@@ -47,18 +64,18 @@ class RuntimeCache:
 
 CACHE_CHECKSUM_FILE = RuntimeCache()
 
+# persistent checksum cache shared by all ETL runs and by `owid.catalog.Dataset.checksum`,
+# set OWID_CHECKSUM_CACHE to use a different file (or to an empty string to disable it)
+CHECKSUM_CACHE_FILE = os.environ.get(checksums.CHECKSUM_CACHE_ENV, (DATA_DIR / ".checksums.sqlite").as_posix())
+checksums.set_cache_path(CHECKSUM_CACHE_FILE or None)
+
+# make sure subprocesses running steps use the same cache
+os.environ[checksums.CHECKSUM_CACHE_ENV] = CHECKSUM_CACHE_FILE
+
 
 def checksum_file_nocache(filename: Union[str, Path]) -> str:
     "Return the md5 hex digest of the file without using cache."
-    chunk_size = 2**20
-    _hash = hashlib.md5()
-    with open(filename, "rb") as istream:
-        chunk = istream.read(chunk_size)
-        while chunk:
-            _hash.update(chunk)
-            chunk = istream.read(chunk_size)
-
-    return _hash.hexdigest()
+    return checksums.checksum_file_nocache(filename)
 
 
 def checksum_file(filename: Union[str, Path]) -> str:
@@ -69,12 +86,33 @@ def checksum_file(filename: Union[str, Path]) -> str:
     mtime = os.path.getmtime(filename)
     key = f"{filename}-{mtime}"
 
-    if filename not in CACHE_CHECKSUM_FILE:
-        CACHE_CHECKSUM_FILE.add(key, checksum_file_nocache(filename))
+    if key not in CACHE_CHECKSUM_FILE:
+        CACHE_CHECKSUM_FILE.add(key, checksums.checksum_file(filename))
 
     return CACHE_CHECKSUM_FILE[key]
 
 
+def clear_checksum_cache(path: Optional[Union[str, Path]] = None) -> int:
+    """Remove checksums of all files (or only of files under `path`) from the persistent
+    checksum cache and return number of removed entries."""
+    CACHE_CHECKSUM_FILE.clear()
+
+    cache = checksums.get_cache()
+    if cache is None:
+        return 0
+
+    return cache.invalidate(path)
+
+
+@click.command()
+@click.argument("path", required=False, type=click.Path())
+def clear_checksum_cache_cli(path: Optional[str]) -> None:
+    """Invalidate persistent checksum cache used for detecting dirty steps. Only
+    files under PATH are invalidated if given."""
+    n = clear_checksum_cache(path)
+    print(f"Removed {n} checksums from {CHECKSUM_CACHE_FILE}")
+
+
 def checksum_str(s: str) -> str:
     "Return the md5 hex digest of the string."
     return hashlib.md5(s.encode()).hexdigest()
@@ -1,9 +1,22 @@
 import copy
+import functools
+import itertools
 import warnings
 from copy import deepcopy
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Literal, Optional, Set, cast
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Tuple,
+    cast,
+)
 
 import jinja2
 import numpy as np
@@ -41,29 +54,77 @@ def as_table(df: pd.DataFrame, table: catalog.Table) -> catalog.Table:
     return t
 
 
-def expand_dimensions(tb: catalog.Table) -> catalog.Table:
+def expand_dimensions(tb: catalog.Table) -> "ExpandedDimensions":
     """Expands dataframe with extra dimensions beyond country and year into multiple tables.
     For instance DataFrame with index names [country, year, sex, a] would expand into a table
     with columns [country, year, a__sex_male, a__sex_female].
 
-    This function is not very memory efficient as it returns a table that will be very sparse.
+    The expanded table is very sparse, so it is not materialised. See `ExpandedDimensions` for
+    how to iterate over it or how to get the whole table.
+    """
+    return ExpandedDimensions(tb)
+
+
+class ExpandedDimensions:
+    """Table with dimensions expanded into columns by `expand_dimensions`, built lazily.
+
+    Iterating over it yields a table for every combination of dimension values with its expanded
+    columns, so that peak memory is proportional to the original table and not to the expanded one.
+    Metadata of all expanded columns is in `columns_metadata` and can be modified before iterating.
+    Method `to_table` returns the whole expanded table.
     """
-    # rename country to entity_id for the sake of `_yield_wide_table`
-    tb = tb.reset_index("country").rename(columns={"country": "entity_id"}).set_index("entity_id", append=True)
-    tables = list(_yield_wide_table(tb, na_action="drop", warn_null_variables=False))
 
-    # join all tables
-    # NOTE: we could also return individual tables to reduce memory usage
-    expanded_table = catalog.tables.concat(tables, axis=1)
+    def __init__(self, tb: catalog.Table) -> None:
+        # rename country to entity_id for the sake of `_iter_wide_slices`, without copying data
+        self._tb = cast(catalog.Table, tb.rename_axis(index={"country": "entity_id"}, copy=False))
+        self.columns_metadata: Dict[str, catalog.VariableMeta] = {
+            wide_slice.short_name: wide_slice.metadata for wide_slice in self._iter_slices()
+        }
+
+    @property
+    def columns(self) -> List[str]:
+        """Names of expanded columns."""
+        return list(self.columns_metadata)
+
+    def __iter__(self) -> Iterator[catalog.Table]:
+        for _, slices in itertools.groupby(self._iter_slices(), key=lambda wide_slice: wide_slice.dim_values):
+            yield self._join(list(slices))
+
+    def to_table(self) -> catalog.Table:
+        """Return the whole expanded table. This is not very memory efficient as the table is very sparse."""
+        return self._join(list(self._iter_slices()))
+
+    def _iter_slices(self) -> Iterator["_WideSlice"]:
+        return _iter_wide_slices(self._tb, na_action="drop", warn_null_variables=False)
+
+    def _join(self, slices: List["_WideSlice"]) -> catalog.Table:
+        tables = []
+        for wide_slice in slices:
+            wide_slice.metadata = self.columns_metadata[wide_slice.short_name]
+            tables.append(_wide_slice_to_table(wide_slice, self._tb.metadata))
+
+        # join all tables
+        expanded_table = catalog.tables.concat(tables, axis=1)
+
+        # rename entity_id back to country
+        return (
+            expanded_table.reset_index("entity_id")
+            .rename(columns={"entity_id": "country"})
+            .set_index("country", append=True)
+        )
+
 
-    # rename entity_id back to country
-    expanded_table = (
-        expanded_table.reset_index("entity_id")
-        .rename(columns={"entity_id": "country"})
-        .set_index("country", append=True)
-    )
+@dataclass
+class _WideSlice:
+    """Data points of a single grapher variable yielded by `_iter_wide_slices`. Arrays are views into
+    the table sorted by dimensions unless missing values had to be dropped."""
 
-    return expanded_table
+    short_name: str
+    dim_values: Tuple[Any, ...]
+    values: Any
+    entity_ids: Any
+    years: Any
+    metadata: catalog.VariableMeta
 
 
 def _yield_wide_table(
@@ -82,9 +143,34 @@ def _yield_wide_table(
     :param dim_titles: Custom names to use for the dimensions, if not provided, the default names will be used.
         Dimension title will be used to create variable name, e.g. `Deaths - Age: 10-18` instead of `Deaths - age: 10-18`
     """
-    table = copy.deepcopy(table)
-    table.metadata = copy.deepcopy(table.metadata)
+    for wide_slice in _iter_wide_slices(table, na_action, dim_titles, warn_null_variables):
+        yield _wide_slice_to_table(wide_slice, table.metadata)
+
+
+def _wide_slice_to_table(wide_slice: _WideSlice, table_meta: catalog.TableMeta) -> catalog.Table:
+    """Create table with a single variable indexed by entity_id and year from its data points."""
+    index = pd.MultiIndex.from_arrays([wide_slice.entity_ids, wide_slice.years], names=["entity_id", "year"])
+    tab = catalog.Table({wide_slice.short_name: wide_slice.values}, index=index)
 
+    tab.metadata = table_meta.copy()
+    tab.metadata.short_name = wide_slice.short_name
+    tab.metadata.primary_key = ["entity_id", "year"]
+    tab._fields[wide_slice.short_name] = wide_slice.metadata
+
+    return tab
+
+
+def _iter_wide_slices(
+    table: catalog.Table,
+    na_action: Literal["drop", "raise"] = "raise",
+    dim_titles: Optional[List[str]] = None,
+    warn_null_variables: bool = True,
+) -> Iterator[_WideSlice]:
+    """Split table into data points of grapher variables, see `_yield_wide_table` for details.
+
+    Rows are sorted by dimensions only once and every column is reordered only once, data of a variable
+    is then a slice of these arrays. Jinja templates in metadata are rendered once per dimension values.
+    """
     # Validation
     if "year" not in table.primary_key:
         raise Exception("Table is missing `year` primary key")
@@ -94,7 +180,7 @@ def _yield_wide_table(
         for col in table.columns:
             if table[col].isna().any():
                 raise ValueError(f"Column `{col}` contains missing values")
-    cols_with_none_units = [col for col in table.columns if table[col].metadata.unit is None]
+    cols_with_none_units = [col for col, unit in table.fields.get("unit").items() if unit is None]
     if cols_with_none_units:
         raise Exception("Columns with missing units: " + ", ".join(cols_with_none_units))
 
@@ -106,76 +192,140 @@ def _yield_wide_table(
     else:
         dim_titles = dim_names
 
-    if dim_names:
-        grouped = table.groupby(dim_names if len(dim_names) > 1 else dim_names[0], as_index=False, observed=True)
-    else:
-        # a situation when there's only year and entity_id in index with no additional dimensions
-        grouped = [([], table)]
+    order, groups = _dimension_groups(table.index, dim_names)
+
+    def _sorted(values: Any) -> Any:
+        return values if order is None else values[order]
+
+    entity_ids = _sorted(table.index.get_level_values("entity_id").values)
+    years = _sorted(table.index.get_level_values("year").values)
+    columns = {col: _sorted(table[col].values) for col in table.columns}
+    columns_isnull = {col: pd.isnull(values) for col, values in columns.items()}
+    columns_meta = {col: table._fields[col] for col in table.columns}
+
+    # rendered jinja templates by template and dimension values
+    rendered: Dict[Any, str] = {}
 
-    for dim_values, table_to_yield in grouped:
-        dim_values = [dim_values] if isinstance(dim_values, str) else dim_values
+    def _render(text: str, dim_values: Tuple[Any, ...], dim_dict: Dict[str, Any]) -> str:
+        key = (text, dim_values)
+        if key not in rendered:
+            rendered[key] = _expand_jinja_template(text, dim_dict)
+        return rendered[key]
+
+    for dim_values, start, end in groups:
+        dim_dict = dict(zip(dim_names, dim_values))
 
         # Now iterate over every column in the original dataset and export the
         # subset of data that we prepared above
-        for column in table_to_yield.columns:
+        for column, values in columns.items():
+            isnull = columns_isnull[column][start:end]
+
             # If all values are null, skip variable
-            if table_to_yield[column].isnull().all():
+            if isnull.all():
                 if warn_null_variables:
-                    log.warning("yield_wide_table.null_variable", column=column, dims=dim_values)
+                    log.warning("yield_wide_table.null_variable", column=column, dims=list(dim_values))
                 continue
 
             # Safety check to see if the metadata is still intact
-            assert (
-                table_to_yield[column].metadata.unit is not None
-            ), f"Unit for column {column} should not be None here!"
+            assert columns_meta[column].unit is not None, f"Unit for column {column} should not be None here!"
 
-            # Select only one column and dimensions for performance
-            tab = table_to_yield[[column]].copy()
-
-            # Drop NA values
-            tab = tab.dropna() if na_action == "drop" else tab
+            # Select data points of the variable, drop NA values
+            selection = slice(start, end)
+            if na_action == "drop" and isnull.any():
+                selection = np.arange(start, end)[~isnull]
 
             # Create underscored name of a new column from the combination of column and dimensions
-            short_name = _underscore_column_and_dimensions(column, dim_values, dim_names)
-
-            # set new metadata with dimensions
-            tab.metadata.short_name = short_name
-            tab = tab.rename(columns={column: short_name})
+            short_name = _underscore_column_and_dimensions(column, list(dim_values), dim_names)
+
+            # set new metadata with dimensions, with the same processing log as dropping NA values
+            # and renaming the column in a table
+            meta = columns_meta[column].copy()
+            if na_action == "drop":
+                meta.processing_log = catalog.variables.add_entry_to_processing_log(
+                    processing_log=meta.processing_log,
+                    variable_name=column,
+                    parents=[column],
+                    operation="dropna",
+                )
+            if short_name != column:
+                meta.processing_log = catalog.variables.add_entry_to_processing_log(
+                    processing_log=meta.processing_log,
+                    variable_name=short_name,
+                    parents=[column],
+                    operation="rename",
+                )
 
             # add info about dimensions to metadata
             if dim_values:
-                tab[short_name].metadata.additional_info = {
+                meta.additional_info = {
                     "dimensions": {
                         "originalShortName": column,
-                        "originalName": tab[short_name].metadata.title,
+                        "originalName": meta.title,
                         "filters": [
                             {"name": dim_name, "value": dim_value} for dim_name, dim_value in zip(dim_names, dim_values)
                         ],
                     }
                 }
 
-            dim_dict = dict(zip(dim_names, dim_values))
-
             # Add dimensions to title (which will be used as variable name in grapher)
-            if tab[short_name].metadata.title:
+            if meta.title:
                 # We use template as a title
-                if _uses_jinja(tab[short_name].metadata.title):
-                    title_with_dims = _expand_jinja_template(tab[short_name].metadata.title, dim_dict)
+                if _uses_jinja(meta.title):
+                    meta.title = _render(meta.title, dim_values, dim_dict)
                 # Otherwise use default
                 else:
-                    title_with_dims = _title_column_and_dimensions(
-                        tab[short_name].metadata.title, dim_values, dim_titles
-                    )
-
-                tab[short_name].metadata.title = title_with_dims
+                    meta.title = _title_column_and_dimensions(meta.title, list(dim_values), dim_titles)
 
             # expand metadata with Jinja template
-            tab[short_name].metadata.description = _expand_jinja_template(
-                tab[short_name].metadata.description, dim_dict
+            meta.description = _render(meta.description, dim_values, dim_dict)  # type: ignore
+
+            yield _WideSlice(
+                short_name=short_name,
+                dim_values=dim_values,
+                values=values[selection],
+                entity_ids=entity_ids[selection],
+                years=years[selection],
+                metadata=meta,
             )
 
-            # Keep only entity_id and year in index
-            yield tab.reset_index().set_index(["entity_id", "year"])[[short_name]]
+
+def _dimension_groups(
+    index: pd.Index, dim_names: List[str]
+) -> Tuple[Optional[np.ndarray], List[Tuple[Tuple[Any, ...], int, int]]]:
+    """Sort rows by dimensions and find boundaries of groups with the same dimension values.
+
+    Returns positions that sort rows by dimensions (or None if there are no dimensions) and a list of
+    (dimension values, start, end) for every group in the sorted rows. Groups are ordered and rows with
+    missing dimension values are left out like with `groupby(dim_names, observed=True)`, rows within a
+    group keep their original order.
+    """
+    if not dim_names:
+        # a situation when there's only year and entity_id in index with no additional dimensions
+        return None, [((), 0, len(index))]
+
+    codes = []
+    uniques = []
+    for dim_name in dim_names:
+        dim_codes, dim_uniques = pd.factorize(index.get_level_values(dim_name), sort=True)
+        codes.append(dim_codes)
+        uniques.append(dim_uniques.tolist())
+    codes = np.vstack(codes)
+
+    # lexsort is stable and sorts by the last key first
+    order = np.lexsort(codes[::-1])
+    order = order[(codes[:, order] >= 0).all(axis=0)]
+    sorted_codes = codes[:, order]
+
+    # group boundaries are positions where any of the dimensions changes
+    change = np.flatnonzero((sorted_codes[:, 1:] != sorted_codes[:, :-1]).any(axis=0)) + 1
+    starts = np.concatenate([[0], change]) if len(order) else np.array([], dtype=int)
+    ends = np.concatenate([change, [len(order)]]) if len(order) else np.array([], dtype=int)
+
+    groups = [
+        (tuple(dim_uniques[code] for dim_uniques, code in zip(uniques, sorted_codes[:, start])), int(start), int(end))
+        for start, end in zip(starts, ends)
+    ]
+    return order, groups
 
 
 def _uses_jinja(text: Optional[str]):
@@ -184,12 +334,17 @@ def _uses_jinja(text: Optional[str]):
     return "<%" in text or "<<" in text
 
 
+@functools.lru_cache(maxsize=1024)
+def _jinja_template(text: str) -> jinja2.Template:
+    return jinja_env.from_string(text)
+
+
 def _expand_jinja_template(text: str, dim_dict: Dict[str, str]) -> str:
     if not _uses_jinja(text) or not dim_dict:
         return text
 
     try:
-        return jinja_env.from_string(text).render(dim_dict)
+        return _jinja_template(text).render(dim_dict)
     except jinja2.exceptions.TemplateSyntaxError:
         log.warning(
             "yield_wide_table.jinja_syntax_error",
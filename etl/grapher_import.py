@@ -10,20 +10,27 @@ Usage:
 """
 
 import datetime
+import hashlib
+import json
 import os
+import time
+from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from threading import Lock
-from typing import Dict, List, Optional, cast
+from threading import BoundedSemaphore, Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, cast
 
 import pandas as pd
 import structlog
 from owid import catalog
 from owid.catalog import utils
+from sqlalchemy import bindparam
 from sqlalchemy.engine.base import Engine
 from sqlmodel import Session, select, update
 
 from apps.backport.datasync.data_metadata import (
+    _fetch_entities,
     add_entity_code_and_name,
     variable_data,
     variable_metadata,
@@ -51,10 +58,94 @@ class DatasetUpsertResult:
     source_ids: Dict[int, int]
 
 
+@dataclass
+class VariableChecksums:
+    """Checksums of data and metadata of a variable. If both match those stored in the database,
+    the variable hasn't changed and upserting it can be skipped."""
+
+    data: str
+    metadata: str
+
+
 @dataclass
 class VariableUpsertResult:
     variable_id: int
     source_id: int
+    # checksums to store after the variable got uploaded, None if it hasn't changed
+    checksums: Optional[VariableChecksums] = None
+
+
+def dataset_metadata_checksum(dataset_meta: catalog.DatasetMeta) -> str:
+    """Checksum of dataset fields that end up in metadata of its variables."""
+    d = {
+        "namespace": dataset_meta.namespace,
+        "short_name": dataset_meta.short_name,
+        "version": dataset_meta.version,
+        "title": dataset_meta.title,
+        "description": dataset_meta.description,
+        "is_public": dataset_meta.is_public,
+        "update_period_days": dataset_meta.update_period_days,
+        "sources": [source.to_dict() for source in dataset_meta.sources],
+    }
+    return hashlib.md5(json.dumps(d, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def variable_checksums(table: catalog.Table, catalog_path: Optional[str], dataset_checksum: str) -> VariableChecksums:
+    """Calculate checksums of a table with a single variable (as yielded by `_yield_wide_table`)
+    without touching the database."""
+    assert len(table.columns) == 1, "Table must have exactly one column"
+    df = table.reset_index()
+    df = df[sorted(df.columns)]
+
+    data_hash = hashlib.md5()
+    # values are uploaded as strings, so int 1 and float 1.0 are different
+    data_hash.update(str(df.dtypes.astype(str).tolist()).encode())
+    data_hash.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+    variable_meta = table.iloc[:, 0].metadata.to_dict()
+    # same as `_update_variables_display`, metadata could have been already updated by it or not
+    display = dict(variable_meta.get("display") or {})
+    if variable_meta.get("short_unit"):
+        display.setdefault("shortUnit", variable_meta["short_unit"])
+    if variable_meta.get("unit"):
+        display.setdefault("unit", variable_meta["unit"])
+    variable_meta["display"] = display
+
+    metadata = {
+        "variable": variable_meta,
+        "short_name": table.columns[0],
+        "table_short_name": table.metadata.short_name,
+        "catalog_path": catalog_path,
+        "dataset": dataset_checksum,
+    }
+    metadata_hash = hashlib.md5(json.dumps(metadata, sort_keys=True, default=str).encode())
+
+    return VariableChecksums(data=data_hash.hexdigest(), metadata=metadata_hash.hexdigest())
+
+
+def fetch_variable_checksums(
+    engine: Engine, dataset_id: int
+) -> Dict[str, Tuple[VariableUpsertResult, VariableChecksums]]:
+    """Fetch checksums of all variables of a dataset stored in the database, keyed by short name.
+    Variables without checksums (e.g. upserted by an older version of ETL) are omitted, as well as all variables
+    if the database doesn't have checksum columns yet."""
+    if not gm.variables_have_checksums(engine):
+        return {}
+
+    variables = gm.t_variables_checksums
+    q = select(
+        variables.c.shortName,
+        variables.c.id,
+        variables.c.sourceId,
+        variables.c.dataChecksum,
+        variables.c.metadataChecksum,
+    ).where(variables.c.datasetId == dataset_id)
+    with Session(engine) as session:
+        return {
+            short_name: (VariableUpsertResult(variable_id, source_id), VariableChecksums(data, metadata))
+            for short_name, variable_id, source_id, data, metadata in session.execute(q).all()  # type: ignore
+            if data and metadata
+        }
 
 
 def upsert_dataset(
@@ -183,18 +274,9 @@ def _update_variables_display(table: catalog.Table) -> None:
             meta.display.setdefault("unit", meta.unit)
 
 
-def upsert_table(
-    engine: Engine,
-    table: catalog.Table,
-    dataset_upsert_result: DatasetUpsertResult,
-    catalog_path: Optional[str] = None,
-    dimensions: Optional[gm.Dimensions] = None,
-) -> VariableUpsertResult:
-    """This function is used to put one ready to go formatted Table (i.e.
-    in the format (year, entityId, value)) into mysql. The metadata
-    of the variable is used to fill the required fields.
-    """
-
+def _validate_table(table: catalog.Table) -> catalog.Table:
+    """Make sure the table is in the format (year, entityId, value) with valid metadata and return it
+    with reordered index levels."""
     assert set(table.index.names) == {"year", "entity_id"}, (
         "Tables to be upserted must have only 2 indices: year and entity_id. Instead" f" they have: {table.index.names}"
     )
@@ -227,6 +309,39 @@ def upsert_table(
 
     assert not gh.contains_inf(table.iloc[:, 0]), f"Column `{table.columns[0]}` has inf values"
 
+    return table
+
+
+def _timespan(table: catalog.Table, variable_meta: catalog.VariableMeta) -> str:
+    # Timespan does not work for yearIsDay variables
+    if (variable_meta.display or {}).get("yearIsDay"):
+        return ""
+
+    years = table.index.unique(level="year").values
+    if len(years) == 0:
+        return ""
+
+    return f"{min(years)}-{max(years)}"
+
+
+def upsert_table(
+    engine: Engine,
+    table: catalog.Table,
+    dataset_upsert_result: DatasetUpsertResult,
+    catalog_path: Optional[str] = None,
+    dimensions: Optional[gm.Dimensions] = None,
+    checksums: Optional[VariableChecksums] = None,
+) -> VariableUpsertResult:
+    """This function is used to put one ready to go formatted Table (i.e.
+    in the format (year, entityId, value)) into mysql. The metadata
+    of the variable is used to fill the required fields.
+
+    Checksums are only returned and have to be stored with `set_variable_checksums`
+    after the upload.
+    """
+
+    table = _validate_table(table)
+
     _update_variables_display(table)
 
     with Session(engine) as session:
@@ -234,17 +349,7 @@ def upsert_table(
         column_name = table.columns[0]
         variable_meta: catalog.VariableMeta = table[column_name].metadata
 
-        # Timespan does not work for yearIsDay variables
-        if (variable_meta.display or {}).get("yearIsDay"):
-            timespan = ""
-        else:
-            years = table.index.unique(level="year").values
-            if len(years) == 0:
-                timespan = ""
-            else:
-                min_year = min(years)
-                max_year = max(years)
-                timespan = f"{min_year}-{max_year}"
+        timespan = _timespan(table, variable_meta)
 
         table.reset_index(inplace=True)
 
@@ -267,6 +372,8 @@ def upsert_table(
         db_variable_id = db_variable.id
         assert db_variable_id
 
+        _reset_variable_checksums(session, [db_variable_id])
+
         df = table.rename(columns={column_name: "value", "entity_id": "entityId"})
 
         # following functions assume that `value` is string
@@ -298,12 +405,213 @@ def upsert_table(
 
         # upload them to R2
         with ThreadPoolExecutor() as executor:
-            executor.submit(upload_gzip_dict, var_data, db_variable.s3_data_path(), r2=True)
-            executor.submit(upload_gzip_dict, var_metadata, db_variable.s3_metadata_path(), r2=True)
+            futures = [
+                executor.submit(upload_gzip_dict, var_data, db_variable.s3_data_path(), r2=True),
+                executor.submit(upload_gzip_dict, var_metadata, db_variable.s3_metadata_path(), r2=True),
+            ]
+        # raise upload errors, otherwise we'd store checksums of variables that haven't been uploaded
+        for future in futures:
+            future.result()
 
         log.info("upsert_table.uploaded_to_s3", size=len(table), variable_id=db_variable_id)
 
-        return VariableUpsertResult(db_variable_id, source_id)  # type: ignore
+        return VariableUpsertResult(db_variable_id, source_id, checksums)  # type: ignore
+
+
+class UpsertStats:
+    """Time spent and number of items processed in every stage of the pipelined upsert. Time is
+    summed over all worker threads, so throughput is per worker."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._started = time.time()
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.items: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def measure(self, stage: str, items: int = 1) -> Iterator[None]:
+        t = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.seconds[stage] += time.time() - t
+                self.items[stage] += items
+
+    def log(self) -> None:
+        for stage, seconds in self.seconds.items():
+            items = self.items[stage]
+            log.info(
+                "upsert_stats.stage",
+                stage=stage,
+                items=items,
+                seconds=round(seconds, 2),
+                items_per_second=round(items / seconds, 1) if seconds else None,
+            )
+        log.info("upsert_stats.total", seconds=round(time.time() - self._started, 2))
+
+
+class R2Uploader:
+    """Upload gzipped JSON payloads to R2 in background threads shared by all variables of a dataset.
+
+    At most `max_pending` payloads are held in memory, `submit` blocks until some of them are uploaded
+    (backpressure). The first upload error is raised from `submit` or when the uploader is closed.
+    """
+
+    def __init__(self, workers: int, max_pending: int, stats: Optional[UpsertStats] = None) -> None:
+        self.stats = stats or UpsertStats()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._slots = BoundedSemaphore(max_pending)
+        self._errors: List[BaseException] = []
+
+    def submit(self, d: Dict[str, Any], s3_path: str) -> None:
+        with self.stats.measure("upload_wait"):
+            self._slots.acquire()
+        self._raise_errors()
+        try:
+            self._executor.submit(self._upload, d, s3_path)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._raise_errors()
+
+    def _upload(self, d: Dict[str, Any], s3_path: str) -> None:
+        try:
+            with self.stats.measure("upload"):
+                upload_gzip_dict(d, s3_path, r2=True)
+        except BaseException as e:
+            self._errors.append(e)
+        finally:
+            self._slots.release()
+
+    def _raise_errors(self) -> None:
+        if self._errors:
+            raise self._errors[0]
+
+    def __enter__(self) -> "R2Uploader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if exc[0] is not None:
+            # don't wait for remaining uploads, there's an error anyway
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            self.close()
+
+
+def prefetch_entities(engine: Engine, entity_ids: Iterable[int]) -> pd.DataFrame:
+    """Fetch name and code of all entities used in a dataset with a single query."""
+    with Session(engine) as session:
+        return _fetch_entities(session, [int(e) for e in set(entity_ids)])
+
+
+def upsert_tables(
+    engine: Engine,
+    tables: List[catalog.Table],
+    dataset_upsert_result: DatasetUpsertResult,
+    uploader: R2Uploader,
+    catalog_path: Optional[str] = None,
+    entities: Optional[pd.DataFrame] = None,
+    checksums: Optional[List[VariableChecksums]] = None,
+) -> List[VariableUpsertResult]:
+    """Batched version of `upsert_table`. All variables of the batch are upserted in a single transaction
+    with multi-row statements for variables and their links. Data and metadata JSONs are sent to the shared
+    `uploader` instead of being uploaded right away.
+
+    :param entities: entities prefetched with `prefetch_entities`, they're fetched for every variable
+        if not given
+    :param checksums: checksums of variables, they're only returned and have to be stored with
+        `set_variable_checksums` after all uploads finish
+    """
+    stats = uploader.stats
+
+    with stats.measure("prepare", len(tables)):
+        tables = [_validate_table(table) for table in tables]
+        for table in tables:
+            _update_variables_display(table)
+
+    with Session(engine) as session:
+        with stats.measure("db_origins", len(tables)):
+            metas: List[catalog.VariableMeta] = [table.iloc[:, 0].metadata for table in tables]
+            source_ids = [
+                _add_or_update_source(session, meta, table.columns[0], dataset_upsert_result)
+                for meta, table in zip(metas, tables)
+            ]
+
+            # upsert every distinct origin of the batch only once
+            with origins_table_lock:
+                unique_origins = {hash(origin): origin for meta in metas for origin in meta.origins}
+                db_origins = dict(
+                    zip(unique_origins.keys(), _add_or_update_origins(session, list(unique_origins.values())))
+                )
+                # commit within the lock to make sure other threads get the latest origins
+                session.commit()
+
+        with stats.measure("db_variables", len(tables)):
+            db_variables = gm.Variable.upsert_many(
+                session,
+                [
+                    gm.Variable.from_variable_metadata(
+                        meta,
+                        short_name=table.columns[0],
+                        timespan=_timespan(table, meta),
+                        dataset_id=dataset_upsert_result.dataset_id,
+                        source_id=source_id,
+                        catalog_path=catalog_path,
+                        dimensions=(meta.additional_info or {}).get("dimensions"),
+                    )
+                    for meta, table, source_id in zip(metas, tables, source_ids)
+                ],
+            )
+            variable_ids = [cast(int, v.id) for v in db_variables]
+            _reset_variable_checksums(session, variable_ids)
+
+            # replace all previous relationships
+            gm.Variable.delete_links_many(session, variable_ids)
+            gm.Variable.create_links_many(
+                session,
+                [
+                    (
+                        db_variable,
+                        [db_origins[hash(origin)] for origin in meta.origins],
+                        meta.presentation.faqs if meta.presentation else [],
+                        meta.presentation.topic_tags if meta.presentation else [],
+                    )
+                    for db_variable, meta in zip(db_variables, metas)
+                ],
+            )
+
+            s3_paths = [(v.s3_data_path(), v.s3_metadata_path()) for v in db_variables]
+
+            # we need to commit changes because we use SQL command in `variable_metadata`
+            session.commit()
+
+        results = []
+        for table, db_variable_id, source_id, (data_path, metadata_path), variable_checksums in zip(
+            tables, variable_ids, source_ids, s3_paths, checksums or [None] * len(tables)
+        ):
+            with stats.measure("json"):
+                column_name = table.columns[0]
+                df = table.reset_index().rename(columns={column_name: "value", "entity_id": "entityId"})
+
+                # following functions assume that `value` is string
+                df["value"] = df["value"].astype(str)
+                df = add_entity_code_and_name(session, df, entities)
+
+                var_data = variable_data(df)
+                var_metadata = variable_metadata(session, db_variable_id, df)
+
+            uploader.submit(var_data, data_path)
+            uploader.submit(var_metadata, metadata_path)
+
+            results.append(VariableUpsertResult(db_variable_id, source_id, variable_checksums))  # type: ignore
+
+        log.info("upsert_tables.upserted", variables=len(results), catalog_path=catalog_path)
+
+        return results
 
 
 def fetch_db_checksum(dataset: catalog.Dataset) -> Optional[str]:
@@ -340,6 +648,39 @@ def set_dataset_checksum_and_editedAt(dataset_id: int, checksum: str) -> None:
         session.commit()
 
 
+def _reset_variable_checksums(session: Session, variable_ids: List[int]) -> None:
+    """Remove checksums of variables that are being upserted. They are stored again only after their data gets
+    uploaded, so that variables of an interrupted run are upserted again by the next one."""
+    if not variable_ids or not gm.variables_have_checksums(session.get_bind()):  # type: ignore
+        return
+
+    variables = gm.t_variables_checksums
+    q = update(variables).where(variables.c.id.in_(variable_ids)).values(dataChecksum=None, metadataChecksum=None)
+    session.execute(q)  # type: ignore
+
+
+def set_variable_checksums(engine: Engine, variable_upsert_results: List[VariableUpsertResult]) -> None:
+    """Store checksums of upserted variables with a single statement. Nothing is stored if the database
+    doesn't have checksum columns yet."""
+    rows = [
+        {"_id": r.variable_id, "_data": r.checksums.data, "_metadata": r.checksums.metadata}
+        for r in variable_upsert_results
+        if r.checksums
+    ]
+    if not rows or not gm.variables_have_checksums(engine):
+        return
+
+    variables = gm.t_variables_checksums
+    q = (
+        update(variables)
+        .where(variables.c.id == bindparam("_id"))
+        .values(dataChecksum=bindparam("_data"), metadataChecksum=bindparam("_metadata"))
+    )
+    with Session(engine) as session:
+        session.execute(q, rows)  # type: ignore
+        session.commit()
+
+
 def cleanup_ghost_variables(dataset_id: int, upserted_variable_ids: List[int]) -> None:
     """Remove all leftover variables that didn't get upserted into DB during grapher step.
     This could happen when you rename or delete a variable in ETL.
@@ -6,7 +6,7 @@ It has been slightly modified since then.
 """
 import json
 from datetime import date, datetime
-from typing import Annotated, Any, Dict, List, Optional, TypedDict
+from typing import Annotated, Any, Dict, List, Optional, Set, Tuple, TypedDict
 from urllib.parse import quote
 
 import humps
@@ -22,6 +22,10 @@ from sqlalchemy import (
     Integer,
     String,
     Table,
+    column,
+    insert,
+    inspect,
+    table,
     text,
 )
 from sqlalchemy.dialects.mysql import (
@@ -32,6 +36,7 @@ from sqlalchemy.dialects.mysql import (
     TINYINT,
     VARCHAR,
 )
+from sqlalchemy.engine import Engine
 from sqlalchemy.future import Engine as _FutureEngine
 from sqlmodel import JSON as _JSON
 from sqlmodel import (
@@ -872,41 +877,7 @@ class Variable(SQLModel, table=True):
         if not ds:
             ds = self
         else:
-            ds.shortName = self.shortName
-            ds.name = self.name
-            ds.description = self.description
-            ds.unit = self.unit
-            ds.shortUnit = self.shortUnit
-            ds.sourceId = self.sourceId
-            ds.timespan = self.timespan
-            ds.coverage = self.coverage
-            ds.display = self.display
-            ds.catalogPath = self.catalogPath
-            ds.dimensions = self.dimensions
-            ds.schemaVersion = self.schemaVersion
-            ds.processingLevel = self.processingLevel
-            ds.processingLog = self.processingLog
-            ds.titlePublic = self.titlePublic
-            ds.titleVariant = self.titleVariant
-            ds.attributionShort = self.attributionShort
-            ds.attribution = self.attribution
-            ds.descriptionShort = self.descriptionShort
-            ds.descriptionFromProducer = self.descriptionFromProducer
-            ds.descriptionKey = self.descriptionKey
-            ds.descriptionProcessing = self.descriptionProcessing
-            ds.licenses = self.licenses
-            ds.license = self.license
-            ds.updatedAt = datetime.utcnow()
-            # do not update these fields unless they're specified
-            if self.columnOrder is not None:
-                ds.columnOrder = self.columnOrder
-            if self.code is not None:
-                ds.code = self.code
-            if self.originalMetadata is not None:
-                ds.originalMetadata = self.originalMetadata
-            if self.grapherConfigETL is not None:
-                ds.grapherConfigETL = self.grapherConfigETL
-            assert self.grapherConfigAdmin is None, "grapherConfigETL should be used instead of grapherConfigAdmin"
+            ds._update_from(self)
 
         session.add(ds)
 
@@ -917,6 +888,93 @@ class Variable(SQLModel, table=True):
         )
         return session.exec(q).one()
 
+    def _update_from(self, other: "Variable") -> None:
+        """Update fields of an existing variable with values from `other`."""
+        self.shortName = other.shortName
+        self.name = other.name
+        self.description = other.description
+        self.unit = other.unit
+        self.shortUnit = other.shortUnit
+        self.sourceId = other.sourceId
+        self.timespan = other.timespan
+        self.coverage = other.coverage
+        self.display = other.display
+        self.catalogPath = other.catalogPath
+        self.dimensions = other.dimensions
+        self.schemaVersion = other.schemaVersion
+        self.processingLevel = other.processingLevel
+        self.processingLog = other.processingLog
+        self.titlePublic = other.titlePublic
+        self.titleVariant = other.titleVariant
+        self.attributionShort = other.attributionShort
+        self.attribution = other.attribution
+        self.descriptionShort = other.descriptionShort
+        self.descriptionFromProducer = other.descriptionFromProducer
+        self.descriptionKey = other.descriptionKey
+        self.descriptionProcessing = other.descriptionProcessing
+        self.licenses = other.licenses
+        self.license = other.license
+        self.updatedAt = datetime.utcnow()
+        # do not update these fields unless they're specified
+        if other.columnOrder is not None:
+            self.columnOrder = other.columnOrder
+        if other.code is not None:
+            self.code = other.code
+        if other.originalMetadata is not None:
+            self.originalMetadata = other.originalMetadata
+        if other.grapherConfigETL is not None:
+            self.grapherConfigETL = other.grapherConfigETL
+        assert other.grapherConfigAdmin is None, "grapherConfigETL should be used instead of grapherConfigAdmin"
+
+    @classmethod
+    def upsert_many(cls, session: Session, variables: List["Variable"]) -> List["Variable"]:
+        """Upsert multiple variables of the same dataset with a single query for existing variables
+        and a single flush. Variables are matched the same way as in `upsert`."""
+        if not variables:
+            return []
+
+        dataset_ids = {v.datasetId for v in variables}
+        assert len(dataset_ids) == 1, "All variables must belong to the same dataset"
+
+        short_names = [v.shortName for v in variables if v.shortName]
+        assert len(short_names) == len(variables), "All variables must have a shortName"
+        names = [v.name for v in variables if v.name is not None]
+
+        q = select(cls).where(
+            cls.datasetId == dataset_ids.pop(),
+            or_(
+                cls.shortName.in_(short_names + [n.replace("__", "_") for n in short_names]),  # type: ignore
+                cls.name.in_(names),  # type: ignore
+            ),
+        )
+        existing = session.exec(q).all()
+        by_short_name = {v.shortName: v for v in existing}
+        by_name = {v.name: v for v in existing}
+
+        out = []
+        # ids of existing rows already matched in this batch, e.g. a row renamed for one variable can't be
+        # updated by another one using its old shortName (`upsert` would create a new row for it)
+        claimed: Set[int] = set()
+        for variable in variables:
+            assert variable.shortName
+            candidates = [
+                by_short_name.get(variable.shortName),
+                by_short_name.get(variable.shortName.replace("__", "_")),
+                by_name.get(variable.name),
+            ]
+            ds = next((c for c in candidates if c is not None and c.id not in claimed), None)
+            if not ds:
+                ds = variable
+            else:
+                claimed.add(ds.id)  # type: ignore
+                ds._update_from(variable)
+            session.add(ds)
+            out.append(ds)
+
+        # flush to get ids of new variables
+        session.flush()
+        return out
+
     @classmethod
     def from_variable_metadata(
         cls,
@@ -1042,6 +1100,65 @@ class Variable(SQLModel, table=True):
 
             session.add_all([TagsVariablesTopicTagsLink(tagId=tag.id, variableId=self.id) for tag in tags])  # type: ignore
 
+    @classmethod
+    def delete_links_many(cls, session: Session, variable_ids: List[int]) -> None:
+        """Same as `delete_links`, but for multiple variables at once."""
+        for link_model in (OriginsVariablesLink, PostsGdocsVariablesFaqsLink, TagsVariablesTopicTagsLink):
+            session.query(link_model).filter(link_model.variableId.in_(variable_ids)).delete(  # type: ignore
+                synchronize_session=False
+            )
+
+    @classmethod
+    def create_links_many(
+        cls,
+        session: Session,
+        links: List[Tuple["Variable", List["Origin"], List[catalog.FaqLink], List[str]]],
+    ) -> None:
+        """Same as `create_links`, but for multiple variables at once. Posts and tags are fetched
+        with a single query and links are inserted with multi-row inserts."""
+        required_gdoc_ids = {faq.gdoc_id for _, _, faqs, _ in links for faq in faqs}
+        if required_gdoc_ids:
+            statement = select(PostsGdocs.id).where(PostsGdocs.id.in_(required_gdoc_ids))  # type: ignore
+            existing_gdoc_ids = set(session.exec(statement).all())
+            missing_gdoc_ids = required_gdoc_ids - existing_gdoc_ids
+            if missing_gdoc_ids:
+                log.warning("create_links.missing_faqs", missing_gdoc_ids=missing_gdoc_ids)
+        else:
+            existing_gdoc_ids = set()
+
+        required_tag_names = {tag_name for _, _, _, tag_names in links for tag_name in tag_names}
+        if required_tag_names:
+            tags = session.exec(select(Tag).where(Tag.name.in_(required_tag_names))).all()  # type: ignore
+            tag_ids = {tag.name: tag.id for tag in tags}
+            missing_tags = required_tag_names - set(tag_ids)
+            if missing_tags:
+                log.warning("create_links.missing_tags", tags=sorted(missing_tags))
+        else:
+            tag_ids = {}
+
+        origin_rows = []
+        faq_rows = []
+        tag_rows = []
+        for variable, db_origins, faqs, tag_names in links:
+            assert variable.id
+            origin_rows += [{"originId": db_origin.id, "variableId": variable.id} for db_origin in db_origins]
+            faq_rows += [
+                {"gdocId": faq.gdoc_id, "variableId": variable.id, "fragmentId": faq.fragment_id}
+                for faq in faqs
+                if faq.gdoc_id in existing_gdoc_ids
+            ]
+            tag_rows += [
+                {"tagId": tag_ids[tag_name], "variableId": variable.id} for tag_name in tag_names if tag_name in tag_ids
+            ]
+
+        for link_model, rows in (
+            (OriginsVariablesLink, origin_rows),
+            (PostsGdocsVariablesFaqsLink, faq_rows),
+            (TagsVariablesTopicTagsLink, tag_rows),
+        ):
+            if rows:
+                session.execute(insert(link_model.__table__), rows)  # type: ignore
+
     def s3_data_path(self) -> str:
         """Path to S3 with data in JSON format for Grapher. Typically
         s3://owid-api/v1/indicators/123.data.json."""
@@ -1053,6 +1170,34 @@ class Variable(SQLModel, table=True):
         return f"{config.BAKED_VARIABLES_PATH}/{self.id}.metadata.json"
 
 
+# Checksums of data and metadata of variables used to skip upserting unchanged variables. They are not
+# fields of `Variable`, because older grapher databases don't have these columns and every query selecting
+# `Variable` would fail on them. Check `variables_have_checksums` before using them.
+t_variables_checksums = table(
+    "variables",
+    column("id", Integer),
+    column("datasetId", Integer),
+    column("shortName", String),
+    column("sourceId", Integer),
+    column("dataChecksum", VARCHAR(64)),
+    column("metadataChecksum", VARCHAR(64)),
+)
+
+_VARIABLES_HAVE_CHECKSUMS: Dict[str, bool] = {}
+
+
+def variables_have_checksums(engine: Engine) -> bool:
+    """Return True if the variables table has dataChecksum and metadataChecksum columns. The result is
+    cached for every database."""
+    key = str(engine.url)
+    if key not in _VARIABLES_HAVE_CHECKSUMS:
+        columns = {c["name"] for c in inspect(engine).get_columns("variables")}
+        _VARIABLES_HAVE_CHECKSUMS[key] = {"dataChecksum", "metadataChecksum"} <= columns
+        if not _VARIABLES_HAVE_CHECKSUMS[key]:
+            log.warning("variables_have_checksums.missing_columns", columns=["dataChecksum", "metadataChecksum"])
+    return _VARIABLES_HAVE_CHECKSUMS[key]
+
+
 class ChartDimensions(SQLModel, table=True):
     __tablename__: str = "chart_dimensions"
     __table_args__ = (
@@ -9,7 +9,18 @@ import tempfile
 from collections.abc import Generator
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union, cast
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Union,
+    cast,
+)
 from urllib.parse import urljoin
 
 import jsonref
@@ -32,7 +43,7 @@ from owid.walden import Dataset as WaldenDataset
 
 from etl import paths
 from etl.snapshot import Snapshot, SnapshotMeta
-from etl.steps import extract_step_attributes, load_dag, reverse_graph
+from etl.steps import extract_step_attributes, graph_nodes, load_dag, reverse_graph
 
 log = structlog.get_logger()
 
@@ -585,6 +596,74 @@ class PathFinder:
         return deps[0].replace("etag://", "https://")
 
 
+class DAGIndex:
+    """Index of a dag for answering dependency questions without scanning the whole dag.
+
+    Adjacency and reverse adjacency maps are built once, transitive dependencies and usages of a step are computed
+    on first request and memoised, so that shared parts of the dag are only explored once.
+
+    Parameters
+    ----------
+    dag : Dict[str, Any]
+        Dag.
+
+    """
+
+    def __init__(self, dag: Dict[str, Any]):
+        self.dependencies: Dict[str, Set[str]] = {step: set(dag[step]) for step in dag}
+        self.usages: Dict[str, Set[str]] = reverse_graph(graph=self.dependencies)
+        self.steps = sorted(self.usages)
+        self._all_dependencies: Dict[str, FrozenSet[str]] = {}
+        self._all_usages: Dict[str, FrozenSet[str]] = {}
+
+    def get_direct_dependencies(self, step: str) -> Set[str]:
+        return self.dependencies[step]
+
+    def get_direct_usages(self, step: str) -> Set[str]:
+        return set(self.usages.get(step, set()))
+
+    def get_all_dependencies(self, step: str) -> Set[str]:
+        return set(_transitive_closure(self.dependencies, step, self._all_dependencies))
+
+    def get_all_usages(self, step: str) -> Set[str]:
+        return set(_transitive_closure(self.usages, step, self._all_usages))
+
+    def get_all_dependencies_of_steps(self, steps: Iterable[str]) -> Set[str]:
+        """Get union of all dependencies of the given steps with a single traversal of the dag."""
+        visited: Set[str] = set()
+        stack = [dep for step in steps for dep in self.dependencies.get(step, set())]
+        while stack:
+            step = stack.pop()
+            if step not in visited:
+                visited.add(step)
+                stack.extend(self.dependencies.get(step, set()))
+
+        return visited
+
+
+def _transitive_closure(graph: Dict[str, Set[str]], step: str, memo: Dict[str, FrozenSet[str]]) -> FrozenSet[str]:
+    # Iterative depth-first search, so that long chains of steps do not hit the recursion limit. The closure of each
+    # visited step is stored in memo once the closures of all its children are known.
+    stack = [step]
+    while stack:
+        node = stack[-1]
+        if node in memo:
+            stack.pop()
+            continue
+        pending = [child for child in graph.get(node, set()) if child not in memo]
+        if pending:
+            stack.extend(pending)
+            continue
+        closure: Set[str] = set()
+        for child in graph.get(node, set()):
+            closure.add(child)
+            closure |= memo[child]
+        memo[node] = frozenset(closure)
+        stack.pop()
+
+    return memo[step]
+
+
 def list_all_steps_in_dag(dag: Dict[str, Any]) -> List[str]:
     """List all steps in a dag.
 
@@ -599,7 +678,7 @@ def list_all_steps_in_dag(dag: Dict[str, Any]) -> List[str]:
         List of steps in dag.
 
     """
-    all_steps = sorted(set([step for step in dag] + sum([list(dag[step]) for step in dag], [])))
+    all_steps = sorted(graph_nodes(dag))
 
     return all_steps
 
@@ -651,32 +730,14 @@ def get_direct_usages_for_step_in_dag(dag: Dict[str, Any], step: str) -> Set[str
     return used_by
 
 
-def _recursive_get_all_dependencies_for_step_in_dag(
-    dag: Dict[str, Any], step: str, dependencies: Set[str] = set()
-) -> Set[str]:
-    if step in dag:
-        # If step is in the dag, gather all its substeps.
-        substeps = dag[step]
-        # Add substeps to the set of dependencies (union of sets, to avoid repetitions).
-        dependencies = dependencies | set(substeps)
-        for substep in substeps:
-            # For each of the substeps, repeat the process.
-            dependencies = dependencies | _recursive_get_all_dependencies_for_step_in_dag(
-                dag, step=substep, dependencies=dependencies
-            )
-    else:
-        # If step is not in the dag, return the default dependencies (which is an empty set).
-        pass
-
-    return dependencies
-
-
 def get_all_dependencies_for_step_in_dag(dag: Dict[str, Any], step: str) -> Set[str]:
     """Get all dependencies for a given step in a dag.
 
     This function returns all dependencies of a step, as well as their direct dependencies, and so on. In the end, the
     result contains all datasets that the given step depends on, directly or indirectly.
 
+    For repeated queries on the same dag, use `DAGIndex` instead.
+
     Parameters
     ----------
     dag : Dict[str, Any]
@@ -689,7 +750,7 @@ def get_all_dependencies_for_step_in_dag(dag: Dict[str, Any], step: str) -> Set[
     dependencies : Set[str]
         All dependencies of a given step in a dag.
     """
-    dependencies = _recursive_get_all_dependencies_for_step_in_dag(dag=dag, step=step)
+    dependencies = DAGIndex(dag).get_all_dependencies(step)
 
     return dependencies
 
@@ -701,6 +762,8 @@ def get_all_usages_for_step_in_dag(dag: Dict[str, Any], step: str) -> Set[str]:
     are also dependencies, and so on. In the end, the result contains all datasets that use, directly or indirectly, the
     given step.
 
+    For repeated queries on the same dag, use `DAGIndex` instead.
+
     Parameters
     ----------
     dag : Dict[str, Any]
@@ -714,10 +777,7 @@ def get_all_usages_for_step_in_dag(dag: Dict[str, Any], step: str) -> Set[str]:
         All usages of a given step in a dag.
 
     """
-    # A simple solution is to simply reverse the graph, and apply the already existing function that finds all
-    # dependencies.
-    reverse_dag = reverse_graph(graph=dag)
-    dependencies = get_all_dependencies_for_step_in_dag(dag=reverse_dag, step=step)
+    dependencies = DAGIndex(dag).get_all_usages(step)
 
     return dependencies
 
@@ -748,8 +808,10 @@ class VersionTracker:
         self.dag_active = load_dag(paths.DAG_FILE)
         # Generate the dag of only archive steps.
         self.dag_archive = {step: self.dag_all[step] for step in self.dag_all if step not in self.dag_active}
+        # Index of the dag of active and archive steps, used to answer all dependency questions.
+        self.graph = DAGIndex(self.dag_all)
         # List all unique steps that exist in the dag.
-        self.all_steps = list_all_steps_in_dag(self.dag_all)
+        self.all_steps = self.graph.steps
         # List all unique active steps.
         self.all_active_steps = list_all_steps_in_dag(self.dag_active)
         # List all steps that are dependencies of active steps.
@@ -765,30 +827,28 @@ class VersionTracker:
         # TODO: Another useful method would be to find in which dag file each step is (by yaml opening each file).
 
     def get_direct_dependencies_for_step(self, step: str) -> Set[str]:
-        dependencies = get_direct_dependencies_for_step_in_dag(dag=self.dag_all, step=step)
+        dependencies = self.graph.get_direct_dependencies(step=step)
 
         return dependencies
 
     def get_direct_usages_for_step(self, step: str) -> Set[str]:
-        dependencies = get_direct_usages_for_step_in_dag(dag=self.dag_all, step=step)
+        dependencies = self.graph.get_direct_usages(step=step)
 
         return dependencies
 
     def get_all_dependencies_for_step(self, step: str) -> Set[str]:
-        dependencies = get_all_dependencies_for_step_in_dag(dag=self.dag_all, step=step)
+        dependencies = self.graph.get_all_dependencies(step=step)
 
         return dependencies
 
     def get_all_usages_for_step(self, step: str) -> Set[str]:
-        dependencies = get_all_usages_for_step_in_dag(dag=self.dag_all, step=step)
+        dependencies = self.graph.get_all_usages(step=step)
 
         return dependencies
 
     def get_all_dependencies_of_active_steps(self) -> Set[str]:
         # Gather all dependencies of active steps in the dag.
-        active_dependencies = set()
-        for step in self.dag_active:
-            active_dependencies = active_dependencies | self.get_all_dependencies_for_step(step=step)
+        active_dependencies = self.graph.get_all_dependencies_of_steps(self.dag_active)
 
         return active_dependencies
 
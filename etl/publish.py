@@ -4,6 +4,7 @@
 #
 
 import concurrent.futures
+import json
 import re
 import sys
 from collections.abc import Iterable
@@ -16,6 +17,7 @@ from urllib.error import HTTPError
 import boto3
 import click
 import pandas as pd
+from boto3.s3.transfer import TransferConfig
 from botocore.client import ClientError
 from botocore.config import Config
 from owid.catalog import CHANNEL, LocalCatalog
@@ -28,6 +30,10 @@ from etl.paths import DATA_DIR
 config.enable_bugsnag()
 
 
+# files bigger than this are uploaded in parts of this size
+MULTIPART_THRESHOLD = 64 * 2**20
+
+
 class CannotPublish(Exception):
     pass
 
@@ -44,7 +50,16 @@ class CannotPublish(Exception):
     default=CHANNEL.__args__,
     help="Publish only selected channel (subfolder of data/), push all by default",
 )
-def publish_cli(dry_run: bool, private: bool, bucket: str, channel: Iterable[CHANNEL]) -> None:
+@click.option(
+    "--manifest",
+    is_flag=True,
+    default=False,
+    help="Diff against manifest of the last sync instead of listing S3 and upload all datasets in parallel",
+)
+@click.option("--workers", type=int, default=20, help="Number of parallel uploads with --manifest")
+def publish_cli(
+    dry_run: bool, private: bool, bucket: str, channel: Iterable[CHANNEL], manifest: bool, workers: int
+) -> None:
     """
     Publish the generated data catalog to S3.
     """
@@ -53,6 +68,8 @@ def publish_cli(dry_run: bool, private: bool, bucket: str, channel: Iterable[CHA
         private=private,
         bucket=bucket,
         channel=channel,
+        manifest=manifest,
+        workers=workers,
     )
 
 
@@ -61,6 +78,8 @@ def publish(
     private: bool = False,
     bucket: str = config.S3_BUCKET,
     channel: Iterable[CHANNEL] = CHANNEL.__args__,
+    manifest: bool = False,
+    workers: int = 20,
 ) -> None:
     catalog = Path(DATA_DIR)
     if not dry_run and not private:
@@ -71,7 +90,10 @@ def publish(
         sanity_checks(catalog, channel=c)
 
     for c in channel:
-        sync_catalog_to_s3(bucket, catalog, channel=c, dry_run=dry_run)
+        if manifest:
+            sync_catalog_to_s3_with_manifest(bucket, catalog, channel=c, dry_run=dry_run, workers=workers)
+        else:
+            sync_catalog_to_s3(bucket, catalog, channel=c, dry_run=dry_run)
 
 
 def sanity_checks(catalog: Path, channel: CHANNEL) -> None:
@@ -197,6 +219,146 @@ def sync_folder(
         concurrent.futures.wait(futures)
 
 
+def sync_catalog_to_s3_with_manifest(
+    bucket: str,
+    catalog: Path,
+    channel: CHANNEL,
+    dry_run: bool = False,
+    workers: int = 20,
+    s3: Any = None,
+) -> None:
+    """
+    Content-based sync of a channel using a manifest with md5, size and visibility of every published file
+    instead of listing S3 and asking for checksums of objects.
+
+    The manifest of the last successful sync is kept locally and is only downloaded from S3 if it
+    differs from the remote one (e.g. when someone else published in the meantime). Changed files
+    of all datasets are uploaded by a shared thread pool and the remote manifest is written last.
+    If there's no manifest yet, all files are uploaded, but objects not created by this sync are
+    never deleted.
+    """
+    s3 = s3 or connect_s3()
+    if is_catalog_up_to_date(s3, bucket, catalog, channel):
+        print(f"Catalog's channel {channel} is up to date!")
+        return
+
+    manifest_key = _manifest_path(channel).as_posix()
+    local_manifest_file = catalog / ".publish" / bucket / _manifest_path(channel)
+
+    published = load_manifest(s3, bucket, manifest_key, local_manifest_file)
+    local = local_manifest(catalog, channel)
+
+    to_upload = [path for path, entry in local.items() if published.get(path) != entry]
+    to_delete = [path for path in published if path not in local]
+
+    print(f"Syncing channel {channel}: {len(to_upload)} files to upload, {len(to_delete)} files to delete")
+    if dry_run:
+        for path in to_upload:
+            print("  PUT", path)
+        for path in to_delete:
+            print("  DEL", path)
+        return
+
+    # big files are uploaded in parts by the transfer manager
+    transfer_config = TransferConfig(multipart_threshold=MULTIPART_THRESHOLD, multipart_chunksize=MULTIPART_THRESHOLD)
+
+    errors = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for path in to_upload:
+            ExtraArgs: Dict[str, Any] = {"Metadata": {"md5": local[path]["md5"]}}
+            if local[path]["public"]:
+                ExtraArgs["ACL"] = "public-read"
+            future = executor.submit(
+                s3.upload_file, (catalog / path).as_posix(), bucket, path, ExtraArgs=ExtraArgs, Config=transfer_config
+            )
+            futures[future] = path
+
+        for future in concurrent.futures.as_completed(futures):
+            path = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                print(f"ERROR: failed to upload {path}: {e}", file=sys.stderr)
+                errors.append(path)
+            else:
+                published[path] = local[path]
+
+    for chunk_start in range(0, len(to_delete), 1000):
+        chunk = to_delete[chunk_start : chunk_start + 1000]
+        response = s3.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+        )
+        # failed deletes stay in the manifest, so that the next sync retries them
+        failed = set()
+        for error in response.get("Errors", []):
+            print(f"ERROR: failed to delete {error['Key']}: {error.get('Message')}", file=sys.stderr)
+            failed.add(error["Key"])
+        errors.extend(failed)
+        for path in chunk:
+            if path not in failed:
+                del published[path]
+
+    save_manifest(local_manifest_file, published)
+
+    if errors:
+        # the manifest reflects what is in S3 even after a failure, upload it so that the next sync
+        # only retries failed files
+        _upload_manifest(s3, bucket, manifest_key, local_manifest_file)
+        raise CannotPublish(f"Failed to upload or delete {len(errors)} files, run publish again to retry")
+
+    update_catalog(s3, bucket, catalog, channel)
+
+    # manifest is written last, index files and data files are already up to date
+    _upload_manifest(s3, bucket, manifest_key, local_manifest_file)
+
+
+def local_manifest(catalog: Path, channel: CHANNEL) -> Dict[str, Dict[str, Any]]:
+    """Return md5, size and visibility of all files of datasets from given channel. Checksums are cached
+    in the persistent checksum cache, so only modified files are hashed again."""
+    manifest = {}
+    for ds in LocalCatalog(catalog).iter_datasets(channel):
+        # ignore datasets with no tables
+        if len(ds._data_files) == 0:
+            continue
+
+        for filename in files.walk(Path(ds.path)):
+            manifest[filename.relative_to(catalog).as_posix()] = {
+                "md5": files.checksum_file(filename),
+                "size": filename.stat().st_size,
+                "public": ds.metadata.is_public,
+            }
+    return manifest
+
+
+def load_manifest(s3: Any, bucket: str, key: str, local_file: Path) -> Dict[str, Dict[str, Any]]:
+    """Load manifest of published files. The local copy is used if it is the same as the remote one,
+    otherwise the remote manifest is downloaded. Return empty manifest if there's none in S3."""
+    remote_checksum = get_remote_checksum(s3, bucket, key)
+    if remote_checksum is None:
+        return {}
+
+    if not local_file.exists() or files.checksum_file(local_file) != remote_checksum:
+        local_file.parent.mkdir(parents=True, exist_ok=True)
+        s3.download_file(bucket, key, local_file.as_posix())
+
+    with open(local_file) as f:
+        return cast(Dict[str, Dict[str, Any]], json.load(f))
+
+
+def save_manifest(local_file: Path, manifest: Dict[str, Dict[str, Any]]) -> None:
+    local_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(local_file, "w") as f:
+        json.dump(manifest, f, sort_keys=True)
+
+
+def _upload_manifest(s3: Any, bucket: str, key: str, local_file: Path) -> None:
+    # use put_object to make sure ETag is md5 of the manifest and can be compared with the local copy
+    with open(local_file, "rb") as f:
+        s3.put_object(Bucket=bucket, Key=key, Body=f.read(), ContentType="application/json")
+
+
 def object_md5(s3: Any, bucket: str, key: str, obj: Dict[str, Any]) -> Optional[str]:
     maybe_md5 = obj["ETag"].strip('"')
     if re.match("^[0-9a-f]{32}$", maybe_md5):
@@ -315,6 +477,10 @@ def _channel_path(channel: CHANNEL, format: FileFormat) -> Path:
     return Path(f"catalog-{channel}.{format}")
 
 
+def _manifest_path(channel: CHANNEL) -> Path:
+    return Path(f"catalog-{channel}.manifest.json")
+
+
 def read_frame(uri: str) -> pd.DataFrame:
     if uri.endswith(".feather"):
         return cast(pd.DataFrame, pd.read_feather(uri))
@@ -9,6 +9,7 @@ from typing import Optional
 
 import click
 from owid.catalog import CHANNEL, LocalCatalog
+from owid.catalog.catalogs import REINDEX_WORKERS
 
 from etl import config
 from etl.paths import DATA_DIR
@@ -30,12 +31,18 @@ config.enable_bugsnag()
     type=str,
     help="Reindex only datasets matching pattern",
 )
-def reindex_cli(channel: Iterable[CHANNEL], include: Optional[str]) -> None:
-    return reindex(channel=channel, include=include)
+@click.option(
+    "--workers",
+    type=int,
+    default=REINDEX_WORKERS,
+    help="Number of threads used for indexing changed datasets",
+)
+def reindex_cli(channel: Iterable[CHANNEL], include: Optional[str], workers: int) -> None:
+    return reindex(channel=channel, include=include, workers=workers)
 
 
-def reindex(channel: Iterable[CHANNEL], include: Optional[str] = None) -> None:
-    LocalCatalog(Path(DATA_DIR), channels=channel).reindex(include=include)
+def reindex(channel: Iterable[CHANNEL], include: Optional[str] = None, workers: int = REINDEX_WORKERS) -> None:
+    LocalCatalog(Path(DATA_DIR), channels=channel).reindex(include=include, workers=workers)
 
 
 if __name__ == "__main__":
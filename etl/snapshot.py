@@ -1,11 +1,12 @@
 import datetime as dt
 import json
+import os
 import re
 from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from threading import Lock
-from typing import Any, Dict, Iterator, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 import owid.catalog.processing as pr
 import pandas as pd
@@ -27,7 +28,7 @@ from tenacity.retry import retry_if_exception_type
 from tenacity.stop import stop_after_attempt
 
 from etl import paths
-from etl.files import yaml_dump
+from etl.files import CACHE_CHECKSUM_FILE, checksum_file, yaml_dump
 
 dvc = None
 
@@ -415,28 +416,114 @@ def snapshot_catalog(match: str = r".*") -> Iterator[Snapshot]:
             yield Snapshot(uri)
 
 
+@dataclass(frozen=True)
+class _DVCOut:
+    # local path of the file tracked by DVC
+    path: Path
+    md5: str
+    size: Optional[int]
+    # hash algorithm written by DVC 3 (`md5`), DVC 2 doesn't write it and normalizes line endings
+    hash: Optional[str] = None
+
+
+def _read_dvc_outs(dvc_path: Union[str, Path]) -> List[_DVCOut]:
+    """Read outputs of a .dvc file. Only the part with `wdir` and `outs` is parsed, metadata of
+    snapshots can be long and parsing YAML is slow."""
+    dvc_path = Path(dvc_path)
+    s = dvc_path.read_text()
+    match = re.search(r"^(wdir|outs):", s, flags=re.MULTILINE)
+    if not match:
+        return []
+    d = yaml.safe_load(s[match.start() :]) or {}
+    wdir = dvc_path.parent / d.get("wdir", ".")
+    return [
+        _DVCOut(
+            path=Path(os.path.normpath(wdir / out["path"])),
+            md5=out["md5"],
+            size=out.get("size"),
+            hash=out.get("hash"),
+        )
+        for out in d.get("outs") or []
+    ]
+
+
+def is_snapshot_dirty(dvc_path: Union[str, Path]) -> bool:
+    """Return True if any file tracked by the .dvc file is missing locally or has a different
+    checksum. Unlike `dvc status`, this does not instantiate DVC repository and uses persistent
+    checksum cache (keyed by mtime), so it is cheap and can be called from multiple threads."""
+    for out in _read_dvc_outs(dvc_path):
+        if out.md5.endswith(".dir"):
+            # directory outputs are not used by snapshots, let DVC check them
+            return _dvc_status_is_dirty(Path(dvc_path))
+        if not out.path.is_file():
+            return True
+        if out.size is not None and out.path.stat().st_size != out.size:
+            return True
+        if checksum_file(out.path) != out.md5:
+            # DVC 2 converts CRLF to LF in text files before hashing them
+            if out.hash == "md5" or _dvc2_md5(out.path) != out.md5:
+                return True
+    return False
+
+
+def _dvc2_md5(path: Path) -> str:
+    """Return md5 of the file computed the same way as DVC 2 does it for files without `hash: md5`
+    in their .dvc file (text files are hashed with CRLF converted to LF)."""
+    from dvc_data.hashfile.hash import file_md5
+
+    key = f"dvc2-{path.as_posix()}-{os.path.getmtime(path)}"
+    return CACHE_CHECKSUM_FILE.get_or_add(key, lambda: file_md5(path.as_posix()))
+
+
+def _dvc_status_is_dirty(dvc_path: Path) -> bool:
+    from dvc.dvcfile import load_file
+    from dvc.repo import Repo
+
+    with dvc_lock, _unignore_backports(dvc_path):
+        # new repository picks up changed .dvcignore
+        repo = Repo(paths.BASE_DIR)
+        dvc_file = load_file(repo, str(dvc_path))
+        with repo.lock:
+            # DVC returns empty dictionary if file is up to date
+            return dvc_file.stage.status() != {}
+
+
+def pull_snapshots(data_paths: List[Path], remote: str, force: bool = True) -> None:
+    """Pull multiple snapshot files from the remote in a single DVC call."""
+    from dvc.repo import Repo
+
+    if not data_paths:
+        return
+    with dvc_lock, _unignore_backports(*data_paths):
+        Repo(paths.BASE_DIR).pull([str(p) for p in data_paths], remote=remote, force=force)
+
+
 @contextmanager
-def _unignore_backports(path: Path):
+def _unignore_backports(*data_paths: Path):
     """Folder snapshots/backports contains thousands of .dvc files which adds significant overhead
     to running DVC commands (+8s overhead). That is why we ignore this folder in .dvcignore. This
-    context manager checks if the path is in snapshots/backports and if so, temporarily removes
-    this folder from .dvcignore.
+    context manager checks if any of the paths is in snapshots/backports and if so, temporarily
+    removes these backports from .dvcignore.
     This makes non-backport DVC operations run under 1s and backport DVC operations at ~8s.
     Changing .dvcignore in-place is not great, but no other way was working (tried monkey-patching
     DVC and subrepos).
     """
     dvc_ignore_path = paths.BASE_DIR / ".dvcignore"
-    if "backport/" in str(path):
+    backports = [path for path in data_paths if "backport/" in str(path)]
+    if backports:
         with unignore_backports_lock:
             with open(dvc_ignore_path) as f:
                 s = f.read()
             try:
                 with open(dvc_ignore_path, "w") as f:
-                    dataset_id = path.name.split("_")[1]
+                    dataset_ids = sorted({path.name.split("_")[1] for path in backports})
                     f.write(
                         s.replace(
                             "snapshots/backport/latest/*",
-                            f"snapshots/backport/latest/*\n!snapshots/backport/latest/dataset_{dataset_id}*",
+                            "snapshots/backport/latest/*"
+                            + "".join(
+                                f"\n!snapshots/backport/latest/dataset_{dataset_id}*" for dataset_id in dataset_ids
+                            ),
                         )
                     )
                 yield
@@ -3,8 +3,10 @@
 #  steps
 #
 import concurrent.futures
+import functools
 import graphlib
 import hashlib
+import itertools
 import os
 import re
 import subprocess
@@ -12,12 +14,26 @@ import sys
 import tempfile
 import warnings
 from collections import defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from glob import glob
 from importlib import import_module
 from pathlib import Path
-from threading import Lock
-from typing import Any, Dict, Iterable, List, Optional, Protocol, Set, Union, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 from urllib.parse import urlparse
 
 import pandas as pd
@@ -27,20 +43,19 @@ import yaml
 from owid import catalog
 from owid.walden import CATALOG as WALDEN_CATALOG
 from owid.walden import Dataset as WaldenDataset
+from sqlalchemy.engine import Engine
 
 from etl import config, files, git
 from etl import grapher_helpers as gh
 from etl import paths
 from etl.db import get_engine
-from etl.snapshot import _unignore_backports
+from etl.snapshot import is_snapshot_dirty, pull_snapshots
 
 log = structlog.get_logger()
 
 Graph = Dict[str, Set[str]]
 DAG = Dict[str, Any]
 
-dvc_lock = Lock()
-
 
 def compile_steps(
     dag: DAG,
@@ -59,8 +74,9 @@ def compile_steps(
     # make sure each step runs after its dependencies
     steps = to_dependency_order(dag, includes, excludes, downstream=downstream, only=only)
 
-    # parse the steps into Python objects
-    return [parse_step(name, dag) for name in steps]
+    # parse the steps into Python objects, sharing a single object per step
+    parsed: Dict[str, Step] = {}
+    return [parse_step(name, dag, parsed) for name in steps]
 
 
 def to_dependency_order(
@@ -192,13 +208,20 @@ def graph_nodes(graph: Graph) -> Set[str]:
     return all_steps
 
 
-def parse_step(step_name: str, dag: Dict[str, Any]) -> "Step":
-    "Convert each step's name into a step object that we can run."
+def parse_step(step_name: str, dag: Dict[str, Any], parsed: Optional[Dict[str, "Step"]] = None) -> "Step":
+    """Convert each step's name into a step object that we can run. Steps are memoised
+    in `parsed`, so that dependencies shared by many steps are parsed only once and
+    all their dependents point to the same object."""
+    if parsed is None:
+        parsed = {}
+
+    if step_name in parsed:
+        return parsed[step_name]
+
     parts = urlparse(step_name)
     step_type = parts.scheme
     path = parts.netloc + parts.path
-    # dependencies are new objects
-    dependencies = [parse_step(s, dag) for s in dag.get(step_name, [])]
+    dependencies = [parse_step(s, dag, parsed) for s in dag.get(step_name, [])]
 
     step: Step
     if step_type == "data":
@@ -237,9 +260,43 @@ def parse_step(step_name: str, dag: Dict[str, Any]) -> "Step":
     else:
         raise Exception(f"no recipe for executing step: {step_name}")
 
+    parsed[step_name] = step
+
     return step
 
 
+# cache of `is_dirty`, `checksum_input` and `checksum_output` of steps, it is only
+# active during `step_cache` because results are no longer valid after steps run
+_STEP_CACHE: Optional[files.RuntimeCache] = None
+
+T = TypeVar("T")
+
+
+@contextmanager
+def step_cache() -> Iterator[None]:
+    """Cache results of `@cached_per_run` methods of all steps inside this context."""
+    global _STEP_CACHE
+    _STEP_CACHE = files.RuntimeCache()
+    try:
+        yield
+    finally:
+        _STEP_CACHE = None
+
+
+def cached_per_run(method: Callable[[Any], T]) -> Callable[[Any], T]:
+    """Cache result of a step method by step URI while `step_cache` is active. Concurrent
+    calls for the same step wait for the first one instead of computing it again."""
+
+    @functools.wraps(method)
+    def wrapper(self: Any) -> T:
+        cache = _STEP_CACHE
+        if cache is None:
+            return method(self)
+        return cache.get_or_add(f"{self}:{method.__name__}", lambda: method(self))
+
+    return wrapper
+
+
 def extract_step_attributes(step: str) -> Dict[str, str]:
     """Extract attributes of a step from its name in the dag.
 
@@ -390,6 +447,8 @@ class DataStep(Step):
         if sp.with_suffix(".py").exists() or (sp / "__init__.py").exists():
             if config.DEBUG:
                 self._run_py_isolated()
+            elif config.WARM_WORKERS and not config.IPDB_ENABLED:
+                self._run_py_warm()
             else:
                 self._run_py()
 
@@ -416,6 +475,7 @@ class DataStep(Step):
         """Optional post-hook, needs to resave the dataset again."""
         ...
 
+    @cached_per_run
     def is_dirty(self) -> bool:
         if not self.has_existing_data() or any(d.is_dirty() for d in self.dependencies):
             return True
@@ -448,6 +508,7 @@ class DataStep(Step):
             or sp.with_suffix(".ipynb").exists()
         )
 
+    @cached_per_run
     def checksum_input(self) -> str:
         "Return the MD5 of all ingredients for making this step."
         checksums = {
@@ -473,6 +534,7 @@ class DataStep(Step):
 
         return catalog.Dataset(self._dest_dir.as_posix())
 
+    @cached_per_run
     def checksum_output(self) -> str:
         return self._output_dataset.checksum()
 
@@ -547,6 +609,22 @@ class DataStep(Step):
             print(f'\nCOMMAND: {" ".join(args)}', file=sys.stderr)
             sys.exit(1)
 
+    def _run_py_warm(self) -> None:
+        """
+        Import the Python module for this step and call run() on it in a fresh process
+        forked from a long-lived fork server. Steps are isolated the same way as with
+        _run_py, but don't pay the overhead of `poetry run` and importing heavy packages.
+        """
+        from etl.run_python_step import run_in_warm_worker
+
+        max_virtual_memory = config.MAX_VIRTUAL_MEMORY_LINUX if sys.platform == "linux" else None
+
+        exitcode = run_in_warm_worker(str(self), self._dest_dir.as_posix(), max_virtual_memory=max_virtual_memory)
+        if exitcode != 0:
+            # the stack trace has already been printed to stderr by the worker
+            print(f"\nSTEP: {self} (warm worker exited with code {exitcode})", file=sys.stderr)
+            sys.exit(1)
+
     def _run_notebook(self) -> None:
         "Run a parameterised Jupyter notebook."
         # smother deprecation warnings by papermill
@@ -584,6 +662,7 @@ class WaldenStep(Step):
         "Ensure the dataset we're looking for is there."
         self._walden_dataset.ensure_downloaded(quiet=True)
 
+    @cached_per_run
     def is_dirty(self) -> bool:
         if not Path(self._walden_dataset.local_path).exists():
             return True
@@ -596,6 +675,7 @@ class WaldenStep(Step):
     def has_existing_data(self) -> bool:
         return True
 
+    @cached_per_run
     def checksum_output(self) -> str:
         if not self._walden_dataset.md5:
             raise Exception(f"walden dataset is missing checksum: {self}")
@@ -635,6 +715,7 @@ class WaldenStep(Step):
 @dataclass
 class SnapshotStep(Step):
     path: str
+    remote = "public-read"
 
     def __init__(self, path: str) -> None:
         self.path = path
@@ -643,30 +724,21 @@ class SnapshotStep(Step):
         return f"snapshot://{self.path}"
 
     def run(self) -> None:
-        from dvc.repo import Repo
-
-        with _unignore_backports(Path(self._path)):
-            Repo(paths.BASE_DIR).pull(self._path, remote="public-read", force=True)
+        pull_snapshots([Path(self._path)], remote=self.remote)
 
+    @cached_per_run
     def is_dirty(self) -> bool:
         # check if the snapshot has been added to DVC
-        from dvc.dvcfile import load_file
-        from dvc.repo import Repo
-
         with open(self._dvc_path) as istream:
             if "outs:\n" not in istream.read():
                 raise Exception(f"File {self._dvc_path} has not been added to DVC. Run snapshot script to add it.")
 
-        with _unignore_backports(Path(self._dvc_path)), dvc_lock:
-            repo = Repo(paths.BASE_DIR)
-            dvc_file = load_file(repo, self._dvc_path)
-            with repo.lock:
-                # DVC returns empty dictionary if file is up to date
-                return dvc_file.stage.status() != {}
+        return is_snapshot_dirty(self._dvc_path)
 
     def has_existing_data(self) -> bool:
         return True
 
+    @cached_per_run
     def checksum_output(self) -> str:
         return files.checksum_file(self._dvc_path)
 
@@ -685,15 +757,11 @@ class SnapshotStep(Step):
 
 
 class SnapshotStepPrivate(SnapshotStep):
+    remote = "private"
+
     def __str__(self) -> str:
         return f"snapshot-private://{self.path}"
 
-    def run(self) -> None:
-        from dvc.repo import Repo
-
-        with _unignore_backports(Path(self._path)):
-            Repo(paths.BASE_DIR).pull(self._path, remote="private", force=True)
-
 
 class GrapherStep(Step):
     """
@@ -727,6 +795,7 @@ class GrapherStep(Step):
         """Grapher dataset we are upserting."""
         return self.data_step._output_dataset
 
+    @cached_per_run
     def is_dirty(self) -> bool:
         import etl.grapher_import as gi
 
@@ -758,40 +827,145 @@ class GrapherStep(Step):
             dataset.metadata.sources,
         )
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=config.GRAPHER_INSERT_WORKERS) as thread_pool:
-            futures = []
+        tables = list(self._tables_to_upsert(dataset))
 
-            # NOTE: multiple tables will be saved under a single dataset, this could cause problems if someone
-            # is fetching the whole dataset from data-api as they would receive all tables merged in a single
-            # table. This won't be a problem after we introduce the concept of "tables"
-            for table in dataset:
-                # if GRAPHER_FILTER is set, only upsert matching columns
-                if config.GRAPHER_FILTER:
-                    table = table.loc[:, table.filter(regex=config.GRAPHER_FILTER).columns]
+        # skip variables whose data and metadata haven't changed since the last upsert
+        unchanged_results: List[Any] = []
+        variables = self._changed_variables(engine, dataset, tables, dataset_upsert_results, unchanged_results)
 
-                catalog_path = f"{self.path}/{table.metadata.short_name}"
+        if config.GRAPHER_BATCH_SIZE > 0:
+            variable_upsert_results = self._upsert_tables_in_batches(engine, tables, variables, dataset_upsert_results)
+        else:
+            variable_upsert_results = self._upsert_tables(engine, variables, dataset_upsert_results)
 
-                table = gh._adapt_table_for_grapher(table)
+        log.info(
+            "grapher_step.upserted",
+            upserted=len(variable_upsert_results),
+            unchanged=len(unchanged_results),
+        )
+
+        # store checksums only after all data got uploaded
+        gi.set_variable_checksums(engine, variable_upsert_results)
+
+        if not config.GRAPHER_FILTER:
+            self._cleanup_ghost_resources(dataset_upsert_results, variable_upsert_results + unchanged_results)
+
+        # set checksum and updatedAt timestamps after all data got inserted
+        gi.set_dataset_checksum_and_editedAt(dataset_upsert_results.dataset_id, self.data_step.checksum_input())
+
+    def _tables_to_upsert(self, dataset: catalog.Dataset) -> Iterator[Tuple[str, catalog.Table]]:
+        """Yield tables adapted for grapher together with their catalog path."""
+        # NOTE: multiple tables will be saved under a single dataset, this could cause problems if someone
+        # is fetching the whole dataset from data-api as they would receive all tables merged in a single
+        # table. This won't be a problem after we introduce the concept of "tables"
+        for table in dataset:
+            # if GRAPHER_FILTER is set, only upsert matching columns
+            if config.GRAPHER_FILTER:
+                table = table.loc[:, table.filter(regex=config.GRAPHER_FILTER).columns]
+
+            catalog_path = f"{self.path}/{table.metadata.short_name}"
+
+            yield catalog_path, gh._adapt_table_for_grapher(table)
+
+    def _changed_variables(
+        self,
+        engine: Engine,
+        dataset: catalog.Dataset,
+        tables: List[Tuple[str, catalog.Table]],
+        dataset_upsert_results,
+        unchanged_results: List[Any],
+    ) -> Iterator[Tuple[str, catalog.Table, Any]]:
+        """Generate table with entity_id, year and value for every variable together with its catalog path
+        and checksums. Variables with the same checksums as in the database are not yielded, their upsert
+        results are appended to `unchanged_results` instead."""
+        import etl.grapher_import as gi
+
+        dataset_checksum = gi.dataset_metadata_checksum(dataset.metadata)
+        if config.GRAPHER_FORCE_UPSERT:
+            db_checksums = {}
+        else:
+            db_checksums = gi.fetch_variable_checksums(engine, dataset_upsert_results.dataset_id)
+
+        for catalog_path, table in tables:
+            for t in gh._yield_wide_table(table, na_action="drop"):
+                checksums = gi.variable_checksums(t, catalog_path, dataset_checksum)
+                db_result, db_variable_checksums = db_checksums.get(t.columns[0], (None, None))
+                if db_variable_checksums == checksums:
+                    unchanged_results.append(db_result)
+                else:
+                    yield catalog_path, t, checksums
+
+    def _upsert_tables(
+        self, engine: Engine, variables: Iterator[Tuple[str, catalog.Table, Any]], dataset_upsert_results
+    ) -> List[Any]:
+        import etl.grapher_import as gi
 
-                # generate table with entity_id, year and value for every column
-                upsert = lambda t: gi.upsert_table(  # noqa: E731
+        with concurrent.futures.ThreadPoolExecutor(max_workers=config.GRAPHER_INSERT_WORKERS) as thread_pool:
+            futures = [
+                thread_pool.submit(
+                    gi.upsert_table,
                     engine,
                     t,
                     dataset_upsert_results,
                     catalog_path=catalog_path,
                     dimensions=(t.iloc[:, 0].metadata.additional_info or {}).get("dimensions"),
+                    checksums=checksums,
                 )
+                for catalog_path, t, checksums in variables
+            ]
 
-                for t in gh._yield_wide_table(table, na_action="drop"):
-                    futures.append(thread_pool.submit(upsert, t))
+            return [future.result() for future in concurrent.futures.as_completed(futures)]
 
-            variable_upsert_results = [future.result() for future in concurrent.futures.as_completed(futures)]
+    def _upsert_tables_in_batches(
+        self,
+        engine: Engine,
+        tables: List[Tuple[str, catalog.Table]],
+        variables: Iterator[Tuple[str, catalog.Table, Any]],
+        dataset_upsert_results,
+    ) -> List[Any]:
+        """Upsert variables in batches of `GRAPHER_BATCH_SIZE`. Variables are generated lazily and only
+        a limited number of batches is in flight at once. Entities are fetched once for the whole dataset
+        and JSONs are uploaded to R2 by a shared uploader."""
+        import etl.grapher_import as gi
 
-        if not config.GRAPHER_FILTER:
-            self._cleanup_ghost_resources(dataset_upsert_results, variable_upsert_results)
+        entities = gi.prefetch_entities(
+            engine, {e for _, table in tables for e in table.index.get_level_values("entity_id").unique()}
+        )
 
-        # set checksum and updatedAt timestamps after all data got inserted
-        gi.set_dataset_checksum_and_editedAt(dataset_upsert_results.dataset_id, self.data_step.checksum_input())
+        stats = gi.UpsertStats()
+        max_in_flight = 2 * config.GRAPHER_INSERT_WORKERS
+        results = []
+
+        with gi.R2Uploader(
+            config.GRAPHER_UPLOAD_WORKERS, config.GRAPHER_UPLOAD_MAX_PENDING, stats
+        ) as uploader, concurrent.futures.ThreadPoolExecutor(max_workers=config.GRAPHER_INSERT_WORKERS) as thread_pool:
+            futures: Set[concurrent.futures.Future] = set()
+            # all variables of a batch must come from the same table
+            for catalog_path, group in itertools.groupby(variables, key=lambda v: v[0]):
+                while batch := list(itertools.islice(group, config.GRAPHER_BATCH_SIZE)):
+                    # wait for some batches to finish to keep memory usage in check
+                    if len(futures) >= max_in_flight:
+                        done, futures = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                        results += [r for f in done for r in f.result()]
+
+                    futures.add(
+                        thread_pool.submit(
+                            gi.upsert_tables,
+                            engine,
+                            [t for _, t, _ in batch],
+                            dataset_upsert_results,
+                            uploader,
+                            catalog_path=catalog_path,
+                            entities=entities,
+                            checksums=[checksums for _, _, checksums in batch],
+                        )
+                    )
+
+            results += [r for f in concurrent.futures.as_completed(futures) for r in f.result()]
+
+        stats.log()
+
+        return results
 
     def checksum_output(self) -> str:
         raise NotImplementedError("GrapherStep should not be used as an input")
@@ -846,6 +1020,7 @@ class GithubStep(Step):
     def __str__(self) -> str:
         return f"github://{self.path}"
 
+    @cached_per_run
     def is_dirty(self) -> bool:
         # always poll the git repo
         return not self.gh_repo.is_up_to_date()
@@ -854,6 +1029,7 @@ class GithubStep(Step):
         # either clone the repo, or update it
         self.gh_repo.ensure_cloned()
 
+    @cached_per_run
     def checksum_output(self) -> str:
         return self.gh_repo.latest_sha
 
@@ -875,6 +1051,9 @@ class ETagStep(Step):
     def __init__(self, path: str) -> None:
         self.path = path
 
+    def __str__(self) -> str:
+        return f"etag://{self.path}"
+
     def is_dirty(self) -> bool:
         return False
 
@@ -882,6 +1061,7 @@ class ETagStep(Step):
         # nothing is done for this step
         pass
 
+    @cached_per_run
     def checksum_output(self) -> str:
         return get_etag(f"https://{self.path}")
 
@@ -943,35 +1123,24 @@ class BackportStepPrivate(PrivateMixin, BackportStep):
 
 def select_dirty_steps(steps: List[Step], max_workers: int) -> List[Step]:
     """Select dirty steps using threadpool."""
-    # dynamically add cached version of `is_dirty` to all steps to avoid re-computing
-    # this is a bit hacky, but it's the easiest way to only cache it here without
-    # affecting the rest
-    cache_is_dirty = files.RuntimeCache()
-    for s in steps:
-        _add_is_dirty_cached(s, cache_is_dirty)
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        steps_dirty = executor.map(lambda s: s.is_dirty(), steps)  # type: ignore
-        steps = [s for s, is_dirty in zip(steps, steps_dirty) if is_dirty]
-
-    cache_is_dirty.clear()
+    # cache `is_dirty` and checksums of steps, shared dependencies are then checked only once
+    with step_cache():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            steps_dirty = executor.map(lambda s: s.is_dirty(), steps)  # type: ignore
+            steps = [s for s, is_dirty in zip(steps, steps_dirty) if is_dirty]
 
     return steps
 
 
-def _cached_is_dirty(self: Step, cache: files.RuntimeCache) -> bool:
-    key = str(self)
-    if key not in cache:
-        cache.add(key, self._is_dirty())  # type: ignore
-    return cache[key]  # type: ignore
-
+def pull_snapshot_steps(steps: List[SnapshotStep]) -> None:
+    """Pull files of snapshot steps with a single DVC call per remote instead of running the
+    steps one by one."""
+    by_remote: Dict[str, List[Path]] = {}
+    for step in steps:
+        by_remote.setdefault(step.remote, []).append(Path(step._path))
 
-def _add_is_dirty_cached(s: Step, cache: files.RuntimeCache) -> None:
-    """Save copy of a method to _is_dirty and replace it with a cached version."""
-    s._is_dirty = s.is_dirty  # type: ignore
-    s.is_dirty = lambda s=s: _cached_is_dirty(s, cache)  # type: ignore
-    for dep in getattr(s, "dependencies", []):
-        _add_is_dirty_cached(dep, cache)
+    for remote, data_paths in by_remote.items():
+        pull_snapshots(data_paths, remote=remote)
 
 
 def _uses_old_schema(e: KeyError) -> bool:
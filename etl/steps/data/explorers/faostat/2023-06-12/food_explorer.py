@@ -4,11 +4,7 @@ Loads the faostat_food_explorer dataset from garden and stores a table (as a csv
 
 """
 
-import sys
-from typing import List
-
 from owid.catalog import Dataset, Table, utils
-from tqdm.auto import tqdm
 
 from etl.helpers import PathFinder, create_dataset
 
@@ -47,8 +43,8 @@ EXPECTED_COLUMNS = {
 }
 
 
-def create_table_for_each_product(tb_garden: Table) -> List[Table]:
-    """Create a list of tables, one for each product found in a garden table.
+def prepare_explorer_table(tb_garden: Table) -> Table:
+    """Select and rename the columns required by the food explorer, and sort columns and rows conveniently.
 
     Parameters
     ----------
@@ -57,36 +53,20 @@ def create_table_for_each_product(tb_garden: Table) -> List[Table]:
 
     Returns
     -------
-    tables : List[Table]
-        List of tables, one for each product.
+    tb : Table
+        Table of products, ready to be split into one table for each product.
 
     """
-    # List all products in table
-    products = sorted(tb_garden.index.get_level_values("product").unique().tolist())
-
-    tables = []
-    for product in tqdm(products, file=sys.stdout):
-        # Save a table for each food product.
-        table_product = tb_garden.loc[product].copy()
-
-        # Update table metadata.
-        table_product.title = product
+    tb = tb_garden[list(EXPECTED_COLUMNS)].rename(columns=EXPECTED_COLUMNS)
+    tb = tb[["population"] + [column for column in sorted(tb.columns) if column not in ["population"]]]
+    tb = tb.sort_index()
 
-        # Rename columns, select the required ones, and sort columns and rows conveniently.
-        table_product = table_product[list(EXPECTED_COLUMNS)].rename(columns=EXPECTED_COLUMNS)
-        table_product = table_product[
-            ["population"] + [column for column in sorted(table_product.columns) if column not in ["population"]]
-        ]
-        table_product = table_product.sort_index()
+    return tb
 
-        table_product.metadata.short_name = (
-            utils.underscore(name=product, validate=True).replace("__", "_").replace("_e_g_", "_eg_")
-        )
 
-        # Add table to list of all tables to include in the explorers dataset.
-        tables.append(table_product)
-
-    return tables
+def product_short_name(product: str) -> str:
+    """Short name of the table of a food product."""
+    return utils.underscore(name=product, validate=True).replace("__", "_").replace("_e_g_", "_eg_")
 
 
 def run(dest_dir: str) -> None:
@@ -102,16 +82,17 @@ def run(dest_dir: str) -> None:
     #
     # Process data.
     #
-    tables = create_table_for_each_product(tb_garden=tb_garden)
+    tb = prepare_explorer_table(tb_garden=tb_garden)
 
     #
     # Save outputs.
     #
     # Initialize new explorers dataset.
-    ds_explorers = create_dataset(
-        dest_dir=dest_dir, tables=tables, default_metadata=ds_garden.metadata, formats=["csv"]
-    )
+    ds_explorers = create_dataset(dest_dir=dest_dir, tables=[], default_metadata=ds_garden.metadata, formats=["csv"])
     ds_explorers.metadata.short_name = "food_explorer"
 
+    # Save a table (as a csv file) for each food product, titled by the product.
+    ds_explorers.add_partitioned(tb, by="product", formats=["csv"], short_name=product_short_name)
+
     # Create new explorers dataset.
     ds_explorers.save()
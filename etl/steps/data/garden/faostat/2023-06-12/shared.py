@@ -1576,13 +1576,13 @@ def optimize_table_dtypes(table: catalog.Table) -> catalog.Table:
     dtypes = {c: "category" for c in ["area_code", "item_code", "element_code"] if c in table.columns}
 
     # Store variables metadata before optimizing table dtypes (otherwise they will be lost).
-    variables_metadata = {variable: table[variable].metadata for variable in table.columns}
+    variables_metadata = {variable: table.fields[variable] for variable in table.columns}
 
     optimized_table = repack.repack_frame(table, dtypes=dtypes)
 
     # Recover variable metadata (that was lost when optimizing table dtypes).
     for variable in variables_metadata:
-        optimized_table[variable].metadata = variables_metadata[variable]
+        optimized_table.fields[variable] = variables_metadata[variable]
 
     return optimized_table
 
@@ -1728,32 +1728,23 @@ def prepare_wide_table(data: pd.DataFrame) -> catalog.Table:
     log.info("prepare_wide_table.adding_metadata", shape=wide_table.shape)
 
     # Add variable name.
-    for column in wide_table.columns:
-        wide_table[column].metadata.title = column
+    wide_table.fields.set("title", {column: column for column in wide_table.columns})
 
     # Add variable unit (long name).
     variable_name_mapping = _variable_name_map(data, "unit")
-    for column in wide_table.columns:
-        wide_table[column].metadata.unit = variable_name_mapping[column]
+    wide_table.fields.set("unit", {column: variable_name_mapping[column] for column in wide_table.columns})
 
     # Add variable unit (short name).
     variable_name_mapping = _variable_name_map(data, "unit_short_name")
-    for column in wide_table.columns:
-        wide_table[column].metadata.short_unit = variable_name_mapping[column]
+    wide_table.fields.set("short_unit", {column: variable_name_mapping[column] for column in wide_table.columns})
 
     # Add variable description.
     variable_name_mapping = _variable_name_map(data, "variable_description")
-    for column in wide_table.columns:
-        wide_table[column].metadata.description = variable_name_mapping[column]
+    wide_table.fields.set("description", {column: variable_name_mapping[column] for column in wide_table.columns})
 
-    # Add display parameters (for grapher).
-    for column in wide_table.columns:
-        wide_table[column].metadata.display = {}
-
-    # Display name.
+    # Add display parameters (for grapher), with display name.
     variable_name_mapping = _variable_name_map(data, "variable_display_name")
-    for column in wide_table.columns:
-        wide_table[column].metadata.display["name"] = variable_name_mapping[column]
+    wide_table.fields.set("display", {column: {"name": variable_name_mapping[column]} for column in wide_table.columns})
 
     # Ensure columns have the optimal dtypes, but codes are categories.
     log.info("prepare_wide_table.optimize_table_dtypes", shape=wide_table.shape)
@@ -1766,9 +1757,9 @@ def prepare_wide_table(data: pd.DataFrame) -> catalog.Table:
 
     # Make all column names snake_case.
     variable_to_short_name = {
-        column: create_variable_short_names(variable_name=wide_table[column].metadata.title)
-        for column in wide_table.columns
-        if wide_table[column].metadata.title is not None
+        column: create_variable_short_names(variable_name=title)
+        for column, title in wide_table.fields.get("title").items()
+        if title is not None
     }
     wide_table = wide_table.rename(columns=variable_to_short_name, errors="raise")
 
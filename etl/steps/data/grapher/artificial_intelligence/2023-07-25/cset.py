@@ -24,13 +24,14 @@ def run(dest_dir: str) -> None:
     tb.set_index(["country", "year", "field"], inplace=True)
 
     # Expand dimensions into columns.
-    expanded_tb = gh.expand_dimensions(tb)
+    expanded = gh.expand_dimensions(tb)
 
     # Set display name to its `field` for each column
-    for col in expanded_tb.columns:
-        dim_filters = expanded_tb[col].metadata.additional_info["dimensions"]["filters"]
+    for meta in expanded.columns_metadata.values():
+        dim_filters = meta.additional_info["dimensions"]["filters"]
         assert len(dim_filters) == 1
-        expanded_tb[col].metadata.display["name"] = dim_filters[0]["value"]
+        meta.display["name"] = dim_filters[0]["value"]
+    expanded_tb = expanded.to_table()
 
     #
     # Save outputs.
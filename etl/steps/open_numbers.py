@@ -10,25 +10,37 @@ format.
 
 import datetime as dt
 import hashlib
-import tempfile
-import warnings
 from multiprocessing import Pool
 from pathlib import Path
-from typing import Dict, List, Tuple, cast
+from typing import Dict, List, Tuple
 
 import frictionless
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import structlog
-from frictionless.exception import FrictionlessException
 from owid.catalog import Dataset, Table, Variable, utils
 from owid.catalog.meta import Source
 from owid.repack import repack_series
+from pandas.api.types import union_categoricals
 
 from etl.git import GithubRepo
 from etl.paths import DATA_DIR
 
 log = structlog.get_logger()
 
+# column `global` is used as `geo` in our tables
+GLOBAL_TO_GEO = {"global": "geo"}
+
+# arrow types of fields in `datapackage.json`, see `load_resources` for fields of other types (or without type)
+FRICTIONLESS_TO_ARROW = {
+    "string": pa.string(),
+    "integer": pa.int64(),
+    "number": pa.float64(),
+    "boolean": pa.bool_(),
+}
+
 
 def run(dest_dir: str) -> None:
     # identify the short name and the repo
@@ -56,26 +68,32 @@ def run(dest_dir: str) -> None:
     # name remapping
     resource_map = remap_names(package.resources)
 
-    # copy tables one by one
+    # copy tables in parallel, workers only get paths to CSV files and their schema
     with Pool() as pool:
-        args = [(ds, repo, short_name, resources) for short_name, resources in resource_map.items()]
+        args = [
+            (
+                dest_dir,
+                short_name,
+                [repo.cache_dir / resource.path for resource in resources],
+                {field.name: field.type for field in resources[0].schema.fields},
+                resources[0].schema.primary_key,
+            )
+            for short_name, resources in resource_map.items()
+        ]
         pool.starmap(add_resource, args)
 
 
 def add_resource(
-    ds: Dataset,
-    repo: GithubRepo,
+    dest_dir: str,
     short_name: str,
-    resources: List[frictionless.Resource],
+    paths: List[Path],
+    fields: Dict[str, str],
+    primary_key: List[str],
 ) -> None:
     print(f"- {short_name}")
     try:
-        if len(resources) > 1:
-            df = load_and_combine(repo.cache_dir, resources)
-        else:
-            df = load_table(resources[0])
-
-    except FrictionlessException:
+        df = load_resources(paths, fields, primary_key)
+    except pa.ArrowInvalid:
         # see: https://github.com/owid/etl/issues/36
         print("  ERROR: skipping")
         return
@@ -87,78 +105,110 @@ def add_resource(
     t = utils.underscore_table(t)
 
     # we've already repacked the data
-    ds.add(t, repack=False)
+    Dataset(dest_dir).add(t, repack=False)
+
+
+def load_resources(paths: List[Path], fields: Dict[str, str], primary_key: List[str]) -> pd.DataFrame:
+    """Load CSV files of resources with the same schema into a single dataframe. Files are streamed
+    through pyarrow's CSV reader with column types from `datapackage.json` and their batches are
+    concatenated in memory, without an intermediate CSV file."""
+    # tables combined from multiple resources use `geo` instead of `global`, tables from a single resource
+    # have always kept their original column names
+    remap = GLOBAL_TO_GEO if len(paths) > 1 else {}
+    fields = {remap.get(c, c): t for c, t in fields.items()}
+    primary_key = [remap.get(c, c) for c in primary_key]
+    columns = list(fields)
+
+    # DDF datapoints are mostly numbers, read values without type as floats to avoid integers inferred
+    # from the first rows clashing with floats later on (they are repacked into integers anyway)
+    column_types = {
+        c: FRICTIONLESS_TO_ARROW.get(t, pa.float64())
+        for c, t in fields.items()
+        if t in FRICTIONLESS_TO_ARROW or c not in primary_key
+    }
+
+    try:
+        df = _read_csvs(paths, columns, column_types)
+    except pa.ArrowInvalid:
+        # values don't match their types (e.g. strings in a column of numbers), read everything as
+        # strings, numbers are recovered when repacking
+        df = _read_csvs(paths, columns, {c: pa.string() for c in columns})
+
+    df.set_index(primary_key, inplace=True)
 
+    return df
 
-def load_table(resource: frictionless.Resource) -> pd.DataFrame:
-    df = cast(pd.DataFrame, resource.to_pandas())
 
-    # use smaller, more accurate column types that minimise space
-    if "global" in df.columns:
-        df["geo"] = df.pop("global")
+def _read_csvs(paths: List[Path], columns: List[str], column_types: Dict[str, pa.DataType]) -> pd.DataFrame:
+    """Stream CSV files with given columns (headers of the files are skipped) into a single dataframe.
 
-    primary_key = resource.schema.primary_key
+    Every batch is converted to pandas right away (strings to categoricals), so that at most one batch
+    is held in arrow memory. Columns are then concatenated and repacked one by one. Columns without a
+    type get the type inferred from the first rows of the first file, so that all batches have the same
+    schema.
+    """
+    chunks: Dict[str, List[pd.Series]] = {col: [] for col in columns}
+    for path in paths:
+        reader = pa_csv.open_csv(
+            path,
+            read_options=pa_csv.ReadOptions(column_names=columns, skip_rows=1),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+        )
+        column_types = {field.name: field.type for field in reader.schema}
+        for batch in reader:
+            for col, array in zip(columns, batch.columns):
+                chunk = array.to_pandas(strings_to_categorical=True)
+                # copy numbers out of arrow memory, so that it can be reused for the next batch
+                chunks[col].append(chunk if isinstance(chunk.dtype, pd.CategoricalDtype) else chunk.to_numpy(copy=True))
+
+    data = {}
+    for col in columns:
+        col_chunks = chunks.pop(col)
+        if not col_chunks:
+            s = pd.Series([], dtype=column_types[col].to_pandas_dtype())
+        elif isinstance(col_chunks[0].dtype, pd.CategoricalDtype):
+            s = pd.Series(union_categoricals(col_chunks))
+        else:
+            s = pd.Series(_concat_releasing(col_chunks))
+        del col_chunks
 
-    df.reset_index(inplace=True)
+        # use smaller, more accurate column types that minimise space
+        data[col] = _repack_series(s)
+        del s
 
-    # repack dataframe in place
-    for col in df.columns:
-        df[col] = repack_series(df[col])
+    return pd.DataFrame(data)
 
-    df.set_index(primary_key, inplace=True)
 
-    return df
+def _concat_releasing(chunks: List[np.ndarray]) -> np.ndarray:
+    """Concatenate arrays and release every one of them as soon as it's copied, so that the memory isn't
+    needed twice."""
+    out = np.empty(sum(len(c) for c in chunks), dtype=np.result_type(*chunks))
+    start = 0
+    for i, chunk in enumerate(chunks):
+        out[start : start + len(chunk)] = chunk
+        start += len(chunk)
+        chunks[i] = None  # type: ignore
+    return out
 
 
-def load_and_combine(path: Path, resources: List[frictionless.Resource]) -> pd.DataFrame:
-    first = True
-    primary_key: List[str] = []
-    columns: List[str]
-
-    with tempfile.NamedTemporaryFile(suffix=".csv") as f:
-        for resource in resources:
-            if first:
-                # print csv header
-                primary_key = resource.schema.primary_key
-                columns = [k.name for k in resource.schema.fields]
-
-                if "global" in columns:
-                    remap = {"global": "geo"}
-                    columns = [remap.get(c, c) for c in columns]
-                    primary_key = [remap.get(c, c) for c in primary_key]
-
-                f.write(",".join(columns).encode("utf8") + b"\n")
-                first = False
-
-            with open((path / resource.path).as_posix(), "rb") as istream:
-                lines = iter(istream)
-                next(lines)  # skip the header
-                for line in lines:
-                    f.write(line)
-
-        f.flush()
-
-        # ignore mixed type warnings
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", pd.errors.DtypeWarning)
-            df = pd.read_csv(f.name)
-
-    # fix mixed types of object columns
-    for col in df.select_dtypes(object).columns:
-        if pd.api.types.infer_dtype(df[col]).startswith("mixed"):
-            # try numeric first and fall back to string
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except ValueError:
-                df[col] = df[col].astype(str)
-
-    # repack dataframe in place
-    for col in df.columns:
-        df[col] = repack_series(df[col])
+def _repack_series(s: pd.Series) -> pd.Series:
+    """Repack series like `repack_series` would repack it as strings (not categories), i.e. convert
+    numbers stored as strings to numbers and sort categories."""
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return repack_series(s)
 
-    df.set_index(primary_key, inplace=True)
+    if len(s.cat.categories) == 0:
+        # all values are null, pandas would read them as floats
+        return repack_series(pd.Series(np.full(len(s), np.nan)))
+
+    categories = repack_series(pd.Series(s.cat.categories, dtype=object))
+    if isinstance(categories.dtype, pd.CategoricalDtype):
+        return s.cat.reorder_categories(sorted(s.cat.categories))
 
-    return cast(pd.DataFrame, df)
+    # numbers stored as strings, convert only categories and take their values by codes
+    values = categories.to_numpy(dtype=float, na_value=np.nan)
+    codes = s.cat.codes.to_numpy()
+    return repack_series(pd.Series(np.where(codes >= 0, values[codes], np.nan)))
 
 
 def remap_names(
@@ -214,7 +264,7 @@ def parse_name(name: str) -> Tuple[str, str]:
 
 
 def norm_primary_key(primary_key: List[str]) -> List[str]:
-    return [k if k != "global" else "geo" for k in primary_key]
+    return [GLOBAL_TO_GEO.get(k, k) for k in primary_key]
 
 
 GM_TO_OWID_ISO_CODES = {
@@ -0,0 +1,48 @@
+"""
+Benchmark setting and reading metadata of all columns of a wide table through
+`tb[col].metadata` against the bulk `tb.fields` accessor.
+
+Usage:
+
+    python benchmarks/bench_fields.py
+    python benchmarks/bench_fields.py --columns 5000 --rows 10000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from owid.catalog import Table
+from owid.catalog.utils import underscore_table
+
+
+def main(n_columns: int, n_rows: int) -> None:
+    df = pd.DataFrame(np.random.rand(n_rows, n_columns), columns=[f"Column {i}" for i in range(n_columns)])
+    units = {col: f"unit {i}" for i, col in enumerate(df.columns)}
+
+    t = Table(df.copy())
+    start = time.perf_counter()
+    for col in t.columns:
+        t[col].metadata.unit = units[col]
+    titles = {col: t[col].metadata.title for col in t.columns}
+    print(f"tb[col].metadata: {time.perf_counter() - start:.2f}s")
+
+    t = Table(df.copy())
+    start = time.perf_counter()
+    t.fields.set("unit", units)
+    titles = t.fields.get("title")
+    print(f"tb.fields:        {time.perf_counter() - start:.2f}s")
+    assert len(titles) == n_columns
+
+    start = time.perf_counter()
+    underscore_table(t)
+    print(f"underscore_table: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--columns", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+    main(args.columns, args.rows)
@@ -0,0 +1,69 @@
+"""
+Benchmark reading metadata of wide tables, where each column has the same origins and
+licenses (e.g. FAOSTAT wide tables or backports).
+
+Compares size of the sidecar with and without interning, and time of reading the table
+when using metadata of a single column against parsing metadata of all columns (which
+is what reading did before).
+
+Usage:
+
+    python benchmarks/bench_metadata.py
+    python benchmarks/bench_metadata.py --columns 10000
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from owid.catalog import License, Origin, Table
+
+
+def create_table(n_columns: int) -> Table:
+    df = pd.DataFrame(np.random.rand(10, n_columns), columns=[f"column_{i}" for i in range(n_columns)])
+    t = Table(df, short_name="wide")
+    origins = [
+        Origin(producer=f"Producer {i}", title=f"Title {i}", description="Long description " * 20) for i in range(3)
+    ]
+    for col in t.columns:
+        t[col].metadata.title = f"Title of {col}"
+        t[col].metadata.unit = "tonnes"
+        t[col].metadata.origins = origins
+        t[col].metadata.licenses = [License(name="CC BY 4.0", url="https://creativecommons.org/licenses/by/4.0/")]
+    return t
+
+
+def main(n_columns: int) -> None:
+    t = create_table(n_columns)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "wide.feather"
+        t.to(path)
+
+        v2_size = path.with_suffix(".meta.json").stat().st_size
+        metadata = t.metadata.to_dict()
+        metadata["primary_key"] = t.primary_key
+        metadata["fields"] = t._get_fields_as_dict()
+        v1_size = len(json.dumps(metadata, indent=2, default=str))
+        print(f"sidecar size: v1 {v1_size / 1e6:.1f}MB, v2 {v2_size / 1e6:.1f}MB")
+
+        start = time.perf_counter()
+        t = Table.read(path)
+        t[t.columns[0]].metadata.title
+        print(f"read + metadata of one column:  {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        t = Table.read(path)
+        for col in t.columns:
+            t[col].metadata.title
+        print(f"read + metadata of all columns: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--columns", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.columns)
@@ -0,0 +1,80 @@
+"""
+Benchmark `Dataset.add_partitioned` against slicing a table by product with `.loc` and adding
+the slices one by one, as explorer steps did.
+
+Usage:
+
+    python benchmarks/bench_partitioned.py
+    python benchmarks/bench_partitioned.py --products 200 --countries 250 --columns 40 --format feather
+"""
+import argparse
+import filecmp
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from owid.catalog import Dataset, DatasetMeta, Table, utils
+
+
+def create_table(n_products: int, n_countries: int, n_columns: int) -> Table:
+    """Table like the one of FAOSTAT food explorer, indexed by product, country and year."""
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product(
+        [[f"Product {i}" for i in range(n_products)], [f"Country {i}" for i in range(n_countries)], range(1961, 2021)],
+        names=["product", "country", "year"],
+    )
+    t = Table(
+        rng.random((len(index), n_columns)) * 1000,
+        index=index,
+        columns=[f"column_{i}" for i in range(n_columns)],
+        short_name="benchmark",
+    )
+    for col in t.columns:
+        t[col].metadata.title = col
+        t[col].metadata.unit = "tonnes"
+    return t
+
+
+def legacy_add(ds: Dataset, t: Table, format: str) -> None:
+    for product in sorted(t.index.get_level_values("product").unique()):
+        t_product = t.loc[product].copy()
+        t_product.metadata.short_name = utils.underscore(product)
+        t_product.metadata.title = product
+        ds.add(t_product, formats=[format])  # type: ignore
+
+
+def main(n_products: int, n_countries: int, n_columns: int, format: str) -> None:
+    t = create_table(n_products, n_countries, n_columns)
+    print(f"Table with {len(t)} rows, {n_columns} columns and {n_products} products")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ds_legacy = Dataset.create_empty(Path(tmp) / "legacy", DatasetMeta(short_name="legacy"))
+        start = time.perf_counter()
+        legacy_add(ds_legacy, t, format)
+        t_legacy = time.perf_counter() - start
+
+        ds_new = Dataset.create_empty(Path(tmp) / "partitioned", DatasetMeta(short_name="legacy"))
+        start = time.perf_counter()
+        names = ds_new.add_partitioned(t, by="product", formats=[format])  # type: ignore
+        t_new = time.perf_counter() - start
+
+        if format == "csv":
+            files = [f"{name}.{ext}" for name in names for ext in ("csv", "meta.json")]
+            _, mismatch, errors = filecmp.cmpfiles(ds_legacy.path, ds_new.path, files, shallow=False)
+            assert not mismatch and not errors, mismatch + errors
+
+    print(f"slice and add:   {t_legacy:.2f}s")
+    print(f"add_partitioned: {t_new:.2f}s ({t_legacy / t_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--countries", type=int, default=250)
+    parser.add_argument("--columns", type=int, default=40)
+    parser.add_argument("--format", choices=["csv", "feather", "parquet"], default="csv")
+    args = parser.parse_args()
+    main(args.products, args.countries, args.columns, args.format)
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of processing log overhead in `Table.read` and `Variable.__add__`, with
+the processing log disabled (default) and enabled, and of a deep pipeline where logs of
+variables keep growing.
+
+Usage:
+
+    python benchmarks/bench_processing_log.py
+    python benchmarks/bench_processing_log.py --columns 2000 --ops 2000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from owid.catalog import Table, variables
+
+
+def bench_read(path: Path, n: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        Table.read(path)
+    return (time.perf_counter() - start) / n
+
+
+def bench_add(t: Table, n: int = 1000) -> float:
+    a, b = t["column_0"], t["column_1"]
+    start = time.perf_counter()
+    for _ in range(n):
+        a + b
+    return (time.perf_counter() - start) / n
+
+
+def bench_pipeline(n_ops: int) -> float:
+    t = Table(pd.DataFrame({"a": np.arange(10.0), "b": np.arange(10.0)}))
+    start = time.perf_counter()
+    for _ in range(n_ops):
+        t["a"] = t["a"] + t["b"]
+    t.a.metadata.to_dict()
+    return time.perf_counter() - start
+
+
+def main(n_columns: int, n_ops: int) -> None:
+    df = pd.DataFrame(np.random.rand(100, n_columns), columns=[f"column_{i}" for i in range(n_columns)])
+    t = Table(df, short_name="benchmark")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "benchmark.feather"
+        t.to(path)
+
+        for enabled in (False, True):
+            variables.PROCESSING_LOG = enabled
+            print(f"PROCESSING_LOG={enabled}")
+            print(f"  Table.read ({n_columns} columns): {bench_read(path) * 1e3:.1f}ms")
+            print(f"  Variable.__add__: {bench_add(t) * 1e6:.0f}us")
+
+    variables.PROCESSING_LOG = True
+    print(f"pipeline of {n_ops} additions with processing log: {bench_pipeline(n_ops):.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--columns", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.columns, args.ops)
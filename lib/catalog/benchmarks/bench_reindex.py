@@ -0,0 +1,59 @@
+"""
+Benchmark `LocalCatalog.reindex` from scratch against an incremental reindex after
+a few datasets have changed.
+
+Usage:
+
+    python benchmarks/bench_reindex.py
+    python benchmarks/bench_reindex.py --datasets 2000 --changed 5
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from owid.catalog import Dataset, DatasetMeta, LocalCatalog, Table
+
+
+def create_dataset(path: Path, n_tables: int) -> None:
+    ds = Dataset.create_empty(path, DatasetMeta(short_name=path.name, namespace=path.parent.parent.name))
+    for i in range(n_tables):
+        df = pd.DataFrame({"country": ["France", "Germany"] * 500, "year": range(1000), "value": range(1000)})
+        ds.add(Table(df, short_name=f"table_{i}").set_index(["country", "year"]))
+
+
+def main(n_datasets: int, n_changed: int, n_tables: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        dirs = [path / "garden" / f"namespace_{i % 20}" / "latest" / f"dataset_{i}" for i in range(n_datasets)]
+        for dir in dirs:
+            create_dataset(dir, n_tables)
+
+        t = time.perf_counter()
+        catalog = LocalCatalog(path, channels=("garden",))
+        print(f"full reindex ({n_datasets} datasets): {time.perf_counter() - t:.2f}s")
+
+        for dir in random.sample(dirs, n_changed):
+            create_dataset(dir, n_tables)
+
+        t = time.perf_counter()
+        catalog.reindex()
+        print(f"incremental reindex ({n_changed} changed): {time.perf_counter() - t:.2f}s")
+
+        shutil.rmtree(path / ".reindex")
+        t = time.perf_counter()
+        catalog.reindex(workers=1)
+        print(f"full reindex without manifest, 1 worker: {time.perf_counter() - t:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", type=int, default=1000)
+    parser.add_argument("--changed", type=int, default=10)
+    parser.add_argument("--tables", type=int, default=5)
+    args = parser.parse_args()
+    main(args.datasets, args.changed, args.tables)
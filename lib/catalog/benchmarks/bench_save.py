@@ -0,0 +1,81 @@
+"""
+Benchmark `Dataset.save`, which only rewrites metadata of tables, against the previous
+implementation that read every table with its data.
+
+Usage:
+
+    python benchmarks/bench_save.py
+    python benchmarks/bench_save.py --tables 500 --rows 50000
+    python benchmarks/bench_save.py --dataset data/open_numbers/open_numbers/latest/gapminder__gapminder_world
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from os.path import join
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from owid.catalog import Dataset, DatasetMeta, Table
+
+
+def legacy_save(ds: Dataset) -> None:
+    """Previous implementation of `Dataset.save`."""
+    ds.metadata.save(ds._index_file)
+    for table_name in ds.table_names:
+        table = ds[table_name]
+        table.metadata.dataset = ds.metadata
+        table._save_metadata(join(ds.path, table.metadata.checked_name + ".meta.json"))
+
+
+def create_dataset(path: Path, n_tables: int, n_rows: int) -> Dataset:
+    """Dataset with many tables like open_numbers datasets."""
+    rng = np.random.default_rng(0)
+    ds = Dataset.create_empty(path, DatasetMeta(short_name="benchmark", namespace="benchmark"))
+    for i in range(n_tables):
+        df = pd.DataFrame(
+            {
+                "country": rng.choice([f"country_{j}" for j in range(200)], n_rows),
+                "year": np.arange(n_rows),
+                "value": rng.random(n_rows),
+            }
+        )
+        t = Table(df, short_name=f"table_{i}").set_index(["country", "year"])
+        t.value.metadata.title = f"Value {i}"
+        ds.add(t)
+    return ds
+
+
+def main(n_tables: int, n_rows: int, dataset: Optional[str]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "benchmark"
+        if dataset:
+            shutil.copytree(dataset, path)
+            ds = Dataset(path)
+        else:
+            ds = create_dataset(path, n_tables, n_rows)
+
+        print(f"Dataset with {len(ds.table_names)} tables")
+
+        t = time.perf_counter()
+        legacy_save(ds)
+        t_legacy = time.perf_counter() - t
+
+        t = time.perf_counter()
+        ds.save()
+        t_new = time.perf_counter() - t
+
+        print(f"legacy save:        {t_legacy:.2f}s")
+        print(f"metadata-only save: {t_new:.2f}s ({t_legacy / t_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dataset", type=str, help="Benchmark on a copy of an existing dataset instead")
+    args = parser.parse_args()
+    main(args.tables, args.rows, args.dataset)
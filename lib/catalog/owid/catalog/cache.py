@@ -0,0 +1,190 @@
+#
+#  cache.py
+#
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from os import environ
+from pathlib import Path
+from typing import Any, Optional, Union
+from urllib.parse import urlparse
+
+import requests
+import structlog
+
+from . import s3_utils
+
+log = structlog.get_logger()
+
+# on-disk cache of remote catalog files is only used if this is set (or after calling `set_cache_path`),
+# the usual location is ~/.owid/catalog-cache
+CATALOG_CACHE_ENV = "OWID_CATALOG_CACHE"
+
+# maximum size of the cache in bytes, least recently used entries are evicted above it
+CATALOG_CACHE_MAX_SIZE_ENV = "OWID_CATALOG_CACHE_MAX_SIZE"
+DEFAULT_MAX_SIZE = 5 * 2**30  # 5GB
+
+# entries used more recently than this are never evicted, another process might be reading them
+MIN_EVICTION_AGE = 60
+
+
+class CatalogCache:
+    """
+    Size-bounded on-disk cache of files from the remote catalog.
+
+    Files are grouped into entries, every entry is a directory holding files downloaded
+    from the same location (e.g. table data and its `.meta.json` sidecar). An entry whose
+    key contains a checksum from the catalog index is immutable and is used without any
+    request. Other entries are revalidated with `If-None-Match` against the ETag stored
+    next to each file.
+
+    Files are written to a temporary file first and atomically moved into place, so the
+    cache is safe to use from multiple threads and processes. When the total size exceeds
+    `max_size`, least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Union[str, Path], max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.path = Path(path)
+        self.max_size = max_size
+
+    def download(self, uri: str, entry: str, immutable: bool = False) -> Path:
+        """Return a local copy of the file at `uri` (HTTP(S) or S3) stored in entry `entry`."""
+        entry_dir = self._entry_dir(entry)
+        filename = entry_dir / os.path.basename(urlparse(uri).path)
+        etag_file = filename.with_name(filename.name + ".etag")
+
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        # mark the entry as recently used
+        os.utime(entry_dir)
+
+        if filename.exists():
+            if immutable:
+                return filename
+            etag = etag_file.read_text() if etag_file.exists() else None
+        else:
+            etag = None
+
+        if uri.startswith("s3://"):
+            new_etag = self._download_s3(uri, filename, etag)
+        else:
+            new_etag = self._download_http(uri, filename, etag)
+
+        if new_etag is None:
+            log.debug("catalog_cache.hit", uri=uri)
+        else:
+            log.debug("catalog_cache.miss", uri=uri)
+            _atomic_write(etag_file, new_etag.encode())
+            self.evict(keep=entry_dir)
+
+        return filename
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        """Remove least recently used entries until the cache fits into `max_size`. Return number of
+        removed entries."""
+        entries = []
+        total_size = 0
+        for entry_dir in self.path.glob("*/*"):
+            try:
+                size = sum(f.stat().st_size for f in entry_dir.iterdir())
+                entries.append((entry_dir.stat().st_mtime, size, entry_dir))
+            except FileNotFoundError:
+                # evicted by another process
+                continue
+            total_size += size
+
+        removed = 0
+        now = time.time()
+        for mtime, size, entry_dir in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_size:
+                break
+            if entry_dir == keep or now - mtime < MIN_EVICTION_AGE:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+            removed += 1
+
+        return removed
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _entry_dir(self, entry: str) -> Path:
+        digest = hashlib.sha256(entry.encode()).hexdigest()
+        return self.path / digest[:2] / digest
+
+    @staticmethod
+    def _download_http(url: str, filename: Path, etag: Optional[str]) -> Optional[str]:
+        """Download file if its ETag differs from `etag` and return the new ETag, return None
+        if the local copy is still valid."""
+        headers = {"If-None-Match": etag} if etag else {}
+        resp = requests.get(url, headers=headers, stream=True)
+        if resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+
+        with _atomic_file(filename) as ostream:
+            for chunk in resp.iter_content(chunk_size=2**20):
+                ostream.write(chunk)
+
+        return resp.headers.get("ETag", "")
+
+    @staticmethod
+    def _download_s3(s3_url: str, filename: Path, etag: Optional[str]) -> Optional[str]:
+        client = s3_utils.connect()
+        bucket, key = s3_utils.s3_bucket_key(s3_url)
+
+        new_etag = client.head_object(Bucket=bucket, Key=key)["ETag"]
+        if new_etag == etag:
+            return None
+
+        with _atomic_file(filename) as ostream:
+            client.download_fileobj(bucket, key, ostream)
+
+        return str(new_etag)
+
+
+class _atomic_file:
+    """Context manager for writing a file that only appears at its final location once it's complete."""
+
+    def __init__(self, filename: Path) -> None:
+        self.filename = filename
+
+    def __enter__(self) -> Any:
+        fd, self.tmp_name = tempfile.mkstemp(dir=self.filename.parent, prefix=".tmp-")
+        self.ostream = os.fdopen(fd, "wb")
+        return self.ostream
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.ostream.close()
+        if exc_type is None:
+            os.replace(self.tmp_name, self.filename)
+        else:
+            os.remove(self.tmp_name)
+
+
+def _atomic_write(filename: Path, content: bytes) -> None:
+    with _atomic_file(filename) as ostream:
+        ostream.write(content)
+
+
+_CACHE: Optional[CatalogCache] = (
+    CatalogCache(
+        os.path.expanduser(environ[CATALOG_CACHE_ENV]),
+        max_size=int(environ.get(CATALOG_CACHE_MAX_SIZE_ENV, DEFAULT_MAX_SIZE)),
+    )
+    if environ.get(CATALOG_CACHE_ENV)
+    else None
+)
+
+
+def set_cache_path(path: Optional[Union[str, Path]], max_size: int = DEFAULT_MAX_SIZE) -> None:
+    "Cache remote catalog files at given path (e.g. ~/.owid/catalog-cache), or disable the cache with None."
+    global _CACHE
+    _CACHE = CatalogCache(os.path.expanduser(path), max_size=max_size) if path else None
+
+
+def get_cache() -> Optional[CatalogCache]:
+    return _CACHE
@@ -3,11 +3,13 @@
 #  owid-catalog-py
 #
 
+import hashlib
 import heapq
 import json
 import os
 import re
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Iterable, Iterator, List, Optional, Union, cast
 from urllib.parse import urlparse
@@ -19,13 +21,14 @@ import requests
 import structlog
 
 from . import s3_utils
+from .cache import CatalogCache, get_cache
 from .datasets import CHANNEL, PREFERRED_FORMAT, SUPPORTED_FORMATS, Dataset, FileFormat
 from .tables import Table
 
 log = structlog.get_logger()
 
 # increment this on breaking changes to require clients to update
-OWID_CATALOG_VERSION = 3
+OWID_CATALOG_VERSION = 4
 
 # location of the default remote catalog
 OWID_CATALOG_URI = "https://catalog.ourworldindata.org/"
@@ -39,6 +42,9 @@ REMOTE_CATALOG: Optional["RemoteCatalog"] = None
 # what formats should we for our index of available datasets?
 INDEX_FORMATS: List[FileFormat] = ["feather"]
 
+# number of threads used for indexing changed datasets in `LocalCatalog.reindex`
+REINDEX_WORKERS = 8
+
 
 class CatalogMixin:
     """
@@ -153,6 +159,10 @@ class LocalCatalog(CatalogMixin):
         return df
 
     def iter_datasets(self, channel: CHANNEL, include: Optional[str] = None) -> Iterator[Dataset]:
+        for dir in self._iter_dataset_dirs(channel, include=include):
+            yield Dataset(dir)
+
+    def _iter_dataset_dirs(self, channel: CHANNEL, include: Optional[str] = None) -> Iterator[Path]:
         to_search = [self.path / channel]
         if not to_search[0].exists():
             return
@@ -162,19 +172,23 @@ class LocalCatalog(CatalogMixin):
         while to_search:
             dir = heapq.heappop(to_search)
             if (dir / "index.json").exists() and re_search.search(str(dir)):
-                yield Dataset(dir)
+                yield dir
                 continue
 
             for child in dir.iterdir():
                 if child.is_dir():
                     heapq.heappush(to_search, child)
 
-    def reindex(self, include: Optional[str] = None) -> None:
+    def reindex(self, include: Optional[str] = None, workers: int = REINDEX_WORKERS) -> None:
         """
         Walk the directory tree, generate a channel/namespace/version/dataset/table frame
         and save it to each of our index formats.
+
+        Index rows of every dataset are kept in a manifest together with a fingerprint of
+        its files (name, size, mtime and inode), so only new or modified datasets are
+        indexed again. Those are indexed in parallel using `workers` threads.
         """
-        index = self._scan_for_datasets(include)
+        index = self._scan_for_datasets(include, workers=workers)
 
         if include:
             # we used regex to find datasets, so merge it with the original frame
@@ -215,23 +229,53 @@ class LocalCatalog(CatalogMixin):
         # add a catalog version number that we can use to tell old clients to update
         self._save_metadata({"format_version": OWID_CATALOG_VERSION})
 
-    def _scan_for_datasets(self, include: Optional[str] = None) -> "CatalogFrame":
+    def _scan_for_datasets(self, include: Optional[str] = None, workers: int = REINDEX_WORKERS) -> "CatalogFrame":
         """Scan datasets. You can filter by `include` to get better performance."""
-        frames = []
+        manifest = self._load_reindex_manifest()
+        re_search = re.compile(include or "")
+
+        # keep entries of datasets we don't scan now, entries of scanned channels are rebuilt
+        # from scratch which drops deleted datasets
+        new_manifest = {
+            key: entry
+            for key, entry in manifest.items()
+            if Path(key).parts[0] not in self.channels or not re_search.search(str(self.path / key))
+        }
+
         log.info("reindex.start", channels=self.channels, include=include)
+        rows = []
         for channel in self.channels:
-            channel_frames = []
-            for ds in self.iter_datasets(channel, include=include):
-                channel_frames.append(ds.index(self.path))
-            frames += channel_frames
+            to_index = []
+            channel_entries = []
+            for dir in self._iter_dataset_dirs(channel, include=include):
+                key = dir.relative_to(self.path).as_posix()
+                fingerprint = _dataset_fingerprint(dir)
+                entry = manifest.get(key)
+                if entry is None or entry["fingerprint"] != fingerprint:
+                    entry = {"fingerprint": fingerprint, "rows": None}
+                    to_index.append((dir, entry))
+                new_manifest[key] = entry
+                channel_entries.append(entry)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                dirs = [dir for dir, _ in to_index]
+                for (_, entry), ds_rows in zip(to_index, executor.map(self._index_dataset, dirs)):
+                    entry["rows"] = ds_rows
+
+            for entry in channel_entries:
+                rows += entry["rows"]
+
             log.info(
                 "reindex",
                 channel=channel,
-                datasets=len(channel_frames),
+                datasets=len(channel_entries),
+                changed=len(to_index),
                 include=include,
             )
 
-        df = pd.concat(frames, ignore_index=True)
+        self._save_reindex_manifest(new_manifest)
+
+        df = pd.DataFrame.from_records(rows)
 
         keys = ["table", "dataset", "version", "namespace", "channel", "is_public"]
         columns = keys + [c for c in df.columns if c not in keys]
@@ -241,11 +285,51 @@ class LocalCatalog(CatalogMixin):
 
         return CatalogFrame(df)
 
+    def _index_dataset(self, dir: Path) -> List[Dict[str, Any]]:
+        return cast(List[Dict[str, Any]], Dataset(dir).index(self.path).to_dict(orient="records"))
+
+    @property
+    def _reindex_manifest_file(self) -> Path:
+        return self.path / ".reindex" / "manifest.json"
+
+    def _load_reindex_manifest(self) -> Dict[str, Any]:
+        """Load index rows and fingerprints of datasets from the last reindex."""
+        try:
+            with open(self._reindex_manifest_file) as istream:
+                manifest = json.load(istream)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+        # rows could be incompatible with the current version
+        if manifest.get("format_version") != OWID_CATALOG_VERSION:
+            return {}
+
+        return cast(Dict[str, Any], manifest["datasets"])
+
+    def _save_reindex_manifest(self, datasets: Dict[str, Any]) -> None:
+        self._reindex_manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first to never leave a corrupted manifest behind
+        tmp_file = self._reindex_manifest_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as ostream:
+            json.dump({"format_version": OWID_CATALOG_VERSION, "datasets": datasets}, ostream)
+        tmp_file.replace(self._reindex_manifest_file)
+
     def _save_metadata(self, contents: Dict[str, Any]) -> None:
         with open(self._metadata_file, "w") as ostream:
             json.dump(contents, ostream, indent=2)
 
 
+def _dataset_fingerprint(dir: Path) -> str:
+    """Fingerprint of all files in a dataset directory that changes whenever any of them
+    is added, removed or modified."""
+    _hash = hashlib.md5()
+    for entry in sorted(os.scandir(dir), key=lambda e: e.name):
+        if entry.is_file():
+            st = entry.stat()
+            _hash.update(f"{entry.name}:{st.st_size}:{st.st_mtime_ns}:{st.st_ino};".encode())
+    return _hash.hexdigest()
+
+
 class RemoteCatalog(CatalogMixin):
     uri: str
 
@@ -272,6 +356,11 @@ class RemoteCatalog(CatalogMixin):
         """
         Read the metadata JSON blob for this repo.
         """
+        cache = get_cache()
+        if cache:
+            with open(cache.download(uri, entry=uri)) as istream:
+                return cast(Dict[str, Any], json.load(istream))
+
         resp = requests.get(uri)
         resp.raise_for_status()
         return cast(Dict[str, Any], resp.json())
@@ -281,7 +370,12 @@ class RemoteCatalog(CatalogMixin):
         """
         Read selected channels from S3.
         """
-        return pd.concat([read_frame(uri + f"catalog-{channel}.{PREFERRED_FORMAT}") for channel in channels])
+        cache = get_cache()
+        frames = []
+        for channel in channels:
+            channel_uri = uri + f"catalog-{channel}.{PREFERRED_FORMAT}"
+            frames.append(read_frame(cache.download(channel_uri, entry=channel_uri) if cache else channel_uri))
+        return pd.concat(frames)
 
 
 class CatalogFrame(pd.DataFrame):
@@ -352,9 +446,21 @@ class CatalogSeries(pd.Series):
             format = PREFERRED_FORMAT if PREFERRED_FORMAT in self.formats else self.formats[0]
 
         if self.path and format and self._base_uri:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                uri = self._base_uri + self.path + "." + format
+            uri = self._base_uri + self.path + "." + format
+
+            cache = get_cache()
+            if cache:
+                checksum = getattr(self, "checksum", None)
+                return Table.read(
+                    _download_to_cache(
+                        cache,
+                        uri,
+                        is_public=getattr(self, "is_public", True),
+                        checksum=checksum if isinstance(checksum, str) else None,
+                    )
+                )
 
+            with tempfile.TemporaryDirectory() as tmpdir:
                 # download the data locally first if the file is private
                 # keep backward compatibility
                 if not getattr(self, "is_public", True):
@@ -421,6 +527,19 @@ def _download_private_file(uri: str, tmpdir: str) -> str:
     return tmpdir + "/data" + ext
 
 
+def _download_to_cache(cache: CatalogCache, uri: str, is_public: bool, checksum: Optional[str]) -> Path:
+    """Download table data and its metadata into the cache and return path to the data file. Tables
+    with a known checksum are never downloaded again, otherwise they're revalidated with ETags."""
+    base, ext = os.path.splitext(uri)
+    entry = f"{base}@{checksum}" if checksum else base
+
+    if not is_public:
+        base = S3_OWID_URI + os.path.splitext(urlparse(uri).path)[0]
+
+    cache.download(base + ".meta.json", entry=entry, immutable=bool(checksum))
+    return cache.download(base + ext, entry=entry, immutable=bool(checksum))
+
+
 class PackageUpdateRequired(Exception):
     pass
 
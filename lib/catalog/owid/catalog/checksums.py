@@ -0,0 +1,144 @@
+#
+#  checksums.py
+#
+
+import hashlib
+import os
+import sqlite3
+import threading
+from os import environ
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+# persistent checksum cache is only used if this is set (or after calling `set_cache_path`)
+CHECKSUM_CACHE_ENV = "OWID_CHECKSUM_CACHE"
+
+
+class ChecksumCache:
+    """
+    Persistent cache of MD5 checksums of files stored in a SQLite database. An entry
+    is only valid while the size, mtime and inode of the file stay the same, so a file
+    is only hashed again after it has been modified.
+
+    The cache is safe to use from multiple threads and processes. If the database cannot
+    be used (e.g. it is locked for too long or on a read-only filesystem), checksums are
+    computed without it.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def checksum_file(self, filename: Union[str, Path]) -> str:
+        "Return the md5 hex digest of the file contents."
+        filename = os.path.abspath(filename)
+        st = os.stat(filename)
+
+        md5 = self._get(filename, st)
+        if md5 is None:
+            md5 = checksum_file_nocache(filename)
+            # don't cache the checksum if the file was modified while we were reading it
+            if _stat_key(os.stat(filename)) == _stat_key(st):
+                self._set(filename, st, md5)
+
+        return md5
+
+    def invalidate(self, prefix: Optional[Union[str, Path]] = None) -> int:
+        """Remove all entries (or only entries for files under `prefix`) from the cache
+        and return number of removed entries."""
+        conn = self._connection()
+        if prefix is None:
+            cur = conn.execute("DELETE FROM checksums")
+        else:
+            prefix = os.path.abspath(prefix)
+            # match the file itself or files in the directory, but not siblings such as `prefix_v2`
+            dir_prefix = prefix if prefix.endswith(os.sep) else prefix + os.sep
+            cur = conn.execute(
+                "DELETE FROM checksums WHERE path = ? OR substr(path, 1, ?) = ?",
+                (prefix, len(dir_prefix), dir_prefix),
+            )
+        return cur.rowcount
+
+    def _get(self, filename: str, st: os.stat_result) -> Optional[str]:
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT md5 FROM checksums WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                    (filename, *_stat_key(st)),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def _set(self, filename: str, st: os.stat_result, md5: str) -> None:
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO checksums (path, size, mtime_ns, inode, md5) VALUES (?, ?, ?, ?, ?)",
+                (filename, *_stat_key(st), md5),
+            )
+        except sqlite3.Error:
+            pass
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads or forked processes
+        if getattr(self._local, "pid", None) != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checksums (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    md5 TEXT NOT NULL
+                )
+                """
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+
+        return self._local.conn
+
+
+_CACHE: Optional[ChecksumCache] = (
+    ChecksumCache(environ[CHECKSUM_CACHE_ENV]) if environ.get(CHECKSUM_CACHE_ENV) else None
+)
+
+
+def set_cache_path(path: Optional[Union[str, Path]]) -> None:
+    "Use persistent checksum cache at given path, or disable it with None."
+    global _CACHE
+    _CACHE = ChecksumCache(path) if path else None
+
+
+def get_cache() -> Optional[ChecksumCache]:
+    return _CACHE
+
+
+def checksum_file(filename: Union[str, Path]) -> str:
+    "Return the md5 hex digest of the file contents, using persistent cache if it is enabled."
+    if _CACHE is None:
+        return checksum_file_nocache(filename)
+    return _CACHE.checksum_file(filename)
+
+
+def checksum_file_nocache(filename: Union[str, Path]) -> str:
+    "Return the md5 hex digest of the file contents without using cache."
+    chunk_size = 2**20  # 1MB
+    _hash = hashlib.md5()
+    with open(filename, "rb") as istream:
+        chunk = istream.read(chunk_size)
+        while chunk:
+            _hash.update(chunk)
+            chunk = istream.read(chunk_size)
+
+    return _hash.hexdigest()
+
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+    return st.st_size, st.st_mtime_ns, st.st_ino
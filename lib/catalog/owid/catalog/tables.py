@@ -4,6 +4,7 @@
 
 import copy
 import json
+import operator
 from collections import defaultdict
 from os.path import dirname, join, splitext
 from pathlib import Path
@@ -23,6 +24,7 @@ from typing import (
 
 import pandas as pd
 import pyarrow
+import pyarrow.feather as feather
 import pyarrow.parquet as pq
 import structlog
 from owid.repack import repack_frame
@@ -41,6 +43,93 @@ METADATA_FIELDS = list(SCHEMA["properties"])
 # New type required for pandas reading functions.
 AnyStr = TypeVar("AnyStr", str, bytes)
 
+# Version of the JSON sidecar with table metadata. Version 2 stores origins, sources and licenses
+# shared by fields only once under "interned" and fields reference them by their position.
+METADATA_FORMAT_VERSION = 2
+INTERNED_FIELD_KEYS = ("origins", "sources", "licenses")
+
+# Row filters in the pyarrow format, e.g. [("country", "in", ["France", "Spain"]), ("year", ">=", 2000)].
+# All conditions must hold for a row to be loaded.
+Filters = List[Tuple[str, str, Any]]
+
+FILTER_OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda s, v: s.isin(v),
+    "not in": lambda s, v: ~s.isin(v),
+}
+
+
+class TableFields:
+    """
+    Bulk access to metadata of table columns (including index columns). Unlike `tb[col].metadata`,
+    it works directly on the metadata and doesn't touch the data, which makes metadata-only
+    changes of wide tables fast.
+    """
+
+    def __init__(self, table: "Table") -> None:
+        self._table = table
+
+    def __getitem__(self, column: str) -> VariableMeta:
+        self._check_column(column)
+        return self._table._fields[column]
+
+    def __setitem__(self, column: str, meta: VariableMeta) -> None:
+        self._check_column(column)
+        self._table._fields[column] = meta
+
+    def get(self, attr: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Return {column: value} of metadata attribute `attr` for given columns (all columns by default)."""
+        self._check_attr(attr)
+        columns = list(self._table.columns) if columns is None else columns
+        self._check_columns(columns)
+        return {col: getattr(self._table._fields[col], attr) for col in columns}
+
+    def set(self, attr: str, values: Any, columns: Optional[List[str]] = None) -> None:
+        """
+        Set metadata attribute `attr`. `values` is either a mapping (dict or Series) {column: value},
+        or a single value that is (deep)copied to all columns. If `columns` are given, `values` is
+        always a single value.
+        """
+        self._check_attr(attr)
+        if columns is None and isinstance(values, (dict, pd.Series)):
+            values = dict(values.items())
+        else:
+            value = values
+            values = {col: copy.deepcopy(value) for col in (list(self._table.columns) if columns is None else columns)}
+
+        self._check_columns(values.keys())
+        fields = self._table._fields
+        for col, value in values.items():
+            setattr(fields[col], attr, value)
+
+    def update_from_frame(self, df: pd.DataFrame) -> None:
+        """
+        Update metadata from a dataframe indexed by column names with one column per metadata
+        attribute, e.g. `data.groupby("variable_name")[["unit", "short_unit"]].first()`. Missing
+        values leave the current metadata untouched.
+        """
+        for attr in df.columns:
+            self.set(attr, df[attr].dropna())
+
+    def _check_attr(self, attr: str) -> None:
+        if attr not in VariableMeta.__dataclass_fields__:
+            raise AttributeError(f"VariableMeta has no attribute `{attr}`")
+
+    def _check_column(self, column: str) -> None:
+        if column not in self._table.columns and column not in self._table.index.names:
+            raise KeyError(f"Column not found in table: {column}")
+
+    def _check_columns(self, columns: Any) -> None:
+        missing = set(columns) - set(self._table.all_columns)
+        if missing:
+            raise KeyError(f"Columns not found in table: {sorted(missing)}")
+
 
 class Table(pd.DataFrame):
     # metdata about the entire table
@@ -117,6 +206,14 @@ class Table(pd.DataFrame):
     def primary_key(self) -> List[str]:
         return [n for n in self.index.names if n]
 
+    @property
+    def fields(self) -> "TableFields":
+        """
+        Read and update metadata of many columns at once without creating a Variable for each
+        of them, e.g. `tb.fields.set("unit", {"gdp": "dollars"})` or `tb.fields.get("title")`.
+        """
+        return TableFields(self)
+
     def to(self, path: Union[str, Path], repack: bool = True) -> None:
         """
         Save this table in one of our SUPPORTED_FORMATS.
@@ -141,18 +238,32 @@ class Table(pd.DataFrame):
             raise ValueError(f"could not detect a suitable format to save to: {path}")
 
     @classmethod
-    def read(cls, path: Union[str, Path]) -> "Table":
+    def read(
+        cls,
+        path: Union[str, Path],
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+    ) -> "Table":
+        """
+        Read the table from one of our SUPPORTED_FORMATS.
+
+        :param columns: Only load these columns (index columns are always loaded). Metadata is
+            only loaded for the selected columns too.
+        :param filters: Only load rows matching all these conditions, e.g.
+            `[("country", "in", ["France", "Spain"]), ("year", ">=", 2000)]`. Supported operators
+            are =, ==, !=, <, <=, >, >=, in and not in.
+        """
         if isinstance(path, Path):
             path = path.as_posix()
 
         if path.endswith(".csv"):
-            table = cls.read_csv(path)
+            table = cls.read_csv(path, columns=columns, filters=filters)
 
         elif path.endswith(".feather"):
-            table = cls.read_feather(path)
+            table = cls.read_feather(path, columns=columns, filters=filters)
 
         elif path.endswith(".parquet"):
-            table = cls.read_parquet(path)
+            table = cls.read_parquet(path, columns=columns, filters=filters)
         else:
             raise ValueError(f"could not detect a suitable format to read from: {path}")
 
@@ -162,6 +273,36 @@ class Table(pd.DataFrame):
 
         return table
 
+    @classmethod
+    def read_schema(cls, path: Union[str, Path]) -> "Table":
+        """
+        Read an empty table with the columns, index and metadata of the table stored at given
+        path, without reading its data. This is much faster than `read` if you only need to
+        update its metadata.
+        """
+        if isinstance(path, Path):
+            path = path.as_posix()
+
+        if path.endswith(".csv"):
+            df = pd.read_csv(path, index_col=False, nrows=0)
+
+        elif path.endswith(".feather"):
+            with pyarrow.ipc.open_file(pyarrow.memory_map(path)) as reader:
+                df = reader.schema.empty_table().to_pandas()
+
+        elif path.endswith(".parquet"):
+            df = pq.read_schema(path).empty_table().to_pandas()
+        else:
+            raise ValueError(f"could not detect a suitable format to read from: {path}")
+
+        table = Table(df)
+        cls._add_metadata(table, cls._read_metadata(path))
+
+        # Same as in `read` to get the same metadata
+        table = update_processing_logs_when_loading_or_creating_table(table=table)
+
+        return table
+
     # Mypy complaints about this not matching the defintiion of NDFrame.to_csv but I don't understand why
     def to_csv(self, path: Any, **kwargs: Any) -> None:  # type: ignore
         """
@@ -172,10 +313,7 @@ class Table(pd.DataFrame):
         if not str(path).endswith(".csv"):
             raise ValueError(f'filename must end in ".csv": {path}')
 
-        df = pd.DataFrame(self)
-        # if the dataframe uses the default index then we don't want to store it (would be a column of row numbers)
-        save_index = self.primary_key != []
-        df.to_csv(path, index=save_index, **kwargs)
+        _write_csv(pd.DataFrame(self), path, self.primary_key, **kwargs)
 
         metadata_filename = splitext(path)[0] + ".meta.json"
         self._save_metadata(metadata_filename)
@@ -195,20 +333,7 @@ class Table(pd.DataFrame):
         if not str(path).endswith(".feather"):
             raise ValueError(f'filename must end in ".feather": {path}')
 
-        # feather can't store the index
-        df = pd.DataFrame(self)
-        if self.primary_key:
-            overlapping_names = set(self.index.names) & set(self.columns)
-            if overlapping_names:
-                raise ValueError(f"index names are overlapping with column names: {overlapping_names}")
-            df = df.reset_index()
-
-        if repack:
-            # use smaller data types wherever possible
-            # NOTE: this can be slow for large dataframes
-            df = repack_frame(df)
-
-        df.to_feather(path, compression=compression, **kwargs)
+        _write_feather(pd.DataFrame(self), path, self.primary_key, repack=repack, compression=compression, **kwargs)
 
         self._save_metadata(self.metadata_filename(path))
 
@@ -225,46 +350,21 @@ class Table(pd.DataFrame):
         if not str(path).endswith(".parquet"):
             raise ValueError(f'filename must end in ".parquet": {path}')
 
-        # parquet can store the index, but repacking is wasted on index columns so
-        # we get rid of the index first
-        df = pd.DataFrame(self)
-        if self.primary_key:
-            df = df.reset_index()
-
-        if repack:
-            # use smaller data types wherever possible
-            # NOTE: this can be slow for large dataframes
-            df = repack_frame(df)
-
-        # create a pyarrow table with metadata in the schema
-        # (some metadata gets auto-generated to help pandas deserialise better, we want to keep that)
-        t = pyarrow.Table.from_pandas(df)
-
-        # adding metadata would make reading partial content inefficient, see https://github.com/owid/etl/issues/783
-        # new_metadata = {
-        #     b"owid_table": json.dumps(self.metadata.to_dict(), default=str),  # type: ignore
-        #     b"owid_fields": json.dumps(self._get_fields_as_dict(), default=str),
-        #     b"primary_key": json.dumps(self.primary_key),
-        #     **t.schema.metadata,
-        # }
-        # schema = t.schema.with_metadata(new_metadata)
-        # t = t.cast(schema)
-
-        # write the combined table to disk
-        pq.write_table(t, path)
+        _write_parquet(pd.DataFrame(self), path, self.primary_key, repack=repack)
 
         self._save_metadata(self.metadata_filename(path))
 
     def _save_metadata(self, filename: str) -> None:
-        # write metadata
-        with open(filename, "w") as ostream:
-            metadata = self.metadata.to_dict()  # type: ignore
-            metadata["primary_key"] = self.primary_key
-            metadata["fields"] = self._get_fields_as_dict()
-            json.dump(metadata, ostream, indent=2, default=str)
+        fields, interned = _intern_fields(self._get_fields_as_dict())
+        _write_metadata(filename, self.metadata.to_dict(), self.primary_key, fields, interned)  # type: ignore
 
     @classmethod
-    def read_csv(cls, path: Union[str, Path]) -> "Table":
+    def read_csv(
+        cls,
+        path: Union[str, Path],
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+    ) -> "Table":
         """
         Read the table from csv plus accompanying JSON sidecar.
         """
@@ -274,17 +374,26 @@ class Table(pd.DataFrame):
         if not path.endswith(".csv"):
             raise ValueError(f'filename must end in ".csv": {path}')
 
-        # load the data
-        df = Table(pd.read_csv(path, index_col=False, na_values=[""], keep_default_na=False))
-
         # load the metadata
         metadata = cls._read_metadata(path)
 
         primary_key = metadata.pop("primary_key") if "primary_key" in metadata else []
         fields = metadata.pop("fields") if "fields" in metadata else {}
 
+        # load the data
+        read_columns, keep_columns = _columns_to_read(primary_key, columns, filters)
+        df = pd.read_csv(path, index_col=False, na_values=[""], keep_default_na=False, usecols=read_columns)
+        if filters:
+            df = _filter_frame(df, filters)
+        if keep_columns is not None:
+            df = df[keep_columns]
+        df = Table(df)
+
+        interned = metadata.pop("interned") if "interned" in metadata else {}
+        metadata.pop("format_version", None)
+
         df.metadata = TableMeta(**metadata)
-        df._fields = defaultdict(VariableMeta, {k: VariableMeta.from_dict(v) for k, v in fields.items()})
+        df._set_fields_from_dict(_selected_fields(fields, df.columns), interned)
 
         if primary_key:
             df.set_index(primary_key, inplace=True)
@@ -292,24 +401,33 @@ class Table(pd.DataFrame):
         return df
 
     @classmethod
-    def _add_metadata(cls, df: pd.DataFrame, path: str) -> None:
-        """Read metadata from JSON sidecar and add it to the dataframe."""
-        metadata = cls._read_metadata(path)
+    def _add_metadata(cls, df: pd.DataFrame, metadata: Dict[str, Any]) -> None:
+        """Add metadata read from JSON sidecar to the dataframe. Field metadata is only
+        parsed for columns present in the dataframe and only once it's accessed."""
+        metadata = metadata.copy()
 
         primary_key = metadata.get("primary_key", [])
         fields = metadata.pop("fields") if "fields" in metadata else {}
+        interned = metadata.pop("interned") if "interned" in metadata else {}
+        metadata.pop("format_version", None)
 
         df.metadata = TableMeta.from_dict(metadata)
-        df._set_fields_from_dict(fields)
+        df._set_fields_from_dict(_selected_fields(fields, df.columns), interned)
 
         # NOTE: setting index is really slow for large datasets
         if primary_key:
             df.set_index(primary_key, inplace=True)
 
     @classmethod
-    def read_feather(cls, path: Union[str, Path]) -> "Table":
+    def read_feather(
+        cls,
+        path: Union[str, Path],
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+    ) -> "Table":
         """
-        Read the table from feather plus accompanying JSON sidecar.
+        Read the table from feather plus accompanying JSON sidecar. Local files are
+        memory mapped, so only the selected columns and rows are materialised.
 
         The path may be a local file path or a URL.
         """
@@ -319,15 +437,31 @@ class Table(pd.DataFrame):
         if not path.endswith(".feather"):
             raise ValueError(f'filename must end in ".feather": {path}')
 
+        metadata = cls._read_metadata(path)
+        read_columns, keep_columns = _columns_to_read(metadata.get("primary_key", []), columns, filters)
+
         # load the data and add metadata
-        df = Table(pd.read_feather(path))
-        cls._add_metadata(df, path)
+        is_local = not path.startswith("http")
+        t = feather.read_table(path if is_local else _download_buffer(path), columns=read_columns, memory_map=is_local)
+        if filters:
+            t = t.filter(pq.filters_to_expression(filters))  # type: ignore
+        if keep_columns is not None:
+            t = t.select(keep_columns)
+
+        df = Table(t.to_pandas())
+        cls._add_metadata(df, metadata)
         return df
 
     @classmethod
-    def read_parquet(cls, path: Union[str, Path]) -> "Table":
+    def read_parquet(
+        cls,
+        path: Union[str, Path],
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+    ) -> "Table":
         """
-        Read the table from a parquet file plus accompanying JSON sidecar.
+        Read the table from a parquet file plus accompanying JSON sidecar. Filters are
+        pushed down to skip row groups that can't match them.
 
         The path may be a local file path or a URL.
         """
@@ -337,16 +471,30 @@ class Table(pd.DataFrame):
         if not path.endswith(".parquet"):
             raise ValueError(f'filename must end in ".parquet": {path}')
 
+        metadata = cls._read_metadata(path)
+        read_columns, keep_columns = _columns_to_read(metadata.get("primary_key", []), columns, filters)
+
         # load the data and add metadata
-        df = Table(pd.read_parquet(path))
-        cls._add_metadata(df, path)
+        is_local = not path.startswith("http")
+        t = pq.read_table(
+            path if is_local else _download_buffer(path),
+            columns=read_columns,
+            filters=filters,
+            memory_map=is_local,
+            use_pandas_metadata=True,
+        )
+        if keep_columns is not None:
+            t = t.select(keep_columns)
+
+        df = Table(t.to_pandas())
+        cls._add_metadata(df, metadata)
         return df
 
     def _get_fields_as_dict(self) -> Dict[str, Any]:
         return {col: self._fields[col].to_dict() for col in self.all_columns}
 
-    def _set_fields_from_dict(self, fields: Dict[str, Any]) -> None:
-        self._fields = defaultdict(VariableMeta, {k: VariableMeta.from_dict(v) for k, v in fields.items()})
+    def _set_fields_from_dict(self, fields: Dict[str, Any], interned: Optional[Dict[str, List[Any]]] = None) -> None:
+        self._fields = LazyFields.from_dict(fields, interned)
 
     @staticmethod
     def _read_metadata(data_path: str) -> Dict[str, Any]:
@@ -1166,6 +1314,246 @@ class ExcelFile(pd.ExcelFile):
         return table
 
 
+def _columns_to_read(
+    primary_key: List[str], columns: Optional[List[str]], filters: Optional[Filters]
+) -> Tuple[Optional[List[str]], Optional[List[str]]]:
+    """Return columns to read from file (including index and filtered columns) and
+    columns to keep after filtering. None means all columns."""
+    if columns is None:
+        return None, None
+
+    keep_columns = list(dict.fromkeys(primary_key + list(columns)))
+    filter_columns = [col for col, _, _ in filters or []]
+    read_columns = list(dict.fromkeys(keep_columns + filter_columns))
+    return read_columns, keep_columns
+
+
+def _filter_frame(df: pd.DataFrame, filters: Filters) -> pd.DataFrame:
+    """Filter rows of a dataframe, used for formats without filter pushdown."""
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"unsupported filter operator: {op}")
+        mask &= FILTER_OPERATORS[op](df[col], value)
+    return df.loc[mask].reset_index(drop=True)
+
+
+def _selected_fields(fields: Dict[str, Any], columns: Any) -> Dict[str, Any]:
+    """Keep field metadata only for loaded columns (index columns were loaded as columns)."""
+    columns = set(columns)
+    return {k: v for k, v in fields.items() if k in columns}
+
+
+def _write_csv(df: pd.DataFrame, path: str, primary_key: List[str], **kwargs: Any) -> None:
+    # if the dataframe uses the default index then we don't want to store it (would be a column of row numbers)
+    df.to_csv(path, index=primary_key != [], **kwargs)
+
+
+def _write_feather(
+    df: pd.DataFrame,
+    path: str,
+    primary_key: List[str],
+    repack: bool = True,
+    compression: Literal["zstd", "lz4", "uncompressed"] = "zstd",
+    **kwargs: Any,
+) -> None:
+    # feather can't store the index
+    if primary_key:
+        overlapping_names = set(df.index.names) & set(df.columns)
+        if overlapping_names:
+            raise ValueError(f"index names are overlapping with column names: {overlapping_names}")
+        df = df.reset_index()
+
+    if repack:
+        # use smaller data types wherever possible
+        # NOTE: this can be slow for large dataframes
+        df = repack_frame(df)
+
+    df.to_feather(path, compression=compression, **kwargs)
+
+
+def _write_parquet(df: pd.DataFrame, path: str, primary_key: List[str], repack: bool = True) -> None:
+    # parquet can store the index, but repacking is wasted on index columns so
+    # we get rid of the index first
+    if primary_key:
+        df = df.reset_index()
+
+    if repack:
+        # use smaller data types wherever possible
+        # NOTE: this can be slow for large dataframes
+        df = repack_frame(df)
+
+    # create a pyarrow table with metadata in the schema
+    # (some metadata gets auto-generated to help pandas deserialise better, we want to keep that)
+    t = pyarrow.Table.from_pandas(df)
+
+    # adding metadata would make reading partial content inefficient, see https://github.com/owid/etl/issues/783
+    # new_metadata = {
+    #     b"owid_table": json.dumps(self.metadata.to_dict(), default=str),  # type: ignore
+    #     b"owid_fields": json.dumps(self._get_fields_as_dict(), default=str),
+    #     b"primary_key": json.dumps(self.primary_key),
+    #     **t.schema.metadata,
+    # }
+    # schema = t.schema.with_metadata(new_metadata)
+    # t = t.cast(schema)
+
+    # write the combined table to disk
+    pq.write_table(t, path)
+
+
+def _write_metadata(
+    filename: str,
+    metadata: Dict[str, Any],
+    primary_key: List[str],
+    fields: Dict[str, Any],
+    interned: Dict[str, List[Any]],
+) -> None:
+    """Write JSON sidecar with table metadata and already interned field metadata."""
+    metadata = dict(
+        metadata, format_version=METADATA_FORMAT_VERSION, primary_key=primary_key, fields=fields, interned=interned
+    )
+    with open(filename, "w") as ostream:
+        json.dump(metadata, ostream, default=str, separators=(",", ":"))
+
+
+def _intern_fields(fields: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+    """Replace origins, sources and licenses of fields by their position in the returned
+    list of unique values."""
+    interned: Dict[str, List[Any]] = {}
+    for key in INTERNED_FIELD_KEYS:
+        positions: Dict[str, int] = {}
+        for field in fields.values():
+            if key not in field:
+                continue
+            refs = []
+            for value in field[key]:
+                value_key = json.dumps(value, sort_keys=True, default=str)
+                if value_key not in positions:
+                    positions[value_key] = len(positions)
+                    interned.setdefault(key, []).append(value)
+                refs.append(positions[value_key])
+            field[key] = refs
+    return fields, interned
+
+
+class _RawField:
+    """Field metadata from JSON sidecar that hasn't been parsed into VariableMeta yet."""
+
+    __slots__ = ("data", "interned")
+
+    def __init__(self, data: Dict[str, Any], interned: Dict[str, List[Any]]) -> None:
+        self.data = data
+        self.interned = interned
+
+    def parse(self) -> VariableMeta:
+        data = self.data
+        if self.interned:
+            data = dict(data)
+            for key in INTERNED_FIELD_KEYS:
+                if key in data:
+                    data[key] = [self.interned[key][i] for i in data[key]]
+        return VariableMeta.from_dict(data)
+
+
+class LazyFields(defaultdict):
+    """
+    Metadata of table columns that are parsed into `VariableMeta` only when they are
+    accessed for the first time. Reading tables with thousands of columns is then cheap
+    if only a few of them are used.
+
+    Behaves like `defaultdict(VariableMeta)`, all methods that expose values parse them.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args or (VariableMeta,), **kwargs)
+
+    @classmethod
+    def from_dict(cls, fields: Dict[str, Any], interned: Optional[Dict[str, List[Any]]] = None) -> "LazyFields":
+        lazy_fields = cls()
+        for k, v in fields.items():
+            dict.__setitem__(lazy_fields, k, _RawField(v, interned or {}))
+        return lazy_fields
+
+    def __getitem__(self, key: Any) -> VariableMeta:
+        value = super().__getitem__(key)
+        if isinstance(value, _RawField):
+            value = value.parse()
+            dict.__setitem__(self, key, value)
+        return value
+
+    # overriding __iter__ makes dict(), update() and ** use keys() and __getitem__ instead of
+    # copying unparsed values
+    def __iter__(self) -> Any:
+        return super().__iter__()
+
+    def _parse_all(self) -> None:
+        for key in list(dict.keys(self)):
+            self[key]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def pop(self, key: Any, *args: Any) -> Any:
+        value = super().pop(key, *args)
+        return value.parse() if isinstance(value, _RawField) else value
+
+    def popitem(self) -> Any:
+        key, value = super().popitem()
+        return key, value.parse() if isinstance(value, _RawField) else value
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        return super().setdefault(key, default)
+
+    def values(self) -> Any:
+        self._parse_all()
+        return super().values()
+
+    def items(self) -> Any:
+        self._parse_all()
+        return super().items()
+
+    def copy(self) -> "LazyFields":
+        # unparsed fields are never modified, so they can be shared
+        new = LazyFields()
+        dict.update(new, dict.items(self))
+        return new
+
+    def __copy__(self) -> "LazyFields":
+        return self.copy()
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LazyFields":
+        new = LazyFields()
+        for key, value in dict.items(self):
+            dict.__setitem__(new, key, value if isinstance(value, _RawField) else copy.deepcopy(value, memo))
+        return new
+
+    def __reduce__(self) -> Any:
+        return (LazyFields, (), None, None, iter(self.items()))
+
+    def __eq__(self, other: Any) -> bool:
+        self._parse_all()
+        if isinstance(other, LazyFields):
+            other._parse_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other: Any) -> bool:
+        return not self == other
+
+    def __repr__(self) -> str:
+        self._parse_all()
+        return super().__repr__()
+
+
+def _download_buffer(url: str) -> pyarrow.BufferReader:
+    import requests
+
+    resp = requests.get(url)
+    resp.raise_for_status()
+    return pyarrow.BufferReader(resp.content)
+
+
 def update_processing_logs_when_loading_or_creating_table(table: Table) -> Table:
     # Add entry to processing log, specifying that each variable was loaded from this table.
     try:
@@ -1197,6 +1585,10 @@ def update_processing_logs_when_saving_table(table: Table, path: Union[str, Path
 def _add_processing_log_entry_to_each_variable(
     table: Table, parents: List[Any], operation: variables.OPERATION
 ) -> Table:
+    # Don't touch metadata at all if processing log is disabled, it would be parsed for every column.
+    if not variables.PROCESSING_LOG:
+        return table
+
     # Add a processing log entry to each column, including index columns.
     for column in list(table.all_columns):
         # New entry to add to the processing log.
@@ -1204,13 +1596,14 @@ def _add_processing_log_entry_to_each_variable(
         # the entry has the field "variable" (for simplicity).
         log_new_entry = {"variable_name": column, "parents": parents, "operation": operation}
 
-        if log_new_entry not in table._fields[column].processing_log:
+        processing_log = table._fields[column].processing_log
+        if not processing_log or processing_log[-1] != {"variable": column, "parents": parents, "operation": operation}:
             # If the processing log is not empty but the last entry is identical to the one we want to insert, skip, to
             # avoid storing the same entry multiple times.
             # This happens for example when saving tables, given that tables are stored in different formats.
             # Otherwise, append a new entry to the processing log.
             table._fields[column].processing_log = variables.add_entry_to_processing_log(
-                processing_log=table._fields[column].processing_log, **log_new_entry
+                processing_log=processing_log, **log_new_entry
             )
 
     return table
@@ -1251,11 +1644,12 @@ def copy_metadata(from_table: Table, to_table: Table, deep=False) -> Table:
 
     common_columns = set(to_table.all_columns) & set(from_table.all_columns)
 
-    new_fields = defaultdict(VariableMeta)
+    new_fields = LazyFields()
     for k in common_columns:
-        # copy if we have metadata in the other table
+        # copy if we have metadata in the other table (unparsed metadata is shared)
         if k in from_table._fields:
-            new_fields[k] = from_table._fields[k].copy()
+            value = dict.__getitem__(from_table._fields, k)
+            dict.__setitem__(new_fields, k, value if isinstance(value, _RawField) else value.copy())
         # otherwise keep current metadata (if it exists)
         elif k in to_table._fields:
             new_fields[k] = to_table._fields[k]
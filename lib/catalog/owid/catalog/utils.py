@@ -210,10 +210,12 @@ def underscore_table(
     t.metadata.short_name = underscore(t.metadata.short_name, camel_to_snake=camel_to_snake)
 
     # put original names as titles into metadata by default
-    for c_old, c_new in columns_map.items():
+    titles = t.fields.get("title")
+    t.fields.set(
+        "title",
         # if underscoring didn't change anything, don't add title
-        if t[c_new].metadata.title is None and c_old != c_new:
-            t[c_new].metadata.title = c_old
+        {c_new: c_old for c_old, c_new in columns_map.items() if titles[c_new] is None and c_old != c_new},
+    )
 
     return t
 
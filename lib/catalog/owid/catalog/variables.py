@@ -6,7 +6,19 @@ import copy
 import json
 import os
 from collections import defaultdict
-from typing import Any, Dict, List, Literal, Optional, Union, cast, overload
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+    overload,
+)
 
 import pandas as pd
 import structlog
@@ -69,6 +81,157 @@ PROCESSING_LOG = bool(os.getenv("PROCESSING_LOG", False))
 UNNAMED_VARIABLE = "**TEMPORARY UNNAMED VARIABLE**"
 
 
+class ProcessingLog:
+    """
+    Immutable processing log of a variable, stored as a node of a DAG shared by all variables
+    derived from it. A node references logs of its parents and adds at most one entry, so
+    extending or combining logs doesn't copy them. Its entries are the entries of all parents
+    (in order) followed by its own entry, just like when concatenating lists of entries.
+
+    Behaves like a read-only list, the full list of entries is only built when it's needed
+    (e.g. when metadata is serialised).
+    """
+
+    __slots__ = ("_parents", "_entry", "_len", "_unnamed", "_entries")
+
+    def __init__(self, parents: Sequence["ProcessingLog"] = (), entry: Optional[Dict[str, Any]] = None) -> None:
+        self._parents: Tuple[ProcessingLog, ...] = tuple(p for p in parents if p._len)
+        self._entry = entry
+        self._len = sum(p._len for p in self._parents) + (entry is not None)
+        # does the log mention unnamed variable that should be renamed later?
+        self._unnamed = any(p._unnamed for p in self._parents) or (
+            entry is not None and UNNAMED_VARIABLE in json.dumps(entry, default=str)
+        )
+        self._entries: Optional[List[Dict[str, Any]]] = None
+
+    @classmethod
+    def from_list(cls, entries: Any) -> "ProcessingLog":
+        """Create log from a list of entries (or return it if it's already a ProcessingLog)."""
+        if isinstance(entries, ProcessingLog):
+            return entries
+        # a chain of nodes, each with a single entry
+        log = cls()
+        for entry in entries or []:
+            log = cls([log], copy.deepcopy(entry))
+        return log
+
+    def append(self, entry: Dict[str, Any]) -> "ProcessingLog":
+        """Return new log with an extra entry."""
+        return ProcessingLog([self], entry)
+
+    @classmethod
+    def combine(cls, logs: Sequence[Any]) -> "ProcessingLog":
+        """Return log with entries of all given logs."""
+        return cls([cls.from_list(log) for log in logs])
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Return all entries of the log."""
+        if self._entries is None:
+            entries = []
+            # traverse the DAG iteratively, pipelines can be deeper than the recursion limit
+            stack: List[Any] = [self]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, dict):
+                    entries.append(node)
+                    continue
+                if node._entry is not None:
+                    stack.append(node._entry)
+                stack.extend(reversed(node._parents))
+            self._entries = entries
+        return copy.deepcopy(self._entries)
+
+    def to_dict(self, **kwargs: Any) -> List[Dict[str, Any]]:
+        return self.to_list()
+
+    def rename_variable(self, old: str, new: str) -> "ProcessingLog":
+        """Return log with variable name `old` replaced by `new` in all entries. Only used for
+        renaming UNNAMED_VARIABLE, parts of the DAG that don't mention it are shared."""
+        assert old == UNNAMED_VARIABLE
+        if not self._unnamed:
+            return self
+
+        renamed: Dict[int, ProcessingLog] = {}
+        # post-order traversal of nodes that mention unnamed variable
+        stack: List[Tuple[ProcessingLog, bool]] = [(self, False)]
+        while stack:
+            node, visited = stack.pop()
+            if id(node) in renamed:
+                continue
+            if not node._unnamed:
+                renamed[id(node)] = node
+            elif visited:
+                entry = node._entry
+                if entry is not None:
+                    entry = json.loads(json.dumps(entry).replace(old, new))
+                renamed[id(node)] = ProcessingLog([renamed[id(p)] for p in node._parents], entry)
+            else:
+                stack.append((node, True))
+                stack.extend((p, False) for p in node._parents)
+        return renamed[id(self)]
+
+    def amend_last(self, fields: Dict[str, Any]) -> "ProcessingLog":
+        """Return log with non-empty `fields` updated in the last entry."""
+        if self._entry is None:
+            # last entry is in one of parents
+            return ProcessingLog(self._parents[:-1] + (self._parents[-1].amend_last(fields),))
+        entry = copy.deepcopy(self._entry)
+        for field, value in fields.items():
+            if value:
+                entry[field] = value
+        return ProcessingLog(self._parents, entry)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_list())
+
+    def __getitem__(self, i: Any) -> Any:
+        # last entry is used often and doesn't need the full list
+        if i == -1 and self._len:
+            node = self
+            while node._entry is None:
+                node = node._parents[-1]
+            return copy.deepcopy(node._entry)
+        return self.to_list()[i]
+
+    def __contains__(self, entry: Any) -> bool:
+        return entry in self.to_list()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ProcessingLog):
+            return self is other or (self._len == other._len and self.to_list() == other.to_list())
+        if isinstance(other, list):
+            return self._len == len(other) and self.to_list() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(json.dumps(self.to_list(), sort_keys=True, default=str))
+
+    def __add__(self, other: Any) -> "ProcessingLog":
+        return ProcessingLog.combine([self, other])
+
+    def __radd__(self, other: Any) -> "ProcessingLog":
+        return ProcessingLog.combine([other, self])
+
+    # the log is immutable and can be shared
+    def __copy__(self) -> "ProcessingLog":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ProcessingLog":
+        return self
+
+    def __reduce__(self) -> Any:
+        return (ProcessingLog.from_list, (self.to_list(),))
+
+    def __repr__(self) -> str:
+        return repr(self.to_list())
+
+
 class Variable(pd.Series):
     _name: Optional[str] = None
     _fields: Dict[str, VariableMeta]
@@ -400,16 +563,13 @@ def get_unique_licenses_from_variables(variables: List[Variable]) -> List[Licens
 
 
 def combine_variables_processing_logs(variables: List[Variable]) -> List[Dict[str, Any]]:
-    # Make a list with all entries in the processing log of all variables.
-    processing_log = sum(
-        [
-            variable.metadata.processing_log if variable.metadata.processing_log is not None else []
-            for variable in variables
-        ],
-        [],
-    )
+    # Combine processing logs of all variables (without copying them).
+    processing_logs = [variable.metadata.processing_log for variable in variables if variable.metadata.processing_log]
+    if not processing_logs:
+        return []
 
-    return processing_log
+    # NOTE: ProcessingLog behaves like a read-only list of entries
+    return cast(List[Dict[str, Any]], ProcessingLog.combine(processing_logs))
 
 
 def _get_dict_from_list_if_all_identical(list_of_objects: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
@@ -514,9 +674,6 @@ def add_entry_to_processing_log(
         # Avoid any processing and simply return the same input processing log.
         return processing_log
 
-    # Consider using a deepcopy if any of the operations in this function alter mutable objects in processing_log.
-    processing_log_updated = copy.deepcopy(processing_log)
-
     # TODO: Parents currently can be anything. Here we should ensure that they are strings. For example, we could
     # extract the name of the parent if it is a variable.
 
@@ -525,10 +682,8 @@ def add_entry_to_processing_log(
     if comment is not None:
         log_new_entry["comment"] = comment
 
-    # Add new entry to log.
-    processing_log_updated += [log_new_entry]
-
-    return processing_log_updated
+    # Add new entry to log, the original log is shared and not copied.
+    return cast(List[Any], ProcessingLog.from_list(processing_log).append(log_new_entry))
 
 
 @overload
@@ -595,10 +750,13 @@ def amend_entry_in_processing_log(
         # Avoid any processing and simply return the same input processing log.
         return processing_log
 
+    fields = {"variable": variable_name, "parents": parents, "operation": operation, "comment": comment}
+    if isinstance(processing_log, ProcessingLog) and entry_num == -1:
+        return cast(List[Any], processing_log.amend_last(fields))
+
     # Consider using a deepcopy if any of the operations in this function alter mutable objects in processing_log.
-    processing_log_updated = copy.deepcopy(processing_log)
+    processing_log_updated = copy.deepcopy(list(processing_log))
 
-    fields = {"variable": variable_name, "parents": parents, "operation": operation, "comment": comment}
     for field, value in fields.items():
         if value:
             processing_log_updated[entry_num][field] = value  # type: ignore
@@ -681,10 +839,11 @@ def update_variable_name(variable: Variable, name: str) -> None:
     name : str
         New name to assign to the variable.
     """
-    if hasattr(variable.metadata, "processing_log") and variable.metadata.processing_log is not None:
-        variable.metadata.processing_log = json.loads(
-            json.dumps(variable.metadata.processing_log).replace("**TEMPORARY UNNAMED VARIABLE**", name)
-        )
+    processing_log = variable.metadata.processing_log
+    if isinstance(processing_log, ProcessingLog):
+        variable.metadata.processing_log = processing_log.rename_variable(UNNAMED_VARIABLE, name)
+    elif processing_log:
+        variable.metadata.processing_log = json.loads(json.dumps(processing_log).replace(UNNAMED_VARIABLE, name))
     variable.name = name
 
 
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from owid.catalog import LocalCatalog, RemoteCatalog, cache
+from owid.catalog.cache import CatalogCache
+
+from .test_catalogs import mock_catalog
+
+BASE_URI = "https://catalog.example.com/"
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes = b"", etag: Optional[str] = None) -> None:
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"ETag": etag} if etag else {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        yield self.content
+
+
+class FakeServer:
+    """Serve files from a local directory as if they were on HTTP server with ETags."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.requests: List[str] = []
+
+    def get(self, url: str, headers: Dict[str, str] = {}, **kwargs: Any) -> FakeResponse:
+        self.requests.append(url)
+        path = self.root / url[len(BASE_URI) :]
+        if not path.exists():
+            return FakeResponse(404)
+        content = path.read_bytes()
+        etag = hashlib.md5(content).hexdigest()
+        if headers.get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, content, etag)
+
+
+@pytest.fixture
+def catalog_cache() -> Iterator[CatalogCache]:
+    with tempfile.TemporaryDirectory() as dirname:
+        cache.set_cache_path(dirname)
+        try:
+            yield cache.get_cache()  # type: ignore
+        finally:
+            cache.set_cache_path(None)
+
+
+def test_download_revalidates_with_etag(catalog_cache: CatalogCache) -> None:
+    with tempfile.TemporaryDirectory() as dirname:
+        server = FakeServer(Path(dirname))
+        (server.root / "a.json").write_text("1")
+
+        with patch("requests.get", side_effect=server.get) as get:
+            path = catalog_cache.download(BASE_URI + "a.json", entry="a")
+            assert path.read_text() == "1"
+
+            # unchanged file is revalidated and not downloaded again
+            assert catalog_cache.download(BASE_URI + "a.json", entry="a") == path
+            assert get.call_args.kwargs["headers"] == {"If-None-Match": hashlib.md5(b"1").hexdigest()}
+            assert path.read_text() == "1"
+
+            # changed file is downloaded again
+            (server.root / "a.json").write_text("2")
+            assert catalog_cache.download(BASE_URI + "a.json", entry="a").read_text() == "2"
+
+            # immutable entries are not revalidated at all
+            n_requests = len(server.requests)
+            assert catalog_cache.download(BASE_URI + "a.json", entry="a", immutable=True).read_text() == "2"
+            assert len(server.requests) == n_requests
+
+
+def test_evict_least_recently_used(catalog_cache: CatalogCache) -> None:
+    with tempfile.TemporaryDirectory() as dirname:
+        server = FakeServer(Path(dirname))
+        for name in "abc":
+            (server.root / f"{name}.json").write_text(name * 10)
+
+        # every entry takes 42 bytes (10 bytes of data and 32 bytes of ETag), so only two of them fit
+        catalog_cache.max_size = 100
+        with patch("requests.get", side_effect=server.get), patch.object(cache, "MIN_EVICTION_AGE", 0):
+            a = catalog_cache.download(BASE_URI + "a.json", entry="a")
+            b = catalog_cache.download(BASE_URI + "b.json", entry="b")
+            os.utime(a.parent, (0, 0))
+            os.utime(b.parent, (1, 1))
+
+            # use `a` again so that `b` becomes the least recently used entry
+            catalog_cache.download(BASE_URI + "a.json", entry="a", immutable=True)
+            catalog_cache.download(BASE_URI + "c.json", entry="c")
+
+        assert a.exists()
+        assert not b.exists()
+
+
+def test_load_table_from_cache(catalog_cache: CatalogCache) -> None:
+    with mock_catalog(1) as local_catalog:
+        server = FakeServer(local_catalog.path)
+        frame = LocalCatalog(local_catalog.path).frame
+        frame._base_uri = BASE_URI
+        row = frame.iloc[0]
+
+        with patch("requests.get", side_effect=server.get):
+            table = row.load()
+            n_requests = len(server.requests)
+            assert n_requests == 2
+
+            # tables with checksum in the index are loaded without any requests
+            cached_table = row.load()
+            assert len(server.requests) == n_requests
+
+            # tables without checksum are revalidated
+            row.drop("checksum").load()
+            assert len(server.requests) == n_requests + 2
+
+        assert table.equals(cached_table)
+        assert table.metadata == cached_table.metadata
+
+
+def test_remote_catalog_index_is_revalidated(catalog_cache: CatalogCache) -> None:
+    with mock_catalog(2) as local_catalog:
+        server = FakeServer(local_catalog.path)
+
+        with patch("requests.get", side_effect=server.get) as get:
+            frame = RemoteCatalog(uri=BASE_URI).frame
+            assert all(call.kwargs["headers"] == {} for call in get.call_args_list)
+
+            get.reset_mock()
+            cached_frame = RemoteCatalog(uri=BASE_URI).frame
+            assert all("If-None-Match" in call.kwargs["headers"] for call in get.call_args_list)
+
+        pd.testing.assert_frame_equal(frame, cached_frame)
@@ -2,14 +2,17 @@
 #  test_catalogs.py
 #
 
+import shutil
 import tempfile
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterable, Iterator, Optional
+from unittest.mock import patch
 
+import pandas as pd
 import pytest  # noqa
 
-from owid.catalog import CHANNEL, LocalCatalog, RemoteCatalog, Table, find
+from owid.catalog import CHANNEL, Dataset, LocalCatalog, RemoteCatalog, Table, find
 
 from .test_datasets import create_temp_dataset
 
@@ -111,6 +114,32 @@ def test_reindex_with_include():
         )
 
 
+def test_reindex_only_changed_datasets():
+    with mock_catalog(3, channels=("garden", "meadow")) as catalog:
+        old_frame = catalog.frame.copy()
+
+        # nothing changed, no dataset should be indexed again
+        with patch.object(Dataset, "index", side_effect=AssertionError("dataset indexed")):
+            catalog.reindex()
+        pd.testing.assert_frame_equal(catalog.frame, old_frame)
+
+        # modify, add and delete datasets
+        create_temp_dataset(catalog.path / "garden" / "dataset0")
+        create_temp_dataset(catalog.path / "garden" / "dataset3")
+        shutil.rmtree(catalog.path / "meadow" / "dataset1")
+
+        with patch.object(Dataset, "index", autospec=True, side_effect=Dataset.index) as index:
+            catalog.reindex()
+        assert {Path(call.args[0].path).name for call in index.call_args_list} == {"dataset0", "dataset3"}
+
+        # result is the same as reindexing from scratch
+        shutil.rmtree(catalog.path / ".reindex")
+        incremental_frame = catalog.frame
+        catalog.reindex()
+        pd.testing.assert_frame_equal(incremental_frame, catalog.frame)
+        assert "dataset1" not in set(catalog.frame[catalog.frame.channel == "meadow"].dataset)
+
+
 @contextmanager
 def mock_catalog(n: int = 3, channels: Iterable[CHANNEL] = ("garden",)) -> Iterator[LocalCatalog]:
     with tempfile.TemporaryDirectory() as dirname:
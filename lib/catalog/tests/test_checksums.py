@@ -0,0 +1,67 @@
+import os
+from unittest.mock import patch
+
+from owid.catalog import checksums
+
+
+def test_checksum_cache(tmp_path):
+    cache = checksums.ChecksumCache(tmp_path / "checksums.sqlite")
+
+    f = tmp_path / "data.txt"
+    f.write_text("hello")
+    expected = checksums.checksum_file_nocache(f)
+    assert cache.checksum_file(f) == expected
+
+    # second call is served from the cache, even from a new instance
+    cache = checksums.ChecksumCache(tmp_path / "checksums.sqlite")
+    with patch.object(checksums, "checksum_file_nocache") as nocache:
+        assert cache.checksum_file(f) == expected
+        nocache.assert_not_called()
+
+    # modifying the file invalidates its entry
+    f.write_text("hello world")
+    assert cache.checksum_file(f) == checksums.checksum_file_nocache(f)
+
+    # mtime alone invalidates its entry too
+    st = os.stat(f)
+    os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    with patch.object(checksums, "checksum_file_nocache", return_value="x") as nocache:
+        assert cache.checksum_file(f) == "x"
+
+
+def test_checksum_cache_invalidate(tmp_path):
+    cache = checksums.ChecksumCache(tmp_path / "checksums.sqlite")
+
+    (tmp_path / "a").mkdir()
+    for name in ("a/1.txt", "a/2.txt", "b.txt"):
+        (tmp_path / name).write_text(name)
+        cache.checksum_file(tmp_path / name)
+
+    assert cache.invalidate(tmp_path / "a") == 2
+    assert cache.invalidate() == 1
+
+
+def test_checksum_cache_invalidate_sibling_directory(tmp_path):
+    cache = checksums.ChecksumCache(tmp_path / "checksums.sqlite")
+
+    for name in ("x/1.txt", "x_v2/1.txt", "x.txt"):
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(name)
+        cache.checksum_file(tmp_path / name)
+
+    # only files in the directory are invalidated, not in directories sharing its prefix
+    assert cache.invalidate(tmp_path / "x") == 1
+    assert cache.invalidate(tmp_path / "x.txt") == 1
+    assert cache.invalidate() == 1
+
+
+def test_checksum_file_uses_global_cache(tmp_path):
+    f = tmp_path / "data.txt"
+    f.write_text("hello")
+
+    try:
+        checksums.set_cache_path(tmp_path / "checksums.sqlite")
+        assert checksums.checksum_file(f) == checksums.checksum_file_nocache(f)
+        assert (tmp_path / "checksums.sqlite").exists()
+    finally:
+        checksums.set_cache_path(None)
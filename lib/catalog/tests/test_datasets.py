@@ -19,7 +19,7 @@ import pandas as pd
 import pytest
 import yaml
 
-from owid.catalog import Dataset, DatasetMeta, Table
+from owid.catalog import Dataset, DatasetMeta, Table, TableMeta, VariableMeta
 from owid.catalog.datasets import NonUniqueIndex, PrimaryKeyMissing
 
 from .mocking import mock
@@ -188,6 +188,45 @@ def test_add_table_parquet():
         assert t2.equals_table(t)
 
 
+@pytest.mark.parametrize("format", ["csv", "feather", "parquet"])
+def test_add_partitioned(tmp_path, format):
+    t = Table(
+        {
+            "product": ["Milk", "Milk", "Rice", "Rice", "Wheat (grain)"],
+            "country": ["AU", "SE", "AU", "SE", "AU"],
+            "production": [1.0, 2.0, 3.0, 4.0, 5.0],
+            "note": ["a", "b", "c", "d", "e"],
+        }
+    ).set_index(["product", "country"])
+    t.metadata = mock(TableMeta)
+    t.metadata.short_name = "food"
+    for col in t.all_columns:
+        t._fields[col] = mock(VariableMeta)
+
+    ds = Dataset.create_empty(tmp_path / "partitioned")
+    names = ds.add_partitioned(t, by="product", formats=[format])
+    assert names == ["milk", "rice", "wheat__grain"]
+
+    # partitions are the same as slices of the table added one by one
+    ds_sliced = Dataset.create_empty(tmp_path / "sliced")
+    for product, name in zip(["Milk", "Rice", "Wheat (grain)"], names):
+        t_product = t.loc[product].copy()
+        t_product.metadata.short_name = name
+        t_product.metadata.title = product
+        ds_sliced.add(t_product, formats=[format])
+
+        assert ds[name].equals_table(ds_sliced[name])
+        with open(join(ds.path, f"{name}.meta.json")) as f1, open(join(ds_sliced.path, f"{name}.meta.json")) as f2:
+            assert json.load(f1) == json.load(f2)
+
+
+def test_add_partitioned_duplicate_names(tmp_path):
+    t = Table({"product": ["A b", "a_b"], "gdp": [1, 2]}, short_name="test").set_index("product")
+    ds = Dataset.create_empty(tmp_path / "dataset")
+    with pytest.raises(ValueError, match="duplicate name"):
+        ds.add_partitioned(t, by="product")
+
+
 def test_metadata_roundtrip():
     with temp_dataset_dir() as dirname:
         d = Dataset.create_empty(dirname)
@@ -198,6 +237,19 @@ def test_metadata_roundtrip():
         assert d2.metadata == d.metadata
 
 
+def test_read_table_columns(tmp_path):
+    ds = Dataset.create_empty(tmp_path / "dataset")
+    t = Table({"country": ["AU", "SE"], "gdp": [100, 102], "hdi": [73, 92]}, short_name="test").set_index("country")
+    ds.add(t)
+
+    t2 = ds.read("test", columns=["hdi"], filters=[("country", "==", "SE")])
+    assert list(t2.columns) == ["hdi"]
+    assert t2.index.tolist() == ["SE"]
+
+    # reading without arguments loads the full table
+    assert list(ds["test"].columns) == ["gdp", "hdi"]
+
+
 def test_dataset_size():
     with mock_dataset() as d:
         n_expected = len(glob(join(d.path, "*.feather")))
@@ -286,6 +338,44 @@ def test_update_metadata(tmp_path):
         assert d[table_name]["gdp"].metadata.title == "Variable title from YAML"
 
 
+@pytest.mark.parametrize("format", ["feather", "parquet", "csv"])
+def test_save_does_not_read_data(tmp_path, format):
+    with mock_dataset(n_tables=0) as d:
+        t = Table({"country": ["AU", "SE"], "gdp": [100, 102], "hdi": [73, 92]}, short_name="test").set_index("country")
+        t.gdp.metadata.title = "GDP"
+        d.add(t, formats=[format])
+
+        # sidecar the same as if we loaded the whole table
+        d.metadata.title = "New title"
+        table = d["test"]
+        table.metadata.dataset = d.metadata
+        table._save_metadata(str(tmp_path / "expected.meta.json"))
+
+        with patch.object(Table, "read", side_effect=AssertionError("data should not be read")):
+            d.save()
+
+        with open(join(d.path, "test.meta.json")) as f:
+            meta = json.load(f)
+        assert meta == json.loads((tmp_path / "expected.meta.json").read_text())
+        assert meta["dataset"]["title"] == "New title"
+        assert list(meta["fields"]) == ["country", "gdp", "hdi"]
+        assert meta["fields"]["gdp"]["title"] == "GDP"
+
+
+def test_update_metadata_does_not_read_data(tmp_path):
+    with mock_dataset() as d:
+        table_name = d.table_names[0]
+
+        temp_file = tmp_path / "my.meta.yml"
+        meta = {"tables": {table_name: {"variables": {"gdp": {"title": "Variable title from YAML"}}}}}
+        temp_file.write_text(yaml.dump(meta))
+
+        with patch.object(Table, "read", side_effect=AssertionError("data should not be read")):
+            d.update_metadata(temp_file)
+
+        assert d[table_name]["gdp"].metadata.title == "Variable title from YAML"
+
+
 def test_bool():
     with mock_dataset(n_tables=0) as d:
         assert bool(d)
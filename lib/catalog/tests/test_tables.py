@@ -5,6 +5,7 @@
 import json
 import tempfile
 from os.path import exists, join, splitext
+from unittest.mock import patch
 
 import jsonschema
 import numpy as np
@@ -13,7 +14,7 @@ import pytest
 
 from owid.catalog import tables
 from owid.catalog.datasets import FileFormat
-from owid.catalog.meta import TableMeta, VariableMeta
+from owid.catalog.meta import License, Origin, TableMeta, VariableMeta
 from owid.catalog.tables import (
     SCHEMA,
     Table,
@@ -195,6 +196,150 @@ def test_field_metadata_serialised():
         assert_tables_eq(t1, t2)
 
 
+@pytest.mark.parametrize("format", ["csv", "feather", "parquet"])
+def test_read_columns_and_filters(format: str, tmp_path):
+    t1 = Table(
+        {
+            "country": ["AU", "SE", "CH", "SE"],
+            "year": [2000, 2000, 2001, 2001],
+            "gdp": [100, 102, 104, 106],
+            "hdi": [73, 92, 45, 93],
+        }
+    ).set_index(["country", "year"])
+    t1.gdp.metadata.description = "GDP"
+    t1.hdi.metadata.description = "HDI"
+
+    filename = tmp_path / f"test.{format}"
+    t1.to(filename)
+
+    t2 = Table.read(filename, columns=["gdp"], filters=[("country", "in", ["SE", "CH"]), ("hdi", ">", 50)])
+    assert t2.primary_key == ["country", "year"]
+    assert list(t2.columns) == ["gdp"]
+    assert t2.index.tolist() == [("SE", 2000), ("SE", 2001)]
+    assert t2.gdp.tolist() == [102, 106]
+    assert t2.gdp.metadata.description == "GDP"
+
+    # metadata of columns that were not loaded is not parsed
+    assert set(t2._fields) == {"country", "year", "gdp"}
+
+    # filtering without selecting columns
+    t3 = Table.read(filename, filters=[("year", ">=", 2001)])
+    assert list(t3.columns) == ["gdp", "hdi"]
+    assert t3.index.tolist() == [("CH", 2001), ("SE", 2001)]
+
+
+@pytest.mark.parametrize("format", ["csv", "feather", "parquet"])
+def test_sidecar_interns_shared_metadata(format: str, tmp_path) -> None:
+    t1 = Table({"country": ["AU", "SE"], "gdp": [100, 102], "hdi": [73, 92]}).set_index("country")
+    origin = Origin(producer="World Bank", title="WDI")
+    t1.gdp.metadata.origins = [origin]
+    t1.gdp.metadata.licenses = [License(name="CC BY 4.0")]
+    t1.hdi.metadata.origins = [Origin(producer="UNDP", title="HDR"), origin]
+    t1.hdi.metadata.licenses = [License(name="CC BY 4.0")]
+
+    filename = tmp_path / f"test.{format}"
+    t1.to(filename)
+
+    m = json.load(open(tmp_path / "test.meta.json"))
+    assert m["format_version"] == tables.METADATA_FORMAT_VERSION
+    assert [o["producer"] for o in m["interned"]["origins"]] == ["World Bank", "UNDP"]
+    assert [lic["name"] for lic in m["interned"]["licenses"]] == ["CC BY 4.0"]
+    assert m["fields"]["gdp"]["origins"] == [0]
+    assert m["fields"]["hdi"]["origins"] == [1, 0]
+
+    t2 = Table.read(filename)
+    assert t2.gdp.metadata == t1.gdp.metadata
+    assert t2.hdi.metadata == t1.hdi.metadata
+
+    # parsed objects are not shared between fields
+    t2.gdp.metadata.origins[0].title = "Changed"
+    assert t2.hdi.metadata.origins[1].title == "WDI"
+
+
+def test_read_v1_sidecar(tmp_path) -> None:
+    t1 = Table({"country": ["AU", "SE"], "gdp": [100, 102]}, short_name="test").set_index("country")
+    t1.gdp.metadata.origins = [Origin(producer="World Bank", title="WDI")]
+    t1.to(tmp_path / "test.feather")
+
+    # sidecar format used before interning
+    metadata = t1.metadata.to_dict()
+    metadata["primary_key"] = t1.primary_key
+    metadata["fields"] = t1._get_fields_as_dict()
+    with open(tmp_path / "test.meta.json", "w") as ostream:
+        json.dump(metadata, ostream, indent=2, default=str)
+
+    t2 = Table.read(tmp_path / "test.feather")
+    assert t2.metadata == t1.metadata
+    assert t2.gdp.metadata == t1.gdp.metadata
+
+
+def test_field_metadata_parsed_lazily(tmp_path) -> None:
+    t1 = Table({"country": ["AU", "SE"], "gdp": [100, 102], "hdi": [73, 92]}).set_index("country")
+    t1.gdp.metadata.title = "GDP"
+    t1.hdi.metadata.title = "HDI"
+    t1.to(tmp_path / "test.feather")
+
+    with patch.object(VariableMeta, "from_dict", wraps=VariableMeta.from_dict) as from_dict:
+        t2 = Table.read(tmp_path / "test.feather")
+        assert from_dict.call_count == 0
+
+        assert t2.gdp.metadata.title == "GDP"
+        assert from_dict.call_count == 1
+
+        # copies share unparsed fields and parse them on their own
+        t3 = t2.copy()
+        assert t3.hdi.metadata.title == "HDI"
+        assert from_dict.call_count == 2
+        t3.hdi.metadata.title = "Changed"
+        assert t2.hdi.metadata.title == "HDI"
+
+    # values are parsed when exposed
+    assert isinstance(t2._fields, tables.LazyFields)
+    assert all(isinstance(v, VariableMeta) for v in dict(t2._fields).values())
+    assert t2._fields == t1._fields
+    assert set(t2._fields) == {"country", "gdp", "hdi"}
+
+
+def test_fields_get_and_set() -> None:
+    t = Table({"country": ["AU", "SE"], "gdp": [100, 102], "hdi": [73, 92]}).set_index("country")
+    t.gdp.metadata.title = "GDP"
+
+    assert t.fields.get("title") == {"gdp": "GDP", "hdi": None}
+    assert t.fields.get("title", columns=["country"]) == {"country": None}
+
+    t.fields.set("unit", {"gdp": "dollars", "hdi": ""})
+    assert t.gdp.metadata.unit == "dollars"
+    assert t.hdi.metadata.unit == ""
+
+    # single values are copied to all columns
+    t.fields.set("display", {"name": "Name"}, columns=["gdp", "hdi"])
+    t.gdp.metadata.display["name"] = "GDP"
+    assert t.hdi.metadata.display == {"name": "Name"}
+
+    t.fields.set("short_unit", "$")
+    assert t.fields.get("short_unit") == {"gdp": "$", "hdi": "$"}
+
+    t.fields["hdi"] = VariableMeta(title="HDI")
+    assert t.hdi.metadata.title == "HDI"
+    assert t.fields["hdi"] is t.hdi.metadata
+
+    with pytest.raises(KeyError):
+        t.fields.set("title", {"population": "Population"})
+    with pytest.raises(AttributeError):
+        t.fields.set("units", {"gdp": "dollars"})
+
+
+def test_fields_update_from_frame() -> None:
+    t = Table({"country": ["AU", "SE"], "gdp": [100, 102], "hdi": [73, 92]}).set_index("country")
+    t.hdi.metadata.short_unit = "%"
+
+    meta = pd.DataFrame({"unit": ["dollars", "index"], "short_unit": ["$", None]}, index=["gdp", "hdi"])
+    t.fields.update_from_frame(meta)
+
+    assert t.fields.get("unit") == {"gdp": "dollars", "hdi": "index"}
+    assert t.fields.get("short_unit") == {"gdp": "$", "hdi": "%"}
+
+
 def test_tables_from_dataframes_have_variable_columns():
     df = pd.DataFrame({"gdp": [100, 102, 104], "country": ["AU", "SE", "CH"]})
     t = Table(df)
@@ -2,12 +2,17 @@
 #  test_variables
 #
 
+import copy
+import pickle
+
 import pandas as pd
 import pytest
 
 from owid.catalog.meta import VariableMeta
 from owid.catalog.variables import (
+    UNNAMED_VARIABLE,
     License,
+    ProcessingLog,
     Variable,
     combine_variables_metadata,
     get_unique_licenses_from_variables,
@@ -362,3 +367,56 @@ def test_copy() -> None:
     # make sure it doesn't affect original variable
     assert v1.metadata.title == "dog"
     assert v1.metadata.license.name == "dog license"
+
+
+def test_processing_log_behaves_like_list() -> None:
+    a = ProcessingLog.from_list([{"variable": "a", "parents": [], "operation": "load"}])
+    b = ProcessingLog().append({"variable": "b", "parents": [], "operation": "load"})
+    c = ProcessingLog.combine([a, b]).append({"variable": "c", "parents": ["a", "b"], "operation": "+"})
+
+    assert len(c) == 3
+    assert c == [
+        {"variable": "a", "parents": [], "operation": "load"},
+        {"variable": "b", "parents": [], "operation": "load"},
+        {"variable": "c", "parents": ["a", "b"], "operation": "+"},
+    ]
+    assert c[-1] == {"variable": "c", "parents": ["a", "b"], "operation": "+"}
+    assert [e["variable"] for e in c] == ["a", "b", "c"]
+    assert a + b == a.to_list() + b.to_list()
+    assert not ProcessingLog.combine([[], ProcessingLog()])
+
+    # logs are immutable and shared
+    assert copy.deepcopy(c) is c
+    c[-1]["variable"] = "changed"
+    assert c[-1]["variable"] == "c"
+
+    assert VariableMeta(processing_log=c).to_dict()["processing_log"] == c.to_list()
+    assert pickle.loads(pickle.dumps(c)) == c
+
+
+def test_processing_log_rename_and_amend() -> None:
+    log = ProcessingLog.from_list([{"variable": "a", "parents": [], "operation": "load"}])
+    log = log.append({"variable": UNNAMED_VARIABLE, "parents": ["a", 1], "operation": "+"})
+    log = log.append({"variable": UNNAMED_VARIABLE, "parents": [UNNAMED_VARIABLE], "operation": "fillna"})
+
+    renamed = log.rename_variable(UNNAMED_VARIABLE, "b")
+    assert [e["variable"] for e in renamed] == ["a", "b", "b"]
+    assert renamed[-1]["parents"] == ["b"]
+    # original log is unchanged
+    assert log[-1]["variable"] == UNNAMED_VARIABLE
+
+    amended = renamed.amend_last({"operation": "dropna", "comment": None})
+    assert amended[-1] == {"variable": "b", "parents": ["b"], "operation": "dropna"}
+    assert renamed[-1]["operation"] == "fillna"
+
+
+def test_processing_log_deep_pipeline() -> None:
+    # deep logs don't hit recursion limit
+    log = ProcessingLog()
+    for i in range(5000):
+        log = ProcessingLog.combine([log, [{"variable": "b", "parents": [], "operation": "load"}]]).append(
+            {"variable": "a", "parents": ["a", "b"], "operation": "+"}
+        )
+    assert len(log) == 10000
+    assert len(log.to_list()) == 10000
+    assert pickle.loads(pickle.dumps(log)) == log
@@ -1,13 +1,25 @@
 """Web utils."""
 
+import hashlib
+import json
+import os
 import re
+import threading
+import time
 import warnings
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
 from urllib.parse import urlparse
 
 import requests
+import structlog
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.ssl_ import create_urllib3_context  # type: ignore
 
+log = structlog.get_logger()
+
 
 def get_base_url(url: str, include_scheme: bool = True) -> str:
     """Get base URL from an arbitrary URL path (e.g. "https://example.com/some/path" -> "https://example.com").
@@ -64,6 +76,402 @@ class _DESAdapter(HTTPAdapter):  # type: ignore
         return super(_DESAdapter, self).proxy_manager_for(*args, **kwargs)
 
 
+class ChecksumDoesNotMatch(Exception):
+    pass
+
+
+class _CannotResume(Exception):
+    """Server ignored a Range request (or the file changed since the download started)."""
+
+
+# files are split into parallel segments only if every segment would be at least this big
+MIN_SEGMENT_SIZE = 2**25  # 32MB
+
+# maximum number of connections to a single host (and parallel segments of a file)
+DEFAULT_MAX_CONNECTIONS = 8
+
+
+@dataclass
+class _Segment:
+    start: int
+    # exclusive end, None if the size of the file is unknown
+    end: Optional[int]
+    # number of bytes written to the file
+    done: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None and self.start + self.done >= self.end
+
+
+@dataclass
+class _DownloadState:
+    """State of a partial download, saved next to the `.tmp` file to resume the download later."""
+
+    url: str
+    size: Optional[int]
+    # ETag or Last-Modified of the file, sent with If-Range when resuming
+    validator: Optional[str]
+    accept_ranges: bool
+    segments: List[_Segment]
+
+    @property
+    def downloaded(self) -> int:
+        return sum(seg.done for seg in self.segments)
+
+    def contiguous_end(self) -> int:
+        """Return end of the downloaded prefix of the file."""
+        end = 0
+        for seg in self.segments:
+            end = seg.start + seg.done
+            if not seg.complete:
+                break
+        return end
+
+    def save(self, path: str) -> None:
+        with open(path + ".new", "w") as f:
+            json.dump(asdict(self), f)
+        os.replace(path + ".new", path)
+
+    @classmethod
+    def load(cls, path: str, url: str) -> Optional["_DownloadState"]:
+        """Load state of a previous download of the same URL, return None if there is none."""
+        try:
+            with open(path) as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if d.get("url") != url or not d.get("accept_ranges"):
+            return None
+        d["segments"] = [_Segment(**seg) for seg in d["segments"]]
+        return cls(**d)
+
+
+class _StreamingMD5:
+    """MD5 of a file whose segments are written in parallel. Bytes are hashed as they arrive if they
+    continue the hashed prefix, otherwise they're read back from the file once the prefix reaches them."""
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.md5 = hashlib.md5()
+        self.offset = 0
+        self.lock = threading.Lock()
+
+    def feed(self, offset: int, chunk: bytes) -> None:
+        with self.lock:
+            if offset == self.offset:
+                self.md5.update(chunk)
+                self.offset += len(chunk)
+
+    def catch_up(self, end: int) -> None:
+        """Hash bytes of the file up to `end` that weren't hashed yet."""
+        with self.lock:
+            if self.offset >= end:
+                return
+            with open(self.filename, "rb") as f:
+                f.seek(self.offset)
+                while self.offset < end:
+                    chunk = f.read(min(2**20, end - self.offset))
+                    self.md5.update(chunk)
+                    self.offset += len(chunk)
+
+    def hexdigest(self) -> str:
+        return self.md5.hexdigest()
+
+
+class Downloader:
+    """Download files over HTTP(S) through a pool of connections.
+
+    Large files from servers that support Range requests are downloaded in parallel segments.
+    Data is written to `<local_path>.tmp` and the progress is saved next to it, so that an
+    interrupted download is resumed from where it stopped the next time. MD5 of the file is
+    computed as the data arrives.
+
+    Parameters
+    ----------
+    max_connections : int, optional
+        Size of the connection pool per host, which is also the maximum number of parallel
+        segments of a single file.
+    timeout : float, optional
+        Timeout for connecting and for reading from the connection.
+    retries : int, optional
+        Number of times a segment is retried after a connection error before giving up.
+    chunk_size : int, optional
+        Maximum size of the chunks of the response.
+    min_segment_size : int, optional
+        Minimum size of a segment, smaller files are downloaded in a single stream.
+    verify : bool, optional
+        Verify SSL certificate for HTTPS requests.
+    session : requests.Session, optional
+        Session to use for requests (e.g. with custom adapters), a new one is created by default.
+
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = 30,
+        retries: int = 5,
+        chunk_size: int = 2**20,
+        min_segment_size: int = MIN_SEGMENT_SIZE,
+        verify: bool = True,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.chunk_size = chunk_size
+        self.min_segment_size = min_segment_size
+        self.verify = verify
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=max_connections, pool_maxsize=max_connections
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def download(
+        self,
+        url: str,
+        local_path: Union[str, Path],
+        expected_md5: Optional[str] = None,
+        on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    ) -> str:
+        """Download file from a URL into a local file and return its MD5.
+
+        Parameters
+        ----------
+        url : str
+            URL of the file to be downloaded.
+        local_path : str or Path
+            Path to local file that will be created.
+        expected_md5 : str, optional
+            Raise `ChecksumDoesNotMatch` if the downloaded file has a different MD5.
+        on_progress : callable, optional
+            Called with the number of downloaded bytes and the total size (None if unknown)
+            while downloading.
+
+        Returns
+        -------
+        md5 : str
+            MD5 of the downloaded file.
+
+        """
+        local_path = str(local_path)
+        tmp_path = local_path + ".tmp"
+        state_path = tmp_path + ".json"
+
+        try:
+            md5 = self._download(url, tmp_path, state_path, on_progress)
+        except _CannotResume:
+            # start over in a single stream
+            log.info("download.restart", url=url)
+            _remove(tmp_path, state_path)
+            md5 = self._download(
+                url, tmp_path, state_path, on_progress, segmented=False
+            )
+
+        if expected_md5 and md5 != expected_md5:
+            _remove(tmp_path, state_path)
+            raise ChecksumDoesNotMatch(
+                f"for file downloaded from {url}\n\texpected checksum = {expected_md5}\n\t"
+                f"downloaded checksum = {md5}"
+            )
+
+        os.replace(tmp_path, local_path)
+        _remove(state_path)
+
+        return md5
+
+    def _download(
+        self,
+        url: str,
+        tmp_path: str,
+        state_path: str,
+        on_progress: Optional[Callable[[int, Optional[int]], None]],
+        segmented: bool = True,
+    ) -> str:
+        state = (
+            _DownloadState.load(state_path, url) if os.path.exists(tmp_path) else None
+        )
+
+        if state is None:
+            # the first segment reuses response of the first request
+            first_response = self._get(url)
+            state = self._plan(url, first_response, segmented)
+            with open(tmp_path, "wb") as f:
+                if state.size is not None:
+                    f.truncate(state.size)
+        else:
+            log.info("download.resume", url=url, downloaded=state.downloaded)
+            first_response = None
+
+        md5 = _StreamingMD5(tmp_path)
+        stop = threading.Event()
+        segments = [seg for seg in state.segments if not seg.complete]
+
+        with ThreadPoolExecutor(max_workers=max(len(segments), 1)) as executor:
+            futures = [
+                executor.submit(
+                    self._download_segment,
+                    url,
+                    tmp_path,
+                    state,
+                    seg,
+                    md5,
+                    stop,
+                    first_response if seg.start == 0 else None,
+                )
+                for seg in segments
+            ]
+            try:
+                while not all(future.done() for future in futures):
+                    wait(futures, timeout=1, return_when=FIRST_EXCEPTION)
+                    if any(future.done() and future.exception() for future in futures):
+                        break
+                    md5.catch_up(state.contiguous_end())
+                    if state.accept_ranges:
+                        state.save(state_path)
+                    if on_progress:
+                        on_progress(state.downloaded, state.size)
+            finally:
+                stop.set()
+                if state.accept_ranges:
+                    state.save(state_path)
+
+            # raise the first error
+            for future in futures:
+                future.result()
+
+        if on_progress:
+            on_progress(state.downloaded, state.size)
+
+        md5.catch_up(state.contiguous_end())
+        return md5.hexdigest()
+
+    def _plan(
+        self, url: str, response: requests.Response, segmented: bool = True
+    ) -> _DownloadState:
+        """Split the file into segments according to headers of the first response."""
+        headers = response.headers
+        size = int(headers["Content-Length"]) if "Content-Length" in headers else None
+        etag = headers.get("ETag")
+        validator = etag if etag and not etag.startswith("W/") else None
+        validator = validator or headers.get("Last-Modified")
+        # compressed responses have Content-Length of the compressed data
+        accept_ranges = (
+            segmented
+            and headers.get("Accept-Ranges") == "bytes"
+            and size is not None
+            and headers.get("Content-Encoding") in (None, "identity")
+        )
+
+        if not accept_ranges or size is None:
+            segments = [_Segment(0, size)]
+        else:
+            n = max(1, min(self.max_connections, size // self.min_segment_size))
+            bounds = [size * i // n for i in range(n + 1)]
+            segments = [_Segment(start, end) for start, end in zip(bounds, bounds[1:])]
+
+        return _DownloadState(
+            url=url,
+            size=size,
+            validator=validator,
+            accept_ranges=accept_ranges,
+            segments=segments,
+        )
+
+    def _get(self, url: str, headers: Dict[str, str] = {}) -> requests.Response:
+        response = self.session.get(
+            url,
+            headers=headers,
+            stream=True,
+            timeout=self.timeout,
+            verify=self.verify,
+        )
+        response.raise_for_status()
+        return response
+
+    def _download_segment(
+        self,
+        url: str,
+        tmp_path: str,
+        state: _DownloadState,
+        seg: _Segment,
+        md5: _StreamingMD5,
+        stop: threading.Event,
+        response: Optional[requests.Response] = None,
+    ) -> None:
+        attempt = 0
+        while not seg.complete:
+            try:
+                if response is None:
+                    response = self._get_range(url, state, seg)
+
+                with open(tmp_path, "r+b", buffering=0) as f:
+                    f.seek(seg.start + seg.done)
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if stop.is_set():
+                            return
+                        if seg.end is not None:
+                            # the first response of a file split into segments is not ranged
+                            chunk = chunk[: seg.end - seg.start - seg.done]
+                        f.write(chunk)
+                        md5.feed(seg.start + seg.done, chunk)
+                        seg.done += len(chunk)
+                        if seg.complete:
+                            break
+
+                if seg.end is None:
+                    # size is unknown, the end of the response is the end of the file
+                    seg.end = seg.start + seg.done
+                elif not seg.complete:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"Response ended after {seg.done} bytes of segment"
+                    )
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout,
+            ) as e:
+                attempt += 1
+                if attempt > self.retries or not state.accept_ranges or stop.is_set():
+                    raise
+                log.warning("download.retry", url=url, attempt=attempt, error=str(e))
+                time.sleep(min(2**attempt, 30))
+            finally:
+                if response is not None:
+                    response.close()
+                response = None
+
+    def _get_range(
+        self, url: str, state: _DownloadState, seg: _Segment
+    ) -> requests.Response:
+        start = seg.start + seg.done
+        if start == 0 and seg.end == state.size:
+            return self._get(url)
+
+        end = "" if seg.end is None else str(seg.end - 1)
+        headers = {"Range": f"bytes={start}-{end}"}
+        if state.validator:
+            headers["If-Range"] = state.validator
+
+        response = self._get(url, headers=headers)
+        if response.status_code != 206:
+            response.close()
+            raise _CannotResume(url)
+        return response
+
+
+def _remove(*paths: str) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
 def download_file_from_url(
     url: str,
     local_path: str,
@@ -90,17 +498,11 @@ def download_file_from_url(
         Use less restrictive encryption for request (required by certain old web sites).
 
     """
-    # Create a persistent request session.
     with requests.Session() as session:
         if ciphers_low:
             # Special type of request.
             session.mount(get_base_url(url), _DESAdapter())
-            response = session.get(url, timeout=timeout)
-        else:
-            # Send a standard GET request.
-            response = session.get(url, stream=True, timeout=timeout, verify=verify)
-
-    # Save the requested data into a local file.
-    with open(local_path, "wb") as output_file:
-        for chunk in response.iter_content(chunk_size=chunk_size):  # type: ignore
-            output_file.write(chunk)
+        downloader = Downloader(
+            timeout=timeout, chunk_size=int(chunk_size), verify=verify, session=session
+        )
+        downloader.download(url, local_path)
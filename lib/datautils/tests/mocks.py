@@ -1,11 +1,21 @@
 import json
-from typing import Any, List
+from typing import Any, Dict, List
+
+import requests
 
 
 class MockResponse:
     def __init__(self, json_data: Any, status_code: int):
         self.json_data = json_data
         self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+    def close(self) -> None:
+        pass
 
     def iter_content(self, chunk_size: int) -> List[bytes]:
         _ = chunk_size
@@ -2,13 +2,23 @@
 
 """
 
-
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import mock
 
+import pytest
+import requests
 from pytest import warns
 
 from owid.datautils.io.json import load_json
-from owid.datautils.web import download_file_from_url, get_base_url
+from owid.datautils.web import (
+    ChecksumDoesNotMatch,
+    Downloader,
+    download_file_from_url,
+    get_base_url,
+)
 
 from .mocks import MockResponse
 
@@ -116,3 +126,118 @@ class TestDownloadFileFromUrl:
 
     # def test_download_file_from_url_with_invalid_url(self, mock_get, tmp_path):
     #     # TODO: I couldn't manage to catch the exception that download_file_from_url raises when the url is wrong.
+
+
+DATA = bytes(range(256)) * 4096  # 1MB
+DATA_MD5 = hashlib.md5(DATA).hexdigest()
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serve `DATA` with support for Range requests, optionally dropping the connection of the
+    first `server.drop_after` responses after some bytes."""
+
+    def do_GET(self):
+        self.server.requests.append(self.headers.get("Range"))
+        start, end = 0, len(DATA)
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and (if_range is None or if_range == self.server.etag):
+            start_s, end_s = range_header[len("bytes=") :].split("-")
+            start, end = int(start_s), int(end_s) + 1 if end_s else len(DATA)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(DATA)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self.server.etag)
+        self.end_headers()
+
+        body = DATA[start:end]
+        if self.server.drop_after:
+            self.server.drop_after -= 1
+            body = body[: len(body) // 8]
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    server.requests = []
+    server.etag = '"v1"'
+    server.drop_after = 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/data.bin"
+
+
+class TestDownloader:
+    def test_download_in_segments(self, server, tmp_path):
+        path = tmp_path / "data.bin"
+        md5 = Downloader(max_connections=4, min_segment_size=2**18).download(
+            _url(server), path, expected_md5=DATA_MD5
+        )
+        assert md5 == DATA_MD5
+        assert path.read_bytes() == DATA
+        # the first request is reused for the first segment
+        assert server.requests[0] is None
+        assert sorted(server.requests[1:]) == [
+            "bytes=262144-524287",
+            "bytes=524288-786431",
+            "bytes=786432-1048575",
+        ]
+        assert not (tmp_path / "data.bin.tmp").exists()
+        assert not (tmp_path / "data.bin.tmp.json").exists()
+
+    def test_download_retries_dropped_connections(self, server, tmp_path, monkeypatch):
+        monkeypatch.setattr(time, "sleep", lambda _: None)
+        server.drop_after = 2
+        path = tmp_path / "data.bin"
+        md5 = Downloader(max_connections=2, min_segment_size=2**18).download(
+            _url(server), path
+        )
+        assert md5 == DATA_MD5
+        assert path.read_bytes() == DATA
+
+    def test_resume_download(self, server, tmp_path):
+        path = tmp_path / "data.bin"
+        # interrupted download, that did not retry
+        server.drop_after = 1
+        with pytest.raises(requests.exceptions.RequestException):
+            Downloader(retries=0, min_segment_size=2**18).download(_url(server), path)
+        assert not path.exists()
+        assert (tmp_path / "data.bin.tmp.json").exists()
+
+        server.requests.clear()
+        md5 = Downloader(min_segment_size=2**18).download(_url(server), path)
+        assert md5 == DATA_MD5
+        assert path.read_bytes() == DATA
+        # only the missing part was downloaded
+        assert server.requests and all(r is not None for r in server.requests)
+
+    def test_resume_changed_file_starts_over(self, server, tmp_path):
+        path = tmp_path / "data.bin"
+        server.drop_after = 1
+        with pytest.raises(requests.exceptions.RequestException):
+            Downloader(retries=0, min_segment_size=2**18).download(_url(server), path)
+
+        server.etag = '"v2"'
+        md5 = Downloader(min_segment_size=2**18).download(_url(server), path)
+        assert md5 == DATA_MD5
+        assert path.read_bytes() == DATA
+
+    def test_checksum_does_not_match(self, server, tmp_path):
+        path = tmp_path / "data.bin"
+        with pytest.raises(ChecksumDoesNotMatch):
+            Downloader().download(_url(server), path, expected_md5="wrong")
+        assert not path.exists()
+        assert not (tmp_path / "data.bin.tmp").exists()
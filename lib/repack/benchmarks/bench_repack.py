@@ -0,0 +1,106 @@
+"""
+Benchmark `repack_frame` against the previous implementation, which tried
+`to_int` -> `to_float` -> `to_category` on every column and used exceptions
+for control flow.
+
+Usage:
+
+    python benchmarks/bench_repack.py
+    python benchmarks/bench_repack.py --rows 20000 --columns 1000
+    python benchmarks/bench_repack.py --feather path/to/table.feather
+"""
+import argparse
+import time
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+from owid import repack
+
+
+def legacy_repack_series(s: pd.Series) -> pd.Series:
+    """Previous implementation of `repack_series`."""
+    if s.dtype.name in ("Int64", "int64", "UInt64", "uint64"):
+        return repack.shrink_integer(s)
+
+    if s.dtype.name in ("object", "float64", "Float64"):
+        for strategy in [repack.to_int, repack.to_float, repack.to_category]:
+            try:
+                return strategy(s)
+            except (ValueError, TypeError):
+                continue
+
+    return s
+
+
+def legacy_repack_frame(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.concat([legacy_repack_series(df[col]) for col in df.columns], axis=1)
+
+
+def wide_table(rows: int, columns: int, seed: int = 0) -> pd.DataFrame:
+    """Wide table similar to backported datasets with entity and year columns
+    and a mix of integer-like, float and string columns with missing values."""
+    rng = np.random.default_rng(seed)
+    data = {
+        "entity_id": rng.integers(0, 300, rows),
+        "year": rng.integers(1800, 2023, rows),
+    }
+    for i in range(columns):
+        kind = i % 4
+        if kind == 0:
+            values = rng.integers(0, 10**6, rows).astype(float)
+        elif kind == 1:
+            values = rng.normal(size=rows) * 1000
+        elif kind == 2:
+            values = rng.integers(-100, 100, rows).astype(float)
+        else:
+            values = rng.choice(["low", "medium", "high"], rows).astype(object)
+        values[rng.random(rows) < 0.7] = np.nan
+        data[f"variable_{i}"] = values
+    return pd.DataFrame(data)
+
+
+def timeit(f: Callable[[], pd.DataFrame], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+def main(rows: int, columns: int, repeat: int, feather: Optional[str]) -> None:
+    if feather:
+        df = pd.read_feather(feather)
+    else:
+        df = wide_table(rows, columns)
+
+    # repacking feather files is a no-op, start from plain types
+    df = df.astype({c: "float64" for c in df.columns if df[c].dtype.kind in "iuf"})
+    df = df.astype({c: "object" for c in df.columns if df[c].dtype.name == "category"})
+    print(f"Table with {len(df)} rows and {len(df.columns)} columns")
+
+    new = repack.repack_frame(df.copy())
+    old = legacy_repack_frame(df.copy())
+    same = (new.dtypes == old.dtypes).sum()
+    print(f"Same dtypes for {same}/{len(df.columns)} columns")
+
+    t_old = timeit(lambda: legacy_repack_frame(df.copy()), repeat)
+    t_new = timeit(lambda: repack.repack_frame(df.copy(), workers=1), repeat)
+    t_par = timeit(lambda: repack.repack_frame(df.copy()), repeat)
+
+    print(f"legacy:            {t_old:.3f}s")
+    print(f"single pass:       {t_new:.3f}s ({t_old / t_new:.1f}x)")
+    print(f"single pass + threads: {t_par:.3f}s ({t_old / t_par:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--columns", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--feather", type=str, help="Benchmark on a real table instead")
+    args = parser.parse_args()
+    main(args.rows, args.columns, args.repeat, args.feather)
@@ -1,13 +1,37 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional, cast
 
 import numpy as np
 import pandas as pd
 
+INTEGER_DTYPES = ("Int64", "int64", "UInt64", "uint64")
+
+# candidate integer types from the smallest one, we don't bother using 64-bit types
+SIGNED_DTYPES = ("int8", "int16", "int32")
+UNSIGNED_DTYPES = ("uint8", "uint16", "uint32")
+NULLABLE_DTYPES = {
+    "int8": "Int8",
+    "int16": "Int16",
+    "int32": "Int32",
+    "uint8": "UInt8",
+    "uint16": "UInt16",
+    "uint32": "UInt32",
+}
+
+# floats are stored as float32 if they are equal to float64 within these tolerances
+FLOAT32_RTOL = 1e-5
+FLOAT32_ATOL = 1e-8
+
+# repack columns in parallel threads only for frames with at least this many cells
+PARALLEL_MIN_CELLS = 1_000_000
+
 
 def repack_frame(
     df: pd.DataFrame,
     remap: Optional[Dict[str, str]] = None,
     dtypes: Optional[Dict[str, Any]] = {},
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """
     Convert the DataFrame's columns to the most compact types possible.
@@ -16,6 +40,8 @@ def repack_frame(
 
     :param remap: remap column names
     :param dtypes: dictionary of fixed dtypes to use
+    :param workers: number of threads used to repack columns of large frames,
+        defaults to the number of CPUs (capped at 8)
     """
     if df.index.names != [None]:
         raise ValueError("repacking is lost for index columns")
@@ -31,13 +57,18 @@ def repack_frame(
         df.reset_index(inplace=True)
 
     # repack each column into the best dtype we can give it
-    df = pd.concat(
-        [
-            repack_series(df[col]) if col not in dtypes else df[col]
-            for col in df.columns
-        ],
-        axis=1,
-    )
+    def _repack(col: Any) -> pd.Series:
+        return repack_series(df[col]) if col not in dtypes else df[col]
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    if workers > 1 and df.size >= PARALLEL_MIN_CELLS:
+        # columns are independent, NumPy releases the GIL for most of the work
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            columns = list(executor.map(_repack, df.columns))
+    else:
+        columns = [_repack(col) for col in df.columns]
+
+    df = pd.concat(columns, axis=1)
 
     # use given dtypes
     if dtypes:
@@ -61,19 +92,108 @@ def repack_frame(
 
 
 def repack_series(s: pd.Series) -> pd.Series:
-    if s.dtype.name in ("Int64", "int64", "UInt64", "uint64"):
-        return shrink_integer(s)
+    """
+    Convert the series to the most compact type possible. Statistics of the values (nulls,
+    min and max, integrality and float32 precision) are computed with NumPy and the
+    narrowest type is picked directly, without trying casts one by one.
+    """
+    if s.dtype.name in INTEGER_DTYPES:
+        return _repack_integer(s)
 
     if s.dtype.name in ("object", "float64", "Float64"):
-        for strategy in [to_int, to_float, to_category]:
-            try:
-                return strategy(s)
-            except (ValueError, TypeError):
-                continue
+        values = _float_values(s)
+        if values is not None:
+            return _repack_float(s, values)
+
+        if _is_string(s):
+            return s.astype("category")
 
     return s
 
 
+def _repack_integer(s: pd.Series) -> pd.Series:
+    isnull = s.isnull().to_numpy()
+    if isnull.all():
+        # shrink all NaNs to Int8
+        return s.astype("Int8")
+
+    has_null = bool(isnull.any())
+    values = s.to_numpy(dtype=s.dtype.name.lower(), na_value=0)
+    if has_null:
+        values = values[~isnull]
+
+    dtype = _narrowest_integer(int(values.min()), int(values.max()), has_null)
+    return s.astype(dtype) if dtype else s
+
+
+def _float_values(s: pd.Series) -> Optional[np.ndarray]:
+    """Return values of the series as float64 array or None if they are not numbers."""
+    if s.dtype.name == "float64":
+        return s.to_numpy()
+
+    try:
+        values = s.astype("float64").to_numpy()
+    except (ValueError, TypeError):
+        return None
+
+    # strings like "nan" would become nulls, treat them as strings
+    if s.dtype.name == "object" and not np.array_equal(
+        np.isnan(values), s.isnull().to_numpy()
+    ):
+        return None
+
+    return values
+
+
+def _repack_float(s: pd.Series, values: np.ndarray) -> pd.Series:
+    isnan = np.isnan(values)
+    if isnan.all():
+        # shrink all NaNs to Int8
+        return pd.Series(values, index=s.index, name=s.name).astype("Int8")
+
+    has_null = bool(isnan.any())
+    notnull = values[~isnan] if has_null else values
+
+    vmin, vmax = notnull.min(), notnull.max()
+    if _is_integral(notnull, vmin, vmax):
+        dtype = _narrowest_integer(int(vmin), int(vmax), has_null) or "Int64"
+        return pd.Series(values, index=s.index, name=s.name).astype(dtype)
+
+    with np.errstate(over="ignore"):
+        values32 = values.astype("float32")
+
+    if np.allclose(
+        values32, values, rtol=FLOAT32_RTOL, atol=FLOAT32_ATOL, equal_nan=True
+    ):
+        return pd.Series(values32, index=s.index, name=s.name)
+    else:
+        return pd.Series(values, index=s.index, name=s.name)
+
+
+def _is_integral(values: np.ndarray, vmin: float, vmax: float) -> bool:
+    # NOTE: infinite values would be in min or max
+    return bool(
+        -(2**63) <= vmin
+        and vmax < 2**63
+        and np.array_equal(values, np.trunc(values))
+    )
+
+
+def _narrowest_integer(vmin: int, vmax: int, nullable: bool) -> Optional[str]:
+    """Return the smallest integer type that fits values in given range or None if
+    none of the candidate types fits."""
+    for dtype in SIGNED_DTYPES if vmin < 0 else UNSIGNED_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= vmin and vmax <= info.max:
+            return NULLABLE_DTYPES[dtype] if nullable else dtype
+
+    return None
+
+
+def _is_string(s: pd.Series) -> bool:
+    return pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty")
+
+
 def to_int(s: pd.Series) -> pd.Series:
     # values could be integers or strings
     v = s.astype("float64").astype("Int64")
@@ -217,3 +217,32 @@ def test_repack_float64_all_nans():
     s = pd.Series([np.nan, np.nan, np.nan], dtype="float64")
     v = repack.repack_series(s)
     assert v.dtype.name == "Int8"
+
+
+def test_repack_float_out_of_float32_range():
+    s = pd.Series([1.5, 1e300])
+    v = repack.repack_series(s)
+    assert v.dtype.name == "float64"
+    assert v.tolist() == [1.5, 1e300]
+
+
+def test_repack_nan_strings_to_category():
+    s = pd.Series(["nan", "1"], dtype="object")
+    v = repack.repack_series(s)
+    assert v.dtype.name == "category"
+
+
+def test_repack_frame_in_parallel(monkeypatch):
+    monkeypatch.setattr(repack, "PARALLEL_MIN_CELLS", 0)
+    df = pd.DataFrame(
+        {
+            "myint": [1, 2, None, 3],
+            "myfloat": [1.2, 2.0, 3.0, None],
+            "mycat": ["a", None, "b", "c"],
+        },
+        dtype="object",
+    )
+
+    df_repack = repack.repack_frame(df.copy(), workers=4)
+    assert list(df_repack.columns) == ["myint", "myfloat", "mycat"]
+    assert df_repack.dtypes.astype(str).tolist() == ["UInt8", "float32", "category"]
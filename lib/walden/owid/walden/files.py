@@ -7,11 +7,10 @@
 import hashlib
 import json
 import os
-import shutil
 from os import path, walk
-from typing import IO, Iterator, Optional, Tuple
+from typing import Iterator, Optional, Tuple
 
-import requests
+from owid.datautils.web import Downloader
 from rich.progress import (
     BarColumn,
     DownloadColumn,
@@ -22,6 +21,9 @@ from rich.progress import (
 
 from .ui import log
 
+# minimum number of bytes to display a progress bar for
+PROGRESS_BAR_MIN_BYTES = 2**25  # 32MB
+
 
 def _create_progress_bar() -> Progress:
     """Create a fancy progress bar to use for display of download progress.
@@ -39,59 +41,37 @@ def _create_progress_bar() -> Progress:
     )
 
 
-def _stream_to_file(
-    r: requests.Response,
-    file: IO[bytes],
-    chunk_size: int = 2**14,
-    progress_bar_min_bytes: int = 2**25,
-) -> str:
-    """Stream the response to the file, returning the checksum.
-    :param progress_bar_min_bytes: Minimum number of bytes to display a progress bar for. Default is 32MB
-    """
-    # check header to get content length, in bytes
-    total_length = int(r.headers.get("content-length", 0))
-
-    md5 = hashlib.md5()
-
-    streamer = r.iter_content(chunk_size=chunk_size)
-    display_progress = total_length > progress_bar_min_bytes
-    if display_progress:
-        progress = _create_progress_bar()
-        progress.start()
-        task_id = progress.add_task("Downloading", total=total_length)
-
-    for chunk in streamer:  # 16k
-        file.write(chunk)
-        md5.update(chunk)
-        if display_progress:
-            progress.update(task_id, advance=len(chunk))  # type: ignore
-
-    if display_progress:
-        progress.stop()  # type: ignore
-
-    return md5.hexdigest()
-
-
 def download(url: str, filename: str, expected_md5: Optional[str] = None, quiet: bool = False) -> None:
-    "Download the file at the URL to the given local filename."
-    # NOTE: we are not streaming to a NamedTemporaryFile because it was causing weird
-    # issues one some systems, it's safer to stream directly to the file and remove it
-    # if md5 don't match
-    tmp_filename = filename + ".tmp"
-    with open(tmp_filename, "wb") as f, requests.get(url, stream=True) as r:
-        r.raise_for_status()
-
-        md5 = _stream_to_file(r, f)
-
-        if expected_md5 and md5 != expected_md5:
-            if os.path.exists(filename):
-                os.remove(filename)
-            raise ChecksumDoesNotMatch(
-                f"for file downloaded from {url}. Is your walden repository up to date?\n\twalden index checksum = {expected_md5}\n\tdownloaded checksum = {md5}"
-                ""
-            )
-
-    shutil.move(tmp_filename, filename)
+    """Download the file at the URL to the given local filename.
+
+    Large files are downloaded in parallel segments and an interrupted download is resumed
+    from the `.tmp` file left next to the filename.
+    """
+    progress: Optional[Progress] = None
+    task_id = None
+
+    def on_progress(downloaded: int, total: Optional[int]) -> None:
+        nonlocal progress, task_id
+        if quiet or not total or total <= PROGRESS_BAR_MIN_BYTES:
+            return
+        if progress is None:
+            progress = _create_progress_bar()
+            progress.start()
+            task_id = progress.add_task("Downloading", total=total)
+        progress.update(task_id, completed=downloaded)  # type: ignore
+
+    try:
+        md5 = Downloader().download(url, filename, on_progress=on_progress)
+    finally:
+        if progress is not None:
+            progress.stop()
+
+    if expected_md5 and md5 != expected_md5:
+        os.remove(filename)
+        raise ChecksumDoesNotMatch(
+            f"for file downloaded from {url}. Is your walden repository up to date?\n\twalden index checksum = {expected_md5}\n\tdownloaded checksum = {md5}"
+            ""
+        )
 
     if not quiet:
         log("DOWNLOADED", f"{url} -> {filename}")
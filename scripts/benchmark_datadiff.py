@@ -0,0 +1,85 @@
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+import structlog
+from owid.catalog import Dataset, DatasetMeta, Table
+
+from etl.datadiff import DatasetDiff
+
+log = structlog.get_logger()
+
+
+@click.command()
+@click.option("--rows", type=int, default=5_000_000, help="Number of rows of the compared table")
+@click.option("--changed", type=float, default=0.001, help="Share of rows with changed values")
+@click.option("--verbose", is_flag=True, help="Print detailed differences (materializes changed rows)")
+def benchmark_datadiff_cli(rows: int, changed: float, verbose: bool) -> None:
+    """Benchmark comparing two versions of a large table with a categorical multi-index (similar to
+    GHE or UN WPP tables), where some rows are removed, some added and some values changed. Run it with
+
+        python scripts/benchmark_datadiff.py --rows 5000000
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        ds_a = _create_dataset(Path(tmp) / "a", _table(rows, changed=0, seed=0))
+        ds_b = _create_dataset(Path(tmp) / "b", _table(rows, changed=changed, seed=1))
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t = time.time()
+        out = []
+        DatasetDiff(ds_a, ds_b, verbose=verbose, print=out.append).summary()
+        log.info(
+            "datadiff",
+            rows=rows,
+            time=f"{time.time() - t:.2f}s",
+            max_rss_increase=f"{(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 2**10:.0f}MB",
+        )
+        for line in out:
+            print(line)
+
+
+def _table(rows: int, changed: float, seed: int) -> Table:
+    rng = np.random.default_rng(seed)
+    n_countries = 200
+    n_years = 20
+    n_causes = rows // (n_countries * n_years)
+
+    df = pd.DataFrame(
+        {
+            "country": pd.Categorical.from_codes(np.arange(rows) % n_countries, [f"c{i}" for i in range(n_countries)]),
+            "year": 2000 + (np.arange(rows) // n_countries) % n_years,
+            "cause": pd.Categorical.from_codes(
+                np.minimum(np.arange(rows) // (n_countries * n_years), n_causes - 1),
+                [f"cause {i}" for i in range(n_causes)],
+            ),
+            "sex": pd.Categorical.from_codes(np.arange(rows) % 2, ["female", "male"]),
+            "value": np.arange(rows, dtype=float),
+        }
+    )
+    # make rows unique, `sex` only splits them further
+    df["year"] += 100 * (np.arange(rows) % 2)
+
+    if changed:
+        # remove some rows, add new ones and change values of others
+        n = int(rows * changed)
+        df = df.iloc[n:]
+        df = pd.concat([df, df.iloc[:n].assign(year=df.year.iloc[:n] + 1000)], ignore_index=True)
+        ix = rng.choice(len(df), n, replace=False)
+        df.loc[ix, "value"] += 1
+
+    return Table(df.set_index(["country", "year", "cause", "sex"]), short_name="large")
+
+
+def _create_dataset(path: Path, table: Table) -> Dataset:
+    ds = Dataset.create_empty(path, DatasetMeta(namespace="benchmark", version="latest", short_name="large"))
+    ds.metadata.channel = "garden"  # type: ignore
+    ds.add(table, repack=False)
+    return ds
+
+
+if __name__ == "__main__":
+    benchmark_datadiff_cli()
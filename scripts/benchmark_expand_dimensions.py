@@ -0,0 +1,79 @@
+import time
+import tracemalloc
+
+import click
+import numpy as np
+import pandas as pd
+import structlog
+from owid import catalog
+
+from etl import grapher_helpers as gh
+
+log = structlog.get_logger()
+
+
+@click.command()
+@click.option("--countries", type=int, default=100, help="Number of countries")
+@click.option("--years", type=int, default=30, help="Number of years")
+@click.option("--dimension-values", type=int, default=6, help="Number of values of each of the three dimensions")
+@click.option("--variables", type=int, default=4, help="Number of variables")
+@click.option("--density", type=float, default=0.2, help="Share of rows with data")
+def benchmark_expand_dimensions_cli(
+    countries: int, years: int, dimension_values: int, variables: int, density: float
+) -> None:
+    """Benchmark peak memory of `expand_dimensions` on a table with three dimensions.
+
+    Compares building the whole expanded table (as `expand_dimensions` did before) with iterating over
+    the expanded table by dimension combinations. Run it with
+
+        python scripts/benchmark_expand_dimensions.py --countries 100 --dimension-values 6 --density 0.2
+    """
+    tb = _synthetic_table(countries, years, dimension_values, variables, density)
+    log.info("benchmark.data", rows=len(tb), memory=f"{tb.memory_usage(deep=True).sum() / 2**20:.0f}MB")
+
+    tracemalloc.start()
+    t = time.time()
+    expanded_tb = gh.expand_dimensions(tb).to_table()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    log.info(
+        "expand_dimensions.to_table",
+        time=f"{time.time() - t:.2f}s",
+        peak=f"{peak / 2**20:.0f}MB",
+        columns=len(expanded_tb.columns),
+    )
+    del expanded_tb
+
+    tracemalloc.start()
+    t = time.time()
+    n_columns = sum(len(t.columns) for t in gh.expand_dimensions(tb))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    log.info("expand_dimensions.iter", time=f"{time.time() - t:.2f}s", peak=f"{peak / 2**20:.0f}MB", columns=n_columns)
+
+
+def _synthetic_table(
+    countries: int, years: int, dimension_values: int, variables: int, density: float
+) -> catalog.Table:
+    """Table with country, year, age, sex and cause dimensions where only `density` of rows have data."""
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product(
+        [
+            [f"Country {i}" for i in range(countries)],
+            range(2000, 2000 + years),
+            *[[f"{dim} {i}" for i in range(dimension_values)] for dim in ("age", "sex", "cause")],
+        ],
+        names=["country", "year", "age", "sex", "cause"],
+    )
+    index = index[rng.random(len(index)) < density]
+    tb = catalog.Table(
+        rng.random((len(index), variables)), index=index, columns=[f"variable_{i}" for i in range(variables)]
+    )
+    for col in tb.columns:
+        tb[col].metadata.unit = "deaths"
+        tb[col].metadata.title = col
+    return tb
+
+
+if __name__ == "__main__":
+    benchmark_expand_dimensions_cli()
@@ -0,0 +1,94 @@
+import time
+from typing import Any, Dict, List
+
+import click
+import numpy as np
+import pandas as pd
+import structlog
+from owid.datautils.dataframes import groupby_agg
+
+from etl.data_helpers import geo
+
+log = structlog.get_logger()
+
+
+@click.command()
+@click.option("--countries", type=int, default=200, help="Number of countries")
+@click.option("--years", type=int, default=100, help="Number of years")
+@click.option("--variables", type=int, default=100, help="Number of variables")
+@click.option("--regions", type=int, default=10, help="Number of regions")
+def benchmark_region_aggregates_cli(countries: int, years: int, variables: int, regions: int) -> None:
+    """Benchmark adding region aggregates to a synthetic dataset.
+
+    Compares the previous implementation (one groupby per variable and region) with `add_region_aggregates`
+    called for every region and with `add_regions_aggregates` for all regions at once. Run it with
+
+        python scripts/benchmark_region_aggregates.py --regions 10 --variables 100
+    """
+    df, members, must_have_data = _synthetic_data(countries, years, variables, regions)
+    log.info("benchmark.data", rows=len(df), variables=variables, regions=regions)
+
+    t = time.time()
+    df_legacy = df
+    for region in members:
+        df_legacy = _legacy_add_region_aggregates(df_legacy, region, members[region], must_have_data[region])
+    log.info("add_region_aggregates.legacy", time=f"{time.time() - t:.2f}s")
+
+    t = time.time()
+    df_new = df
+    for region in members:
+        df_new = geo.add_region_aggregates(
+            df_new, region, countries_in_region=members[region], countries_that_must_have_data=must_have_data[region]
+        )
+    log.info("add_region_aggregates", time=f"{time.time() - t:.2f}s")
+    pd.testing.assert_frame_equal(df_legacy, df_new)
+
+    t = time.time()
+    df_all = geo.add_regions_aggregates(df, members, countries_that_must_have_data=must_have_data)
+    log.info("add_regions_aggregates", time=f"{time.time() - t:.2f}s")
+    pd.testing.assert_frame_equal(df_legacy, df_all)
+
+
+def _synthetic_data(countries: int, years: int, variables: int, regions: int):
+    rng = np.random.default_rng(0)
+    country_names = [f"Country {i}" for i in range(countries)]
+    df = pd.MultiIndex.from_product([country_names, range(2000 - years, 2000)], names=["country", "year"]).to_frame(
+        index=False
+    )
+    values = rng.random((len(df), variables))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    df = pd.concat([df, pd.DataFrame(values, columns=[f"variable_{i}" for i in range(variables)])], axis=1)
+
+    members = {f"Region {i}": list(rng.choice(country_names, countries // 5, replace=False)) for i in range(regions)}
+    must_have_data = {region: region_members[:3] for region, region_members in members.items()}
+    return df, members, must_have_data
+
+
+def _legacy_add_region_aggregates(
+    df: pd.DataFrame, region: str, countries_in_region: List[str], countries_that_must_have_data: List[str]
+) -> pd.DataFrame:
+    """Previous implementation of add_region_aggregates (with default arguments)."""
+    aggregations: Dict[str, Any] = {variable: "sum" for variable in df.columns if variable not in ["country", "year"]}
+    df_region = pd.DataFrame({"country": [], "year": []}).astype(dtype={"country": "object", "year": "int"})
+    df_countries = df[df["country"].isin(countries_in_region)]
+    for variable in aggregations:
+        df_added = groupby_agg(
+            df=df_countries,
+            groupby_columns="year",
+            aggregations={
+                "country": lambda x: set(countries_that_must_have_data).issubset(set(list(x))),
+                variable: aggregations[variable],
+            },
+            num_allowed_nans=geo.NUM_ALLOWED_NANS_PER_YEAR,
+            frac_allowed_nans=geo.FRAC_ALLOWED_NANS_PER_YEAR,
+        ).reset_index()
+        df_added.loc[~df_added["country"], variable] = np.nan
+        df_added["country"] = region
+        df_region = pd.merge(df_region, df_added, on=["country", "year"], how="outer")
+
+    df_updated = pd.concat([df[~(df["country"] == region)], df_region], ignore_index=True)
+    return df_updated.sort_values(["country", "year"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    benchmark_region_aggregates_cli()
@@ -0,0 +1,150 @@
+import copy
+import time
+from typing import Dict, Iterable, List, Literal, Optional
+
+import click
+import numpy as np
+import pandas as pd
+import structlog
+from owid import catalog
+
+from etl import grapher_helpers as gh
+
+log = structlog.get_logger()
+
+
+@click.command()
+@click.option("--countries", type=int, default=50, help="Number of countries")
+@click.option("--years", type=int, default=30, help="Number of years")
+@click.option("--ages", type=int, default=20, help="Number of values of the first dimension")
+@click.option("--causes", type=int, default=20, help="Number of values of the second dimension")
+@click.option("--variables", type=int, default=4, help="Number of variables")
+def benchmark_yield_wide_table_cli(countries: int, years: int, ages: int, causes: int, variables: int) -> None:
+    """Benchmark splitting a dimensional table into grapher variables with `_yield_wide_table`.
+
+    Compares the previous implementation (groupby and a table copy for every variable) with the current one
+    and checks that they yield identical tables. Run it with
+
+        python scripts/benchmark_yield_wide_table.py --ages 20 --causes 20 --variables 4
+    """
+    table = _synthetic_table(countries, years, ages, causes, variables)
+    log.info("benchmark.data", rows=len(table), variables=variables * ages * causes * 2)
+
+    t = time.time()
+    tables_legacy = list(_legacy_yield_wide_table(table, na_action="drop", warn_null_variables=False))
+    log.info("yield_wide_table.legacy", time=f"{time.time() - t:.2f}s")
+
+    t = time.time()
+    tables_new = list(gh._yield_wide_table(table, na_action="drop", warn_null_variables=False))
+    log.info("yield_wide_table", time=f"{time.time() - t:.2f}s")
+
+    assert len(tables_legacy) == len(tables_new)
+    for t_legacy, t_new in zip(tables_legacy, tables_new):
+        pd.testing.assert_frame_equal(t_legacy, t_new)
+        assert t_legacy.metadata.to_dict() == t_new.metadata.to_dict()
+        assert t_legacy.iloc[:, 0].metadata.to_dict() == t_new.iloc[:, 0].metadata.to_dict()
+
+
+def _synthetic_table(countries: int, years: int, ages: int, causes: int, variables: int) -> catalog.Table:
+    """Table with entity_id, year, age, sex and cause dimensions like IHME GBD datasets."""
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product(
+        [
+            range(countries),
+            range(2000, 2000 + years),
+            [f"{5 * i}-{5 * i + 4}" for i in range(ages)],
+            ["female", "male"],
+            [f"Cause {i}" for i in range(causes)],
+        ],
+        names=["entity_id", "year", "age", "sex", "cause"],
+    )
+    values = rng.random((len(index), variables))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    # shuffle rows to make sure they are not already sorted by dimensions
+    order = rng.permutation(len(index))
+    table = catalog.Table(
+        values[order], index=index[order], columns=[f"variable_{i}" for i in range(variables)], short_name="benchmark"
+    )
+    table.metadata.dataset = catalog.DatasetMeta(short_name="benchmark", sources=[catalog.Source(name="Source")])
+    for i, col in enumerate(table.columns):
+        table[col].metadata.unit = "deaths"
+        if i % 2:
+            table[col].metadata.title = f"Deaths from << cause >> in << sex >> aged << age >> ({i})"
+        else:
+            table[col].metadata.title = f"Deaths ({i})"
+        table[col].metadata.description = "Deaths <% if sex == 'male' %>of men<% else %>of women<% endif %>."
+    return table
+
+
+def _legacy_yield_wide_table(
+    table: catalog.Table,
+    na_action: Literal["drop", "raise"] = "raise",
+    dim_titles: Optional[List[str]] = None,
+    warn_null_variables: bool = True,
+) -> Iterable[catalog.Table]:
+    """Previous implementation of `_yield_wide_table`."""
+    table = copy.deepcopy(table)
+    table.metadata = copy.deepcopy(table.metadata)
+
+    dim_names = [k for k in table.primary_key if k not in ("year", "entity_id")]
+    dim_titles = dim_titles or dim_names
+
+    if dim_names:
+        grouped = table.groupby(dim_names if len(dim_names) > 1 else dim_names[0], as_index=False, observed=True)
+    else:
+        grouped = [([], table)]
+
+    for dim_values, table_to_yield in grouped:
+        dim_values = [dim_values] if isinstance(dim_values, str) else dim_values
+
+        for column in table_to_yield.columns:
+            if table_to_yield[column].isnull().all():
+                continue
+
+            tab = table_to_yield[[column]].copy()
+            tab = tab.dropna() if na_action == "drop" else tab
+
+            short_name = gh._underscore_column_and_dimensions(column, dim_values, dim_names)
+
+            tab.metadata.short_name = short_name
+            tab = tab.rename(columns={column: short_name})
+
+            if dim_values:
+                tab[short_name].metadata.additional_info = {
+                    "dimensions": {
+                        "originalShortName": column,
+                        "originalName": tab[short_name].metadata.title,
+                        "filters": [
+                            {"name": dim_name, "value": dim_value} for dim_name, dim_value in zip(dim_names, dim_values)
+                        ],
+                    }
+                }
+
+            dim_dict = dict(zip(dim_names, dim_values))
+
+            if tab[short_name].metadata.title:
+                if gh._uses_jinja(tab[short_name].metadata.title):
+                    title_with_dims = _legacy_expand_jinja_template(tab[short_name].metadata.title, dim_dict)
+                else:
+                    title_with_dims = gh._title_column_and_dimensions(
+                        tab[short_name].metadata.title, dim_values, dim_titles
+                    )
+
+                tab[short_name].metadata.title = title_with_dims
+
+            tab[short_name].metadata.description = _legacy_expand_jinja_template(
+                tab[short_name].metadata.description, dim_dict
+            )
+
+            yield tab.reset_index().set_index(["entity_id", "year"])[[short_name]]
+
+
+def _legacy_expand_jinja_template(text: str, dim_dict: Dict[str, str]) -> str:
+    """Previous implementation of `_expand_jinja_template`, which compiled the template on every call."""
+    if not gh._uses_jinja(text) or not dim_dict:
+        return text
+    return gh.jinja_env.from_string(text).render(dim_dict)
+
+
+if __name__ == "__main__":
+    benchmark_yield_wide_table_cli()
@@ -0,0 +1,15 @@
+import pytest
+from owid.catalog import checksums
+
+from etl import files
+
+
+@pytest.fixture(autouse=True)
+def checksum_cache(tmp_path_factory, monkeypatch):
+    """Use an empty persistent checksum cache for every test instead of the one in DATA_DIR."""
+    path = tmp_path_factory.mktemp("checksum_cache") / "checksums.sqlite"
+    monkeypatch.setattr(checksums, "_CACHE", checksums.ChecksumCache(path))
+    monkeypatch.setenv(checksums.CHECKSUM_CACHE_ENV, path.as_posix())
+    files.CACHE_CHECKSUM_FILE.clear()
+    yield
+    files.CACHE_CHECKSUM_FILE.clear()
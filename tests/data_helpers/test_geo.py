@@ -732,3 +732,47 @@ class TestAddRegionAggregates:
             }
         )
         assert dataframes.are_equal(df1=df, df2=df_out)[0]
+
+    def test_add_multiple_regions(self):
+        df = geo.add_regions_aggregates(
+            df=self.df_in,
+            regions={"Region 1": ["Country 1", "Country 2"], "Region 2": ["Country 2", "Country 3"]},
+            countries_that_must_have_data={"Region 1": ["Country 1"], "Region 2": ["Country 3"]},
+            num_allowed_nans_per_year=None,
+            frac_allowed_nans_per_year=None,
+            country_col="country",
+            year_col="year",
+        )
+        df_out = pd.DataFrame(
+            {
+                "country": [
+                    "Country 1",
+                    "Country 1",
+                    "Country 2",
+                    "Country 3",
+                    "Income group 1",
+                    "Region 1",
+                    "Region 1",
+                    "Region 2",
+                    "Region 2",
+                ],
+                "year": [2020, 2021, 2020, 2022, 2022, 2020, 2021, 2020, 2022],
+                "var_01": [1, 2, 3, np.nan, 6, 4, 2, np.nan, 0.0],
+                "var_02": [10.0, 20.0, 30.0, 40.0, 60.0, 40.0, 20.0, np.nan, 40.0],
+            }
+        )
+        assert dataframes.are_equal(df1=df, df2=df_out)[0]
+
+    def test_add_multiple_regions_same_as_one_by_one(self):
+        regions = {"Region 1": ["Country 1", "Country 2"], "Region 2": ["Country 2", "Country 3"]}
+        must_have_data = {"Region 1": ["Country 1"], "Region 2": ["Country 2"]}
+        df_expected = self.df_in
+        for region, members in regions.items():
+            df_expected = geo.add_region_aggregates(
+                df=df_expected,
+                region=region,
+                countries_in_region=members,
+                countries_that_must_have_data=must_have_data[region],
+            )
+        df = geo.add_regions_aggregates(df=self.df_in, regions=regions, countries_that_must_have_data=must_have_data)
+        assert dataframes.are_equal(df1=df, df2=df_expected)[0]
@@ -0,0 +1,132 @@
+import io
+import json
+from email.message import Message
+from typing import Dict, Tuple
+from unittest.mock import MagicMock, patch
+from urllib.error import HTTPError
+
+import pandas as pd
+
+from etl.chart_revision.v1 import revision, variables
+from etl.chart_revision.v1.revision import ChartVariableUpdateRevision, bake_revisions
+from etl.chart_revision.v1.variables import VariableMetadata, VariablesUpdate
+
+
+def _urlopen_metadata(year_ranges: Dict[int, Tuple[int, int]]):
+    """Mock of `urlopen` returning grapher metadata with given year ranges, other variables give 404."""
+
+    def urlopen(url):
+        var_id = int(url.split("/")[-1].split(".")[0])
+        if var_id not in year_ranges:
+            raise HTTPError(url, 404, "Not Found", Message(), None)
+        years = [{"id": year} for year in range(year_ranges[var_id][0], year_ranges[var_id][1] + 1)]
+        return io.BytesIO(json.dumps({"dimensions": {"years": {"values": years}}}).encode())
+
+    return urlopen
+
+
+def test_fetch_year_range_from_s3_not_found():
+    urlopen = MagicMock(side_effect=_urlopen_metadata({}))
+    with patch.object(variables, "urlopen", urlopen):
+        assert variables._fetch_year_range_from_s3(1) is None
+
+    # missing metadata is not retried
+    assert urlopen.call_count == 1
+
+
+@patch.object(variables, "get_engine")
+@patch.object(variables, "variables_have_checksums", return_value=True)
+@patch.object(variables, "_get_entities_mapping", return_value={1: "France"})
+@patch.object(variables, "variable_data_df_from_s3")
+@patch.object(variables.pd, "read_sql")
+def test_VariablesUpdate_batched(read_sql, data_from_s3, *_):
+    read_sql.return_value = pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "name": ["old_a", "old_b", "new_a", "new_b"],
+            "dataChecksum": ["x", "y", "x", "z"],
+        }
+    )
+    data_from_s3.return_value = pd.DataFrame(
+        {
+            "variableId": [2, 2, 4, 4],
+            "entityId": [1, 1, 1, 1],
+            "year": [2000, 2001, 2000, 2001],
+            "value": ["1", "2", "1", "3"],
+        }
+    )
+    # variable 4 has no metadata on S3
+    year_ranges = {1: (2000, 2010), 2: (2000, 2001), 3: (1990, 2020)}
+    with patch.object(variables, "urlopen", _urlopen_metadata(year_ranges)):
+        update = VariablesUpdate({1: 3, 2: 4}, batched=True)
+
+    # data is only downloaded for variables that have changed
+    assert sorted(data_from_s3.call_args.kwargs["variable_ids"]) == [2, 4]
+
+    # year ranges come from metadata, or from data if metadata is missing
+    assert update.get_year_range(1) == [2000, 2010]
+    assert update.get_year_range(3) == [1990, 2020]
+    assert update.get_year_range(4) == [2000, 2001]
+
+    summary = dict((old, s) for old, _, s in update._update_summary)
+    assert summary[1] == "No change"
+    assert "Number datapoints that changed:</b> 1" in summary[2]
+
+
+def _variables_update() -> VariablesUpdate:
+    return VariablesUpdate(
+        {1: 3, 2: 4},
+        metadata=[VariableMetadata(id=i, min_year=2000, max_year=2020, name=f"var_{i}") for i in range(1, 5)],
+        update_summary=[(1, 3, "No change"), (2, 4, "No change")],
+    )
+
+
+def test_bake_revisions():
+    variables_update = _variables_update()
+    revisions = [
+        ChartVariableUpdateRevision(1, {"version": 1, "dimensions": [{"variableId": 1}]}, variables_update),
+        ChartVariableUpdateRevision(
+            2, {"version": 1, "maxTime": "latest", "dimensions": [{"variableId": 5}]}, variables_update
+        ),
+    ]
+
+    with patch.object(revision, "_get_chart_update_reasons", return_value={1: "Bulk update: a", 2: "Bulk update: b"}):
+        changed = bake_revisions(revisions)
+
+    # only charts with a new config are returned
+    assert [r.id for r in changed] == [1]
+    assert changed[0]["suggested_reason"] == "Bulk update: a"
+    assert changed[0].chart.config["dimensions"] == [{"variableId": 3}]  # type: ignore
+
+
+def test_get_chart_update_reasons():
+    variables_update = _variables_update()
+    revisions = [
+        ChartVariableUpdateRevision(1, {"version": 1, "dimensions": [{"variableId": 1}]}, variables_update),
+        ChartVariableUpdateRevision(
+            2, {"version": 1, "dimensions": [{"variableId": 1}, {"variableId": 2}]}, variables_update
+        ),
+    ]
+
+    db = MagicMock()
+    db.fetch_many.return_value = [(3, "dataset_a"), (4, "dataset_b")]
+    with patch.object(revision, "open_db") as open_db:
+        open_db.return_value.__enter__.return_value = db
+        reasons = revision._get_chart_update_reasons(revisions)
+
+    # a single query for all charts
+    assert db.fetch_many.call_count == 1
+    assert reasons == {1: "Bulk update: dataset_a", 2: "Bulk updates:dataset_a; dataset_b"}
+
+
+def test_insert_suggested_chart_revisions():
+    db = MagicMock()
+    tuples = [(i, "{}", "{}", "reason", "summary", "pending", 1) for i in range(5)]
+
+    revision._insert_suggested_chart_revisions(db, tuples, batch_size=2)
+
+    # rows are inserted with multi-row statements
+    assert db.cursor.execute.call_count == 3
+    (query, params), _ = db.cursor.execute.call_args_list[0]
+    assert query.count("NOW(), NOW()") == 2
+    assert params == list(tuples[0] + tuples[1])
@@ -7,6 +7,7 @@ Test components of the etl command-line tool.
 """
 
 import time
+from unittest.mock import patch
 
 import pytest
 
@@ -45,3 +46,78 @@ def test_validate_private_steps(dag):
         }
     )
     cmd._validate_private_steps(new_dag)
+
+
+def test_dependency_graph_of_selected():
+    dag = {"data://a": {"data://b"}, "data://b": {"data://c"}, "data://c": set()}
+
+    # unselected steps are traversed through
+    assert cmd._dependency_graph_of_selected(dag, {"data://a", "data://c"}) == {
+        "data://a": {"data://c"},
+        "data://c": set(),
+    }
+
+
+_RUN_DIR = None
+
+
+def _mock_run(self):
+    if self.path == "fail":
+        raise ValueError("step failed")
+    (_RUN_DIR / self.path).touch()  # type: ignore
+
+
+def test_run_steps_in_parallel(tmp_path):
+    global _RUN_DIR
+    _RUN_DIR = tmp_path
+
+    dag = {
+        "data://a": {"data://fail"},
+        "data://b": {"data://c"},
+        "data://c": set(),
+        "data://fail": set(),
+    }
+    steps = [cmd.parse_step(s, dag) for s in ["data://c", "data://fail", "data://b", "data://a"]]
+
+    with patch.object(cmd.DataStep, "run", _mock_run):
+        cmd.run_steps_in_parallel(dag, steps[:1] + steps[2:3], workers=2, strict=False)
+        assert {p.name for p in tmp_path.iterdir()} == {"b", "c"}
+
+        # dependants of the failed step are skipped
+        with pytest.raises(RuntimeError, match="data://fail"):
+            cmd.run_steps_in_parallel(dag, steps, workers=2, strict=False, continue_on_error=True)
+        assert not (tmp_path / "a").exists()
+
+
+def test_run_steps_in_parallel_stops_after_main_process_failure():
+    dag = {"data://a": set(), "data://b": set()}
+    steps = [cmd.parse_step(s, dag) for s in dag]
+
+    # both steps are ready at the same time, whichever runs first fails
+    with patch.object(cmd, "_run_in_worker", return_value=False), patch.object(
+        cmd, "_run_step", side_effect=ValueError("step failed")
+    ) as run_step:
+        with pytest.raises(RuntimeError, match="1 step"):
+            cmd.run_steps_in_parallel(dag, steps, workers=2, strict=False)
+
+    assert run_step.call_count == 1
+
+
+def test_run_dag_pulls_snapshots_in_batch():
+    dag = {
+        "data-private://meadow/ns/2023-01-01/a": {
+            "snapshot://ns/2023-01-01/a.csv",
+            "snapshot-private://ns/2023-01-01/b.csv",
+        },
+    }
+    with patch.object(cmd, "pull_snapshot_steps") as pull, patch.object(cmd.DataStep, "run") as run:
+        cmd.run_dag(dag, force=True, private=True, strict=False)
+
+    # snapshots are pulled with a single call and not run one by one
+    (snapshot_steps,), _ = pull.call_args
+    assert pull.call_count == 1
+    assert sorted(str(s) for s in snapshot_steps) == [
+        "snapshot-private://ns/2023-01-01/b.csv",
+        "snapshot://ns/2023-01-01/a.csv",
+    ]
+    assert run.call_count == 1
@@ -1,6 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import pandas as pd
+from click.testing import CliRunner
 from owid.catalog import Dataset, DatasetMeta, Table
 
+from etl import datadiff
 from etl.datadiff import DatasetDiff, _data_diff
 
 
@@ -50,3 +55,65 @@ def test_data_diff():
 [violet]- Avg. change: 1.00 (40%)
     """.strip()
     )
+
+
+def test_DatasetDiff_summary_changed_index(tmp_path, monkeypatch):
+    # compare values in several blocks
+    monkeypatch.setattr(datadiff, "HASH_BLOCK_SIZE", 2)
+
+    ds_meta = DatasetMeta(namespace="n", version="v", short_name="ds")
+    ds_a = Dataset.create_empty(tmp_path / "catalog_a" / "ds", ds_meta)
+    ds_a.metadata.channel = "garden"  # type: ignore
+    ds_b = Dataset.create_empty(tmp_path / "catalog_b" / "ds", ds_meta)
+    ds_b.metadata.channel = "garden"  # type: ignore
+
+    tab_a = Table(
+        pd.DataFrame({"country": ["UK", "US", "FR", "DE"], "year": 2000, "a": [1.0, 2.0, 3.0, 4.0]}),
+        short_name="tab",
+    ).set_index(["country", "year"])
+    # rows in different order, FR removed, CZ added and DE changed
+    tab_b = Table(
+        pd.DataFrame({"country": ["CZ", "DE", "US", "UK"], "year": 2000, "a": [5.0, 5.0, 2.0, 1.0 + 1e-10]}),
+        short_name="tab",
+    ).set_index(["country", "year"])
+
+    ds_a.add(tab_a)
+    ds_b.add(tab_b)
+
+    out = []
+    DatasetDiff(ds_a, ds_b, verbose=True, cols="^a$", print=lambda x: out.append(x)).summary()
+
+    assert out == [
+        "[white]= Dataset [b]garden/n/v/ds[/b]",
+        "\t[white]= Table [b]tab[/b]",
+        "\t\t[yellow]~ Column [b]a[/b] (changed [u]data & index[/u])",
+        "\t\t\t\t[violet]- Changed values: 3 / 5 (60.00%)\n"
+        "\t\t\t\t[violet]- country: CZ, DE, FR\n"
+        "\t\t\t\t[violet]- year: 2000\n"
+        "\t\t\t\t[violet]- Avg. change: 1.50 (35%)",
+    ]
+
+
+def test_cli_soft_fails_broken_worker(tmp_path, monkeypatch):
+    datasets = {}
+    for short_name in ("a", "b"):
+        ds = Dataset.create_empty(tmp_path / short_name, DatasetMeta(namespace="n", version="v", short_name=short_name))
+        ds.metadata.channel = "garden"  # type: ignore
+        datasets[f"garden/n/v/{short_name}"] = ds
+
+    def _diff_dataset(ds_a, ds_b, **kwargs):
+        if ds_a.metadata.short_name == "a":
+            raise BrokenProcessPool("worker died")
+        return ["[white]= Dataset [b]garden/n/v/b[/b]"], False, False
+
+    monkeypatch.setattr(datadiff, "_load_catalog_datasets", lambda path, *args: datasets if path == "a" else {})
+    monkeypatch.setattr(datadiff, "_diff_dataset", _diff_dataset)
+    monkeypatch.setattr(datadiff.concurrent.futures, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    result = CliRunner().invoke(datadiff.cli, ["a", "b", "--workers", "2"])
+
+    # error of one dataset doesn't stop comparison of others
+    assert "garden/n/v/a" in result.output
+    assert "worker died" in result.output
+    assert "garden/n/v/b" in result.output
+    assert "Found errors" in result.output
@@ -34,3 +34,15 @@ c:
       - line
 """
     )
+
+
+def test_checksum_file_persistent_cache(tmp_path):
+    f = tmp_path / "data.txt"
+    f.write_text("hello")
+
+    checksum = files.checksum_file(f)
+    assert checksum == files.checksum_file_nocache(f)
+
+    # checksum is in the persistent cache and can be invalidated
+    assert files.clear_checksum_cache(tmp_path) == 1
+    assert files.clear_checksum_cache(tmp_path) == 0
@@ -62,6 +62,90 @@ def test_yield_wide_table_with_dimensions():
     assert t[t.columns[0]].metadata.title == "Deaths - Age group: 19-25"
 
 
+def test_yield_wide_table_with_unsorted_dimensions():
+    df = pd.DataFrame(
+        {
+            "year": [2019, 2020, 2019, 2020, 2019, 2021],
+            "entity_id": [1, 1, 2, 2, 1, 1],
+            "sex": ["male", "female", "male", "female", "female", None],
+            "age": [10, 10, 10, 10, 20, 10],
+            "deaths": [1.0, 2.0, 3.0, np.nan, 5.0, 6.0],
+        }
+    )
+    table = Table(df.set_index(["entity_id", "year", "sex", "age"]), short_name="deaths")
+    table.deaths.metadata.unit = "people"
+    table.deaths.metadata.title = "Deaths of << sex >> aged << age >>"
+    table.deaths.metadata.description = "Deaths <% if sex == 'male' %>of men<% else %>of women<% endif %>"
+
+    grapher_tables = list(gh._yield_wide_table(table, na_action="drop"))
+
+    # groups are sorted by dimensions, rows keep their order and rows with missing dimensions are dropped
+    assert [t.columns[0] for t in grapher_tables] == [
+        "deaths__sex_female__age_10",
+        "deaths__sex_female__age_20",
+        "deaths__sex_male__age_10",
+    ]
+    assert grapher_tables[0].reset_index().to_dict(orient="list") == {
+        "entity_id": [1],
+        "year": [2020],
+        "deaths__sex_female__age_10": [2.0],
+    }
+    assert grapher_tables[2].reset_index().to_dict(orient="list") == {
+        "entity_id": [1, 2],
+        "year": [2019, 2019],
+        "deaths__sex_male__age_10": [1.0, 3.0],
+    }
+
+    t = grapher_tables[1]
+    assert t.metadata.short_name == "deaths__sex_female__age_20"
+    assert t.metadata.primary_key == ["entity_id", "year"]
+    meta = t[t.columns[0]].metadata
+    assert meta.title == "Deaths of female aged 20"
+    assert meta.description == "Deaths of women"
+    assert meta.additional_info["dimensions"]["filters"] == [  # type: ignore
+        {"name": "sex", "value": "female"},
+        {"name": "age", "value": 20},
+    ]
+
+    # original table is not modified
+    assert table.deaths.metadata.title == "Deaths of << sex >> aged << age >>"
+
+
+def test_expand_dimensions():
+    df = pd.DataFrame(
+        {
+            "country": ["France", "France", "Spain", "Spain"],
+            "year": [2019, 2020, 2019, 2020],
+            "sex": ["male", "female", "female", "female"],
+            "deaths": [1, 2, 3, 4],
+        }
+    )
+    tb = Table(df.set_index(["country", "year", "sex"]), short_name="deaths")
+    tb.deaths.metadata.unit = "people"
+    tb.deaths.metadata.title = "Deaths"
+
+    expanded = gh.expand_dimensions(tb)
+    assert expanded.columns == ["deaths__sex_female", "deaths__sex_male"]
+
+    # metadata can be modified before iterating
+    expanded.columns_metadata["deaths__sex_male"].display = {"name": "Male"}
+
+    # one table per combination of dimension values
+    tables = list(expanded)
+    assert [list(t.columns) for t in tables] == [["deaths__sex_female"], ["deaths__sex_male"]]
+    assert tables[0].index.names == ["year", "country"]
+    assert tables[0].deaths__sex_female.to_dict() == {(2020, "France"): 2, (2019, "Spain"): 3, (2020, "Spain"): 4}
+    assert tables[1].deaths__sex_male.metadata.display == {"name": "Male"}
+
+    expanded_tb = expanded.to_table()
+    assert list(expanded_tb.columns) == ["deaths__sex_female", "deaths__sex_male"]
+    assert expanded_tb.deaths__sex_male.metadata.title == "Deaths - Sex: male"
+    assert expanded_tb.deaths__sex_male.dropna().to_dict() == {(2019, "France"): 1}
+
+    # original table is not modified
+    assert tb.index.names == ["country", "year", "sex"]
+
+
 def test_long_to_wide_tables():
     deaths_meta = VariableMeta(title="Deaths", unit="people")
     births_meta = VariableMeta(title="Births", unit="people")
@@ -0,0 +1,155 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from owid.catalog import DatasetMeta, Table, VariableMeta
+from sqlalchemy import create_engine, text
+from sqlmodel import Session
+
+from etl import grapher_import as gi
+from etl.steps import GrapherStep
+
+
+def test_r2_uploader_uploads_all_payloads(monkeypatch):
+    uploaded = {}
+    monkeypatch.setattr(gi, "upload_gzip_dict", lambda d, s3_path, r2: uploaded.update({s3_path: d}))
+
+    with gi.R2Uploader(workers=4, max_pending=2) as uploader:
+        for i in range(10):
+            uploader.submit({"values": [i]}, f"s3://bucket/{i}.json")
+
+    assert uploaded == {f"s3://bucket/{i}.json": {"values": [i]} for i in range(10)}
+    assert uploader.stats.items["upload"] == 10
+
+
+def test_r2_uploader_backpressure(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(gi, "upload_gzip_dict", lambda d, s3_path, r2: release.wait())
+
+    uploader = gi.R2Uploader(workers=4, max_pending=2)
+    uploader.submit({}, "s3://bucket/1.json")
+    uploader.submit({}, "s3://bucket/2.json")
+
+    # third payload has to wait until one of the pending uploads finishes
+    t = threading.Thread(target=uploader.submit, args=({}, "s3://bucket/3.json"))
+    t.start()
+    time.sleep(0.1)
+    assert t.is_alive()
+
+    release.set()
+    t.join(timeout=5)
+    assert not t.is_alive()
+    uploader.close()
+
+
+def test_r2_uploader_raises_upload_error(monkeypatch):
+    def upload(d, s3_path, r2):
+        raise ValueError(s3_path)
+
+    monkeypatch.setattr(gi, "upload_gzip_dict", upload)
+
+    with pytest.raises(ValueError, match="1.json"):
+        with gi.R2Uploader(workers=1, max_pending=1) as uploader:
+            uploader.submit({}, "s3://bucket/1.json")
+
+
+def _variable_table(values, unit="people"):
+    t = Table(pd.DataFrame({"year": [2000, 2001], "entity_id": [1, 2], "population": values}), short_name="pop")
+    t = t.set_index(["year", "entity_id"])
+    t.population.metadata = VariableMeta(title="Population", unit=unit)
+    return t
+
+
+def test_variable_checksums():
+    checksums = gi.variable_checksums(_variable_table([1, 2]), "grapher/ns/2023/ds/pop", "abc")
+
+    # same table gives same checksums
+    assert gi.variable_checksums(_variable_table([1, 2]), "grapher/ns/2023/ds/pop", "abc") == checksums
+
+    # data changes
+    other = gi.variable_checksums(_variable_table([1, 3]), "grapher/ns/2023/ds/pop", "abc")
+    assert other.data != checksums.data
+    assert other.metadata == checksums.metadata
+
+    # int and float values are uploaded differently
+    other = gi.variable_checksums(_variable_table([1.0, 2.0]), "grapher/ns/2023/ds/pop", "abc")
+    assert other.data != checksums.data
+
+    # metadata changes
+    other = gi.variable_checksums(_variable_table([1, 2], unit="%"), "grapher/ns/2023/ds/pop", "abc")
+    assert other.data == checksums.data
+    assert other.metadata != checksums.metadata
+
+    # dataset metadata changes
+    other = gi.variable_checksums(_variable_table([1, 2]), "grapher/ns/2023/ds/pop", "def")
+    assert other.metadata != checksums.metadata
+
+
+def test_variable_checksums_ignore_display_update():
+    t = _variable_table([1, 2])
+    checksums = gi.variable_checksums(t, "grapher/ns/2023/ds/pop", "abc")
+
+    # upserting a variable copies units to display
+    gi._update_variables_display(t)
+    assert t.population.metadata.display == {"unit": "people"}
+    assert gi.variable_checksums(t, "grapher/ns/2023/ds/pop", "abc") == checksums
+
+
+def _variables_engine(tmp_path, checksums: bool):
+    engine = create_engine(f"sqlite:///{tmp_path / 'grapher.db'}")
+    checksum_columns = ", dataChecksum TEXT, metadataChecksum TEXT" if checksums else ""
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE variables (id INTEGER, datasetId INTEGER, shortName TEXT, sourceId INTEGER"
+                f"{checksum_columns})"
+            )
+        )
+        conn.execute(text("INSERT INTO variables (id, datasetId, shortName, sourceId) VALUES (1, 10, 'pop', 2)"))
+    return engine
+
+
+def test_variable_checksums_roundtrip(tmp_path):
+    engine = _variables_engine(tmp_path, checksums=True)
+    assert gi.fetch_variable_checksums(engine, 10) == {}
+
+    checksums = gi.VariableChecksums(data="a", metadata="b")
+    gi.set_variable_checksums(engine, [gi.VariableUpsertResult(1, 2, checksums)])
+    assert gi.fetch_variable_checksums(engine, 10) == {"pop": (gi.VariableUpsertResult(1, 2), checksums)}
+
+
+def test_variable_checksums_missing_columns(tmp_path):
+    # older databases without checksum columns upsert all variables
+    engine = _variables_engine(tmp_path, checksums=False)
+    gi.set_variable_checksums(engine, [gi.VariableUpsertResult(1, 2, gi.VariableChecksums(data="a", metadata="b"))])
+    assert gi.fetch_variable_checksums(engine, 10) == {}
+
+
+def test_variable_checksums_interrupted_upsert(tmp_path):
+    engine = _variables_engine(tmp_path, checksums=True)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO variables (id, datasetId, shortName, sourceId) VALUES (2, 10, 'population', 2)"))
+
+    step = GrapherStep.__new__(GrapherStep)
+    dataset = SimpleNamespace(metadata=DatasetMeta(short_name="ds"))
+    dataset_upsert_results = SimpleNamespace(dataset_id=10)
+
+    def _run(values) -> list:
+        tables = [("grapher/ns/2023/ds/pop", _variable_table(values))]
+        return list(step._changed_variables(engine, dataset, tables, dataset_upsert_results, []))  # type: ignore
+
+    # first run upserts the variable and stores its checksums
+    ((_, _, checksums),) = _run([1, 2])
+    gi.set_variable_checksums(engine, [gi.VariableUpsertResult(2, 2, checksums)])
+    assert _run([1, 2]) == []
+
+    # second run with new data upserts the variable, but is interrupted before storing checksums
+    assert len(_run([1, 3])) == 1
+    with Session(engine) as session:
+        gi._reset_variable_checksums(session, [2])
+        session.commit()
+
+    # going back to the original data upserts the variable again
+    assert len(_run([1, 2])) == 1
@@ -1,3 +1,5 @@
+from unittest.mock import MagicMock
+
 from etl import grapher_model as gm
 
 
@@ -9,3 +11,23 @@ def test_source_description():
     s = gm.Source(**d)
     assert "link" in s.description
     assert s.description["link"] == "ABC"
+
+
+def _variable(**kwargs) -> gm.Variable:
+    return gm.Variable(datasetId=1, unit="", coverage="", timespan="", display={}, **kwargs)
+
+
+def test_variable_upsert_many_renamed_variable():
+    # existing row is renamed to `a` (matched by its name) and `b` takes over its old shortName
+    existing = _variable(id=10, shortName="b", name="Variable A")
+    session = MagicMock()
+    session.exec.return_value.all.return_value = [existing]
+
+    a = _variable(shortName="a", name="Variable A")
+    b = _variable(shortName="b", name="Variable B")
+    out = gm.Variable.upsert_many(session, [a, b])
+
+    # `a` updates the existing row, `b` gets a new one like with sequential `upsert`
+    assert out[0] is existing
+    assert existing.shortName == "a"
+    assert out[1] is b
@@ -132,6 +132,22 @@ def test_get_all_usages_for_step_in_dag():
         assert sorted(usages) == sorted(mock_expected_usages[step])
 
 
+def test_DAGIndex():
+    mock_dag_all = mock_dag["steps"].copy()
+    mock_dag_all.update(mock_dag["archive"])
+    index = etl.helpers.DAGIndex(mock_dag_all)
+    for step in mock_dag["steps"]:
+        assert sorted(index.get_direct_usages(step)) == sorted(mock_expected_direct_usages[step])
+        assert sorted(index.get_all_usages(step)) == sorted(mock_expected_usages[step])
+        # memoised results are not shared with the caller
+        index.get_all_dependencies(step).add("x")
+        assert sorted(index.get_all_dependencies(step)) == sorted(mock_expected_dependencies[step])
+
+    assert index.get_all_dependencies_of_steps(mock_dag["steps"]) == set().union(
+        *[mock_expected_dependencies[step] for step in mock_dag["steps"]]
+    )
+
+
 def test_list_all_steps_in_dag():
     all_steps = etl.helpers.list_all_steps_in_dag(dag=mock_dag["steps"])
     assert sorted(all_steps) == sorted(mock_dag["steps"])
@@ -0,0 +1,49 @@
+import pandas as pd
+from owid.catalog import Dataset
+
+from etl.steps.open_numbers import add_resource, load_resources
+
+
+def test_load_resources_combines_files(tmp_path):
+    pd.DataFrame({"global": ["world", "world"], "time": [2000, 2001], "pop": [1, 2]}).to_csv(
+        tmp_path / "a.csv", index=False
+    )
+    pd.DataFrame({"global": ["world"], "time": [2002], "pop": [2.5]}).to_csv(tmp_path / "b.csv", index=False)
+
+    df = load_resources(
+        [tmp_path / "a.csv", tmp_path / "b.csv"], {"global": "string", "time": "any", "pop": "any"}, ["global", "time"]
+    )
+
+    assert list(df.index.names) == ["geo", "time"]
+    assert df["pop"].tolist() == [1.0, 2.0, 2.5]
+
+
+def test_load_resources_mixed_types(tmp_path):
+    pd.DataFrame({"geo": ["a", "b", "c"], "time": [2000, 2000, 2000], "status": ["1", "2", "x"]}).to_csv(
+        tmp_path / "a.csv", index=False
+    )
+
+    df = load_resources([tmp_path / "a.csv"], {"geo": "any", "time": "any", "status": "any"}, ["geo", "time"])
+
+    assert df["status"].dtype == "category"
+    assert df["status"].astype(str).tolist() == ["1", "2", "x"]
+
+
+def test_load_resources_empty_column(tmp_path):
+    (tmp_path / "a.csv").write_text("geo,time,note\na,2000,\n")
+
+    df = load_resources([tmp_path / "a.csv"], {"geo": "any", "time": "any", "note": "string"}, ["geo", "time"])
+
+    assert df["note"].isnull().all()
+
+
+def test_add_resource(tmp_path):
+    pd.DataFrame({"geo": ["a", "b"], "time": [2000, 2000], "Pop": [1, 2]}).to_csv(tmp_path / "a.csv", index=False)
+    Dataset.create_empty(tmp_path / "ds")
+
+    add_resource(
+        str(tmp_path / "ds"), "pop", [tmp_path / "a.csv"], {"geo": "any", "time": "any", "Pop": "any"}, ["geo", "time"]
+    )
+
+    t = Dataset(tmp_path / "ds")["pop"]
+    assert t["pop"].tolist() == [1, 2]
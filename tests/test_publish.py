@@ -0,0 +1,124 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from owid.catalog import Dataset, DatasetMeta, LocalCatalog, Table
+
+from etl import publish
+
+moto = pytest.importorskip("moto")
+
+BUCKET = "owid-catalog-test"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    mock = moto.mock_aws() if hasattr(moto, "mock_aws") else moto.mock_s3()
+    with mock:
+        import boto3
+
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _create_dataset(catalog: Path, short_name: str, values: list, is_public: bool = True) -> None:
+    ds = Dataset.create_empty(
+        catalog / "garden" / "ns" / "2023" / short_name,
+        DatasetMeta(channel="garden", namespace="ns", version="2023", short_name=short_name, is_public=is_public),
+    )
+    t = Table(pd.DataFrame({"country": ["France", "Spain"], "value": values}), short_name=short_name)
+    ds.add(t.set_index("country"))
+    LocalCatalog(catalog).reindex()
+
+
+def _sync(s3, catalog: Path) -> None:
+    publish.sync_catalog_to_s3_with_manifest(BUCKET, catalog, "garden", workers=4, s3=s3)
+
+
+def _keys(s3):
+    return {o["Key"] for o in s3.list_objects(Bucket=BUCKET).get("Contents", [])}
+
+
+def test_sync_with_manifest(s3, tmp_path):
+    _create_dataset(tmp_path, "a", [1, 2])
+    _create_dataset(tmp_path, "b", [3, 4], is_public=False)
+    _sync(s3, tmp_path)
+
+    keys = _keys(s3)
+    assert "garden/ns/2023/a/a.feather" in keys
+    assert "garden/ns/2023/b/index.json" in keys
+    assert "catalog-garden.manifest.json" in keys
+    assert (tmp_path / ".publish" / BUCKET / "catalog-garden.manifest.json").exists()
+
+    # private datasets are not public-read
+    grants = s3.get_object_acl(Bucket=BUCKET, Key="garden/ns/2023/b/b.feather")["Grants"]
+    assert not any(g["Grantee"].get("URI", "").endswith("AllUsers") for g in grants)
+
+    # only changed files are uploaded and removed datasets are deleted
+    uploaded = []
+    upload_file = s3.upload_file
+
+    def _upload_file(filename, bucket, key, **kwargs):
+        uploaded.append(key)
+        return upload_file(filename, bucket, key, **kwargs)
+
+    s3.upload_file = _upload_file
+
+    _create_dataset(tmp_path, "a", [1, 5])
+    for f in (tmp_path / "garden" / "ns" / "2023" / "b").iterdir():
+        f.unlink()
+    (tmp_path / "garden" / "ns" / "2023" / "b").rmdir()
+    LocalCatalog(tmp_path).reindex()
+    _sync(s3, tmp_path)
+
+    # only the data file changed, the rest are catalog index files
+    assert [key for key in uploaded if key.startswith("garden/")] == ["garden/ns/2023/a/a.feather"]
+    assert not any(key.startswith("garden/ns/2023/b/") for key in _keys(s3))
+
+
+def test_sync_with_stale_local_manifest(s3, tmp_path):
+    _create_dataset(tmp_path, "a", [1, 2])
+    _sync(s3, tmp_path)
+
+    # someone else deleted the file and uploaded a new manifest
+    manifest = s3.get_object(Bucket=BUCKET, Key="catalog-garden.manifest.json")["Body"].read()
+    s3.delete_object(Bucket=BUCKET, Key="garden/ns/2023/a/a.feather")
+    s3.put_object(Bucket=BUCKET, Key="catalog-garden.manifest.json", Body=manifest.replace(b'"md5": "', b'"md5": "x'))
+    s3.delete_object(Bucket=BUCKET, Key="catalog-garden.feather")
+
+    _sync(s3, tmp_path)
+    assert "garden/ns/2023/a/a.feather" in _keys(s3)
+
+
+def test_sync_with_manifest_retries_failed_deletes(s3, tmp_path):
+    _create_dataset(tmp_path, "a", [1, 2])
+    _create_dataset(tmp_path, "b", [3, 4])
+    _sync(s3, tmp_path)
+
+    for f in (tmp_path / "garden" / "ns" / "2023" / "b").iterdir():
+        f.unlink()
+    (tmp_path / "garden" / "ns" / "2023" / "b").rmdir()
+    LocalCatalog(tmp_path).reindex()
+
+    # deleting one of the files fails
+    failed_key = "garden/ns/2023/b/b.feather"
+    delete_objects = s3.delete_objects
+
+    def _delete_objects(Bucket, Delete):
+        objects = [o for o in Delete["Objects"] if o["Key"] != failed_key]
+        response = delete_objects(Bucket=Bucket, Delete={**Delete, "Objects": objects})
+        response["Errors"] = [{"Key": failed_key, "Code": "AccessDenied", "Message": "Access Denied"}]
+        return response
+
+    s3.delete_objects = _delete_objects
+    with pytest.raises(publish.CannotPublish):
+        _sync(s3, tmp_path)
+    assert failed_key in _keys(s3)
+
+    # failed delete is kept in the manifest and retried by the next sync
+    s3.delete_objects = delete_objects
+    _sync(s3, tmp_path)
+    assert not any(key.startswith("garden/ns/2023/b/") for key in _keys(s3))
@@ -1,9 +1,20 @@
+import hashlib
+import os
 from pathlib import Path
+from typing import Optional
 
 import pytest
 from owid.catalog import Origin
 
-from etl.snapshot import SnapshotMeta, _parse_snapshot_path
+from etl import paths
+from etl.snapshot import (
+    SnapshotMeta,
+    _DVCOut,
+    _parse_snapshot_path,
+    _read_dvc_outs,
+    _unignore_backports,
+    is_snapshot_dirty,
+)
 
 
 def test_parse_snapshot_path():
@@ -37,3 +48,85 @@ def test_snapshot_to_yaml():
         "version": "2023-04-18",
         "origin": {"title": "Aviation Statistics by Period", "producer": "Producer"},
     }
+
+
+def _write_dvc(tmp_path: Path, content: bytes, md5: Optional[str] = None, hash: Optional[str] = None) -> Path:
+    data_path = tmp_path / "data" / "snapshots" / "ns" / "2023-01-01" / "file.csv"
+    data_path.parent.mkdir(parents=True)
+    data_path.write_bytes(content)
+    dvc_path = tmp_path / "snapshots" / "ns" / "2023-01-01" / "file.csv.dvc"
+    dvc_path.parent.mkdir(parents=True)
+    dvc_path.write_text(
+        f"""meta:
+  name: Test
+  description: |
+    outs: this is not a key
+
+wdir: ../../../data/snapshots/ns/2023-01-01
+outs:
+- md5: {md5 or hashlib.md5(content).hexdigest()}
+  size: {len(content)}
+  path: file.csv
+"""
+        + (f"  hash: {hash}\n" if hash else "")
+    )
+    return dvc_path
+
+
+def test_read_dvc_outs(tmp_path):
+    dvc_path = _write_dvc(tmp_path, b"a,b\n1,2\n")
+    assert _read_dvc_outs(dvc_path) == [
+        _DVCOut(
+            path=tmp_path / "data" / "snapshots" / "ns" / "2023-01-01" / "file.csv",
+            md5=hashlib.md5(b"a,b\n1,2\n").hexdigest(),
+            size=8,
+        )
+    ]
+
+
+def test_is_snapshot_dirty(tmp_path):
+    dvc_path = _write_dvc(tmp_path, b"a,b\n1,2\n")
+    data_path = tmp_path / "data" / "snapshots" / "ns" / "2023-01-01" / "file.csv"
+    assert not is_snapshot_dirty(dvc_path)
+
+    # same size, different content
+    data_path.write_bytes(b"a,b\n1,3\n")
+    os.utime(data_path, (0, 1))
+    assert is_snapshot_dirty(dvc_path)
+
+    # different size
+    data_path.write_bytes(b"a,b\n")
+    assert is_snapshot_dirty(dvc_path)
+
+    data_path.unlink()
+    assert is_snapshot_dirty(dvc_path)
+
+
+def test_is_snapshot_dirty_crlf(tmp_path):
+    content = b"a,b\r\n1,2\r\n"
+    # DVC 2 converts CRLF to LF in text files before hashing them
+    dvc2_md5 = hashlib.md5(content.replace(b"\r\n", b"\n")).hexdigest()
+    assert not is_snapshot_dirty(_write_dvc(tmp_path / "dvc2", content, md5=dvc2_md5))
+
+    # DVC 3 hashes raw bytes
+    assert not is_snapshot_dirty(_write_dvc(tmp_path / "dvc3", content, hash="md5"))
+    assert is_snapshot_dirty(_write_dvc(tmp_path / "dvc3_dirty", content, md5=dvc2_md5, hash="md5"))
+
+
+def test_unignore_backports(tmp_path, monkeypatch):
+    monkeypatch.setattr(paths, "BASE_DIR", tmp_path)
+    original = "etl/\nsnapshots/backport/latest/*\n"
+    (tmp_path / ".dvcignore").write_text(original)
+
+    backports = [
+        Path("snapshots/backport/latest/dataset_1_a_config.json"),
+        Path("snapshots/backport/latest/dataset_22_b_values.feather"),
+        Path("snapshots/ns/2023-01-01/file.csv"),
+    ]
+    with _unignore_backports(*backports):
+        assert (tmp_path / ".dvcignore").read_text() == (
+            "etl/\nsnapshots/backport/latest/*\n"
+            "!snapshots/backport/latest/dataset_1*\n"
+            "!snapshots/backport/latest/dataset_22*\n"
+        )
+    assert (tmp_path / ".dvcignore").read_text() == original
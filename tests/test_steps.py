@@ -10,6 +10,7 @@ import random
 import shutil
 import string
 from contextlib import contextmanager
+from pathlib import Path
 from typing import Iterator
 from unittest.mock import patch
 
@@ -21,10 +22,14 @@ from etl.steps import (
     BackportStepPrivate,
     DataStep,
     DataStepPrivate,
+    SnapshotStep,
+    SnapshotStepPrivate,
     Step,
     compile_steps,
     filter_to_subgraph,
     get_etag,
+    parse_step,
+    pull_snapshot_steps,
     select_dirty_steps,
     to_dependency_order,
 )
@@ -53,6 +58,13 @@ def test_data_step():
         Dataset((paths.DATA_DIR / step_name).as_posix())
 
 
+def test_data_step_warm_workers():
+    with temporary_step() as step_name, patch("etl.config.WARM_WORKERS", True):
+        _create_mock_py_file(step_name)
+        DataStep(step_name, []).run()
+        Dataset((paths.DATA_DIR / step_name).as_posix())
+
+
 def test_data_step_becomes_dirty_when_pandas_version_changes():
     pandas_version = pd.__version__
     try:
@@ -119,7 +131,7 @@ def test_dependency_filtering():
 @patch("etl.steps.parse_step")
 def test_selection_selects_parents(parse_step):
     "When you pick a step, it should select everything that step depends on."
-    parse_step.side_effect = lambda name, _: DummyStep(name)  # type: ignore
+    parse_step.side_effect = lambda name, *_: DummyStep(name)  # type: ignore
 
     dag = {"a": ["b"], "d": ["a"], "c": ["a"]}
 
@@ -168,6 +180,59 @@ def test_select_dirty_steps():
     assert all([s.is_dirty() for s in select_dirty_steps(steps, 10)])  # type: ignore
 
 
+def test_compile_steps_shares_dependencies():
+    dag = {
+        "data://garden/a/latest/x": {"data://garden/a/latest/pop"},
+        "data://garden/a/latest/y": {"data://garden/a/latest/pop", "data://garden/a/latest/x"},
+    }
+    steps = {str(s): s for s in compile_steps(dag, [], [])}
+    x, y, pop = (steps[f"data://garden/a/latest/{n}"] for n in ("x", "y", "pop"))
+
+    assert x.dependencies[0] is pop  # type: ignore
+    assert set(map(id, y.dependencies)) == {id(pop), id(x)}  # type: ignore
+
+    # standalone parsing creates new objects, but shares them within the step tree too
+    y = parse_step("data://garden/a/latest/y", dag)
+    deps = {str(d): d for d in y.dependencies}  # type: ignore
+    assert deps["data://garden/a/latest/pop"] is not pop
+    assert deps["data://garden/a/latest/x"].dependencies[0] is deps["data://garden/a/latest/pop"]  # type: ignore
+
+
+def test_select_dirty_steps_caches_shared_dependencies():
+    dag = {
+        "data://garden/a/latest/x": {"data://garden/a/latest/pop"},
+        "data://garden/a/latest/y": {"data://garden/a/latest/pop"},
+    }
+    steps = compile_steps(dag, [], [])
+
+    calls = []
+
+    def has_existing_data(self):
+        calls.append(str(self))
+        return False
+
+    with patch.object(DataStep, "has_existing_data", has_existing_data):
+        assert len(select_dirty_steps(steps, 10)) == 3
+
+    # each step was checked only once even though `pop` is a dependency of both steps
+    assert sorted(calls) == sorted(str(s) for s in steps)
+
+
 def test_get_etag():
     etag = get_etag("https://raw.githubusercontent.com/owid/owid-grapher/master/README.md")
     assert etag
+
+
+def test_pull_snapshot_steps():
+    steps = [
+        SnapshotStep("ns/2023-01-01/a.csv"),
+        SnapshotStepPrivate("ns/2023-01-01/b.csv"),
+        SnapshotStep("ns/2023-01-01/c.csv"),
+    ]
+    with patch("etl.steps.pull_snapshots") as pull:
+        pull_snapshot_steps(steps)
+
+    assert [(c.args[0], c.kwargs["remote"]) for c in pull.call_args_list] == [
+        ([Path(steps[0]._path), Path(steps[2]._path)], "public-read"),
+        ([Path(steps[1]._path)], "private"),
+    ]